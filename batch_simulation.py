@@ -10,21 +10,39 @@ import sys
 import multiprocessing # Added for parallelization
 import copy # Added for deepcopying config
 import argparse
+import json
+import time
+import functools
 
 sys.path.append('./src')
 
 from models.DAFOModel import DAFOModel
 from models.RTSimModel import RTSimModel
+from models.DAFOMatrixModel import DAFOMatrixModel
+from models.RTSimMatrixModel import RTSimMatrixModel
+from models.RTSimDecomposedModel import RTSimDecomposedModel
+from models.RTSimMeritOrderModel import RTSimMeritOrderModel
+from models.solver_utils import ModelSolver
 from data_utils.DataProcessor import DataProcessor
+from data_utils.ResultsStore import ResultsStore
 from data_utils.extract_da import extract_da
 from data_utils.results_processing import (
     calculate_rt_margins,
     calculate_rt_payoffs,
     calculate_system_metrics,
     calculate_premium_convergence,
-    calculate_total_margins
+    calculate_total_margins,
+    calculate_end_state,
+    summarize_run
 )
-from data_utils.scenario_generation import scenario_generation
+from data_utils.scenario_generation import scenario_generation, load_renewable_cube, aggregate_renewable_scenarios, select_scenario_positions, DEFAULT_CUBE_PATH
+from data_utils.shared_data import share_array, attach_array, release_array
+from data_utils.profiling import StageProfiler, aggregate_profiles
+from data_utils.convergence import ConvergenceMonitor
+from data_utils.run_manifest import RunManifest, MANIFEST_FILE
+from data_utils.task_scheduler import TaskScheduler, ProgressReporter
+from data_utils.job_queue import open_job_queue, run_queue_worker, DistributedScheduler, DEFAULT_LEASE_S
+from data_utils.solve_pipeline import SolvePipeline, run_serial
 
 def setup_logging():
     """Configures logging for the script."""
@@ -41,67 +59,154 @@ def load_config(config_path):
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
-def run_single_simulation(config, pyomo_system_data, run_id):
-    """Run a single simulation and return results."""
+# (config key, DAFO/RTSim model objects) of this process per pipeline slot, kept between runs so that their instances are built once per worker
+_simulation_models = {}
+
+def config_key(config):
+    """Canonical form of a config, so that cached models and solvers are only reused for the config they were made for."""
+    return json.dumps(config, sort_keys=True, default=str)
+
+def get_simulation_models(config, slot=0):
+    """Returns the DAFO and RTSim model objects of pipeline slot `slot` of the current process, creating them on first use or for a new config."""
+    key = config_key(config)
+    if _simulation_models.get(slot, (None,))[0] != key:
+        if config.get('model_backend', 'pyomo') == 'matrix':
+            models = (DAFOMatrixModel(config), RTSimMatrixModel(config))
+        else:
+            models = (DAFOModel(config), RTSimModel(config))
+        rt_method = config.get('rt_simulation', {}).get('method', 'joint')
+        if rt_method == 'decomposed':
+            models = (models[0], RTSimDecomposedModel(config))
+        elif rt_method == 'merit_order':
+            models = (models[0], RTSimMeritOrderModel(config))
+        _simulation_models[slot] = (key, models)
+    return _simulation_models[slot][1]
+
+# (config key, DAFO/RTSim solvers) of this process per pipeline slot. One per model, so that in-process (APPSI) solvers keep each model loaded between runs
+_simulation_solvers = {}
+
+def get_simulation_solvers(config, slot=0):
+    """Returns the DAFO and RTSim solvers of pipeline slot `slot` of the current process, creating them on first use or for a new config."""
+    key = config_key(config)
+    if _simulation_solvers.get(slot, (None,))[0] != key:
+        _simulation_solvers[slot] = (key, (ModelSolver(config['solver']), ModelSolver(config['solver'])))
+    return _simulation_solvers[slot][1]
+
+def deferred_solve(profiler, stage, solve, *args):
+    """A solve yielded by a simulation step generator, timed as `stage` wherever the driver runs it."""
+    def run():
+        with profiler.stage(stage):
+            return solve(*args)
+    return run
+
+def run_single_simulation(config, pyomo_system_data, run_id, profiler=None, end_state=False):
+    """
+    Run a single simulation and return results. Build, solve, extraction and metrics are timed as stages of `profiler`, if given.
+    With `end_state` the results also hold the storage level and DA dispatch at the end of the day (rolling horizon).
+    """
+    return run_serial(simulation_steps(config, pyomo_system_data, run_id, profiler, end_state=end_state))
+
+def simulation_steps(config, pyomo_system_data, run_id, profiler=None, slot=0, end_state=False):
+    """
+    Step generator of run_single_simulation: does the builds, extraction and metrics itself, yields
+    the DAFO and RTSim solves (see deferred_solve) to its driver and returns the results. Driven
+    by run_serial, or by a SolvePipeline that overlaps the solves with other runs; `slot` selects
+    the models and solvers of this run's pipeline slot.
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    # In persistent mode the instances are constructed once per worker and only re-parameterized between runs
+    persistent = config.get('batch', {}).get('persistent_models', False)
+    dafo_model, rt_sim_model = get_simulation_models(config, slot)
+
     # Create and solve DAFO model
-    dafo_model = DAFOModel(config)
-    da_instance = dafo_model.create_instance(pyomo_system_data)
-    
-    solver_cfg = config['solver']
-    solver_name = solver_cfg['name']
-    solver_exec = solver_cfg.get('executable')
-    solver_options = solver_cfg.get('options', {})
+    with profiler.stage('da_build'):
+        if persistent:
+            da_instance = dafo_model.get_instance(pyomo_system_data)
+        else:
+            da_instance = dafo_model.create_instance(pyomo_system_data)
     
-    opt = pyo.SolverFactory(solver_name, executable=solver_exec)
-    for key, value in solver_options.items():
-        if key != 'tee':
-            opt.options[key] = value
+    if config.get('model_backend', 'pyomo') != 'matrix':
+        da_solver, rt_solver = get_simulation_solvers(config, slot)
     
     try:
-        result = opt.solve(da_instance, tee=solver_options.get('tee', False))
-        if (result.solver.status != pyo.SolverStatus.ok) or \
-           (result.solver.termination_condition != pyo.TerminationCondition.optimal):
-            logging.warning(f"Run {run_id}: DAFO model solved with non-optimal status: {result.solver.status}, {result.solver.termination_condition}")
-            return None
+        if config.get('model_backend', 'pyomo') == 'matrix':
+            termination = yield deferred_solve(profiler, 'da_solve', da_instance.solve, config.get('matrix_solver_options', {}))
+            if termination != 'optimal':
+                logging.warning(f"Run {run_id}: DAFO model solved with non-optimal status: {termination}")
+                return None
+        else:
+            result = yield deferred_solve(profiler, 'da_solve', da_solver.solve, da_instance)
+            profiler.record_solver_time('da_solve', result)
+            if not ModelSolver.is_optimal(result):
+                logging.warning(f"Run {run_id}: DAFO model solved with non-optimal status: {result.solver.status}, {result.solver.termination_condition}")
+                return None
     except Exception as e:
         logging.error(f"Run {run_id}: Error solving DAFO model: {e}")
         return None
 
     # Extract data for RT model
-    dataRT, total_da, df, demand, Energy, Prices, Gross_margins = extract_da(da_instance, pyomo_system_data)
+    with profiler.stage('extract_da'):
+        dataRT, total_da, df, demand, Energy, Prices, Gross_margins = extract_da(da_instance, pyomo_system_data)
     
     if dataRT is None:
         logging.error(f"Run {run_id}: Failed to extract data for RT model")
         return None
 
     # Create and solve RT model
-    rt_sim_model = RTSimModel(config)
-    rt_instance = rt_sim_model.create_instance(dataRT)
+    rt_method = config.get('rt_simulation', {}).get('method', 'joint')
+    if rt_method in ('decomposed', 'merit_order'):
+        rt_instance = None
+    elif persistent:
+        with profiler.stage('rt_build'):
+            rt_instance = rt_sim_model.get_instance(dataRT)
+    else:
+        with profiler.stage('rt_build'):
+            rt_instance = rt_sim_model.create_instance(dataRT)
     
     try:
-        result = opt.solve(rt_instance, tee=solver_options.get('tee', False))
-        if (result.solver.status != pyo.SolverStatus.ok) or \
-           (result.solver.termination_condition != pyo.TerminationCondition.optimal):
-            logging.warning(f"Run {run_id}: RTSim model solved with non-optimal status: {result.solver.status}, {result.solver.termination_condition}")
-            return None
+        if rt_method in ('decomposed', 'merit_order'):
+            # The decomposed model runs serially inside the (daemonic) pool worker
+            rt_instance = yield deferred_solve(profiler, 'rt_solve', rt_sim_model.solve, dataRT)
+            if rt_instance.termination_condition != 'optimal':
+                logging.warning(f"Run {run_id}: RTSim model solved with non-optimal status: {rt_instance.termination_condition}")
+                return None
+        elif config.get('model_backend', 'pyomo') == 'matrix':
+            termination = yield deferred_solve(profiler, 'rt_solve', rt_instance.solve, config.get('matrix_solver_options', {}))
+            if termination != 'optimal':
+                logging.warning(f"Run {run_id}: RTSim model solved with non-optimal status: {termination}")
+                return None
+        else:
+            result = yield deferred_solve(profiler, 'rt_solve', rt_solver.solve, rt_instance)
+            profiler.record_solver_time('rt_solve', result)
+            if not ModelSolver.is_optimal(result):
+                logging.warning(f"Run {run_id}: RTSim model solved with non-optimal status: {result.solver.status}, {result.solver.termination_condition}")
+                return None
     except Exception as e:
         logging.error(f"Run {run_id}: Error solving RTSim model: {e}")
         return None
 
     # Calculate metrics
-    RTmargins = calculate_rt_margins(rt_instance, dataRT)
-    RTpayoffs = calculate_rt_payoffs(rt_instance, dataRT, df)
-    Total = calculate_system_metrics(rt_instance, dataRT, total_da)
-    premium_convergence = calculate_premium_convergence(Gross_margins, RTpayoffs)
-    Total_margin = calculate_total_margins(rt_instance, dataRT, Gross_margins, RTmargins, RTpayoffs, premium_convergence, total_da)
+    with profiler.stage('results_metrics'):
+        RTmargins = calculate_rt_margins(rt_instance, dataRT)
+        RTpayoffs = calculate_rt_payoffs(rt_instance, dataRT, df)
+        Total = calculate_system_metrics(rt_instance, dataRT, total_da)
+        premium_convergence = calculate_premium_convergence(Gross_margins, RTpayoffs)
+        Total_margin = calculate_total_margins(rt_instance, dataRT, Gross_margins, RTmargins, RTpayoffs, premium_convergence, total_da)
 
     # Store results
     results = {
         'run_id': run_id,
         # We only need Total and renewable_scenarios for saving in the worker
         'Total': Total,
-        'renewable_scenarios': pyomo_system_data[None]['RE']
+        'renewable_scenarios': pyomo_system_data[None]['RE'],
+        'total_da': total_da,
+        'Prices': Prices,
+        'df': df,
+        'demand': demand,
     }
+    if end_state:
+        # Storage level and DA dispatch at the end of the day, the starting state of a following day
+        results['end_state'] = calculate_end_state(da_instance, rt_instance)
     
     return results
 
@@ -118,9 +223,201 @@ def convert_renewable_data_to_df(re_data, num_scenarios=5, num_periods=24):
             })
     return pd.DataFrame(data)
 
+def build_run_tables(results, config):
+    """Converts the results of one run into the long-format tables of the batch ResultsStore."""
+    system_metrics = results['Total'].rename_axis('metric').reset_index().melt(
+        id_vars='metric', var_name='case', value_name='value'
+    )
+    system_metrics['case'] = system_metrics['case'].astype(str)
+
+    da_prices = results['Prices'].copy()
+    da_prices.insert(0, 'energy', results['total_da']['price'].reindex(da_prices.index))
+    da_prices.insert(1, 'da_cost', results['total_da']['cost'].reindex(da_prices.index))
+    da_prices = da_prices.rename_axis('T').reset_index()
+
+    fo_awards = results['df'][['G', 'R', 'T', 'hsu', 'hsd']].reset_index(drop=True)
+
+    demand = results['demand']
+    demand_fo_awards = pd.DataFrame({
+        'R': [idx[0] for idx in demand.index],
+        'T': [idx[1] for idx in demand.index],
+        'hdu': demand['hdu'].to_numpy(dtype=float),
+        'hdd': demand['hdd'].to_numpy(dtype=float),
+    })
+
+    scenario_inputs = convert_renewable_data_to_df(
+        results['renewable_scenarios'], config['general']['num_scenarios'], config['general']['num_periods']
+    )
+
+    tables = {
+        'system_metrics': system_metrics,
+        'da_prices': da_prices,
+        'fo_awards': fo_awards,
+        'demand_fo_awards': demand_fo_awards,
+        'scenario_inputs': scenario_inputs,
+    }
+    # Stable column types, so that the part files of a batch share one schema
+    for name, table in tables.items():
+        for col in table.columns:
+            if col not in ('metric', 'case'):
+                table[col] = table[col].astype(np.int64 if col in ('G', 'R', 'T', 'scenario', 'time_period') else np.float64)
+    return tables
+
+def run_profile(profiler, run_id):
+    """Stage timings of a finished run (None without profiling); stops the run's memory tracing."""
+    if not profiler.enabled:
+        return None
+    profile = profiler.to_dict(run_id=run_id)
+    profiler.close()
+    return profile
+
+def run_and_save_simulation(run_id, config, pyomo_system_data, output_dir_base_path, profiler=None):
+    """Runs a single simulation and saves its per-run outputs (see run_and_save_steps)."""
+    return run_serial(run_and_save_steps(run_id, config, pyomo_system_data, output_dir_base_path, profiler))
+
+def run_and_save_steps(run_id, config, pyomo_system_data, output_dir_base_path, profiler=None, slot=0):
+    """
+    Step generator of run_and_save_simulation (see simulation_steps). Returns (run_id, status, tables, profile, metrics),
+    where profile is the StageProfiler.to_dict() of the run (None without profiling) and metrics the
+    scalar summary of results_processing.summarize_run (None for a failed run).
+
+    With `batch: results_format: "parquet"` nothing is written here: the tables are returned
+    to the parent process, which appends them to the batch ResultsStore.
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+
+    # single simulation
+    logging.debug(f"Run {run_id}: Calling run_single_simulation")
+    results = yield from simulation_steps(config, pyomo_system_data, run_id, profiler, slot)
+    
+    if results is None:
+        logging.warning(f"Run {run_id}: Simulation failed or returned None.")
+        return run_id, "Simulation failed", None, run_profile(profiler, run_id), None
+
+    metrics = summarize_run(results)
+    if config.get('batch', {}).get('results_format', 'csv') == 'parquet':
+        with profiler.stage('results_tables'):
+            tables = build_run_tables(results, config)
+        return run_id, "Success", tables, run_profile(profiler, run_id), metrics
+        
+    # save resykts
+    run_dir = output_dir_base_path / f"run_{run_id:03d}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    
+    with profiler.stage('results_save'):
+        re_data = results['renewable_scenarios']
+        re_df = convert_renewable_data_to_df(re_data, config['general']['num_scenarios'], config['general']['num_periods'])
+        re_df.to_csv(run_dir / "renewable_generation.csv", index=False)
+        
+        results['Total'].to_csv(run_dir / "system_metrics.csv")
+    logging.info(f"Run {run_id}: Successfully completed and results saved to {run_dir}")
+    return run_id, "Success", None, run_profile(profiler, run_id), metrics
+
+# Batch data of this worker process, set once by init_batch_worker
+_batch_context = None
+
+def init_batch_worker(config, system_data, scenario_descriptor, sim_index, output_dir_base_path_str):
+    """
+    Pool initializer for shared-data batches: receives the config and the system data once per
+    worker and attaches (zero-copy) to the renewable scenario matrix published by the parent.
+    """
+    global _batch_context
+    scenario_shm, scenarios = attach_array(scenario_descriptor) if scenario_descriptor is not None else (None, None)
+    _batch_context = {
+        'config': config,
+        'system_data': system_data,
+        'scenario_shm': scenario_shm, # keeps the shared block mapped while `scenarios` is in use
+        'scenarios': scenarios,
+        'sim_index': sim_index,
+        'output_dir': Path(output_dir_base_path_str),
+    }
+
+def init_node_worker(config):
+    """
+    Initializer of a distributed batch worker (batch_worker.py): prepares the system data and the
+    renewable scenario matrix of this host once from the coordinator's config, so that the
+    worker then runs (run id, seed) tasks like a shared-data batch worker. Results are returned
+    to the coordinator, never written on this host.
+    """
+    global _batch_context
+    paths = config['data_paths']
+    system_data = DataProcessor(paths['generator_csv'], paths['storage_csv'], paths['demand_csv']).prepare_pyomo_data(config)
+    scenarios, sim_index = None, None
+    if not config['benchmark']:
+        scenarios, sim_index = aggregate_renewable_scenarios(
+            "data/raw/renewable", config['data_paths'].get('renewable_cube', DEFAULT_CUBE_PATH)
+        )
+    _batch_context = {
+        'config': config,
+        'system_data': system_data,
+        'scenario_shm': None,
+        'scenarios': scenarios,
+        'sim_index': sim_index,
+        'output_dir': None,
+    }
+
+def queue_authkey(config):
+    """Shared secret of the tcp job queue: `batch: queue_authkey`, else the BATCH_QUEUE_AUTHKEY environment variable."""
+    key = config.get('batch', {}).get('queue_authkey') or os.environ.get('BATCH_QUEUE_AUTHKEY')
+    return key.encode() if key else None
+
+def timed_worker(worker):
+    """Wraps a batch worker so that it also returns its wall time: (run_id, status, tables, profile, metrics, elapsed_s)."""
+    @functools.wraps(worker)
+    def run_timed(task):
+        start = time.perf_counter()
+        result = worker(task)
+        return result + (time.perf_counter() - start,)
+    return run_timed
+
+def run_shared_simulation_worker(task):
+    """Worker for shared-data batches: selects this run's scenarios from the shared matrix, no file I/O before solving."""
+    return run_serial(shared_simulation_steps(task))
+
+def run_pipelined_simulation_worker(tasks):
+    """
+    Worker for pipelined batches: runs a chunk of (run id, seed) tasks through a SolvePipeline of
+    `batch: pipeline_depth` runs, so that one run's solve overlaps the builds and metrics of the
+    others. Returns the list of worker results in completion order.
+    """
+    pipeline = SolvePipeline(_batch_context['config']['batch'].get('pipeline_depth', 2))
+    return [result for _, result in pipeline.run(tasks, shared_simulation_steps)]
+
+def run_node_simulation_worker(task):
+    """Worker of distributed batches: a (run id, seed) task, or a list of them in a pipelined batch."""
+    return run_pipelined_simulation_worker(task) if isinstance(task, list) else run_shared_simulation_worker(task)
+
+def shared_simulation_steps(task, slot=0):
+    """Step generator of run_shared_simulation_worker; returns (run_id, status, tables, profile, metrics, elapsed_s)."""
+    start = time.perf_counter()
+    run_id, seed = task
+    ctx = _batch_context
+    config = ctx['config']
+    logging.info(f"Worker starting for run_id: {run_id}")
+    profiler = StageProfiler.from_config(config)
+    try:
+        # Shallow copy: the per-run RE replaces the entry, the shared system parameters are only read
+        data = dict(ctx['system_data'][None])
+        if ctx['scenarios'] is not None:
+            with profiler.stage('data_prep'):
+                num_periods = config['general']['num_periods']
+                positions, probabilities = select_scenario_positions(
+                    ctx['sim_index'], config['general']['num_scenarios'], config['scenario_selection']['criteria'],
+                    profiles=ctx['scenarios'][:, :num_periods], random_state=seed,
+                )
+                data['RE'] = DataProcessor.process_renewable_scenarios(ctx['scenarios'][positions], num_periods)
+                if probabilities is not None:
+                    data.update(DataProcessor.process_scenario_probabilities(probabilities, config['general']['num_tiers']))
+        result = yield from run_and_save_steps(run_id, config, {None: data}, ctx['output_dir'], profiler, slot)
+    except Exception as e:
+        logging.error(f"Run {run_id}: CRITICAL ERROR in worker: {e}", exc_info=True)
+        result = run_id, f"Critical error: {e}", None, None, None
+    return result + (time.perf_counter() - start,)
+
 # New worker function for parallel execution
+@timed_worker
 def run_simulation_worker(args_tuple):
-    run_id, base_config, output_dir_base_path_str = args_tuple
+    run_id, base_config, output_dir_base_path_str, seed = args_tuple
     # Ensure logging is setup for this worker process
     # setup_logging() # setup_logging() might be better called once in main or carefully in worker
     
@@ -128,77 +425,67 @@ def run_simulation_worker(args_tuple):
     
     current_config = copy.deepcopy(base_config) # Deepcopy to avoid issues with shared config objects
     output_dir_base_path = Path(output_dir_base_path_str)
-
-    # Ensure data/processed directory exists
-    processed_data_dir = Path("data/processed")
-    processed_data_dir.mkdir(parents=True, exist_ok=True)
-    
-    temp_renewable_csv = processed_data_dir / f"temp_renewable_run_{run_id}.csv"
+    profiler = StageProfiler.from_config(current_config)
 
     try:
-        # generate unique scenarios for this run
-        logging.debug(f"Run {run_id}: Generating scenarios to {temp_renewable_csv}")
-        scenario_generation(
-            input_dir="data/raw/renewable",
-            output_file=str(temp_renewable_csv),
-            config=current_config
-        )
+        # generate unique scenarios for this run, handed to DataProcessor in memory
+        logging.debug(f"Run {run_id}: Generating scenarios")
+        with profiler.stage('scenario_generation'):
+            renewable_scenarios, scenario_probabilities = scenario_generation(
+                input_dir="data/raw/renewable",
+                output_file=None,
+                config=current_config,
+                random_state=seed
+            )
 
-        if not temp_renewable_csv.exists():
-            logging.error(f"Run {run_id}: scenario_generation failed to create {temp_renewable_csv}. Check 'data/raw/renewable/' contents and scenario_generation.py logic.")
-            return run_id, f"scenario_generation failed for {temp_renewable_csv}"
+        if renewable_scenarios is None and not current_config['benchmark']:
+            logging.error(f"Run {run_id}: scenario_generation found no scenarios. Check 'data/raw/renewable/' contents and scenario_generation.py logic.")
+            return run_id, "scenario_generation failed", None, None, None
 
-        # update config to use the temporary renewable CSV
-        current_config['data_paths']['renewable_csv'] = str(temp_renewable_csv)
-        
-        # initialize DataProcessor with the unique renewable CSV
-        logging.debug(f"Run {run_id}: Initializing DataProcessor with {temp_renewable_csv}")
-        data_processor = DataProcessor(
-            current_config['data_paths']['generator_csv'],
-            current_config['data_paths']['storage_csv'],
-            current_config['data_paths']['demand_csv'],
-            current_config['data_paths']['renewable_csv']
-        )
-        
-        pyomo_system_data = data_processor.prepare_pyomo_data(current_config)
+        logging.debug(f"Run {run_id}: Initializing DataProcessor")
+        with profiler.stage('data_prep'):
+            data_processor = DataProcessor(
+                current_config['data_paths']['generator_csv'],
+                current_config['data_paths']['storage_csv'],
+                current_config['data_paths']['demand_csv']
+            )
+            
+            pyomo_system_data = data_processor.prepare_pyomo_data(
+                current_config, renewable_scenarios=renewable_scenarios, scenario_probabilities=scenario_probabilities
+            )
         if pyomo_system_data is None:
             logging.error(f"Run {run_id}: Failed to prepare Pyomo data.")
-            return run_id, "Pyomo data prep failed"
+            return run_id, "Pyomo data prep failed", None, None, None
 
-        # single simulation
-        logging.debug(f"Run {run_id}: Calling run_single_simulation")
-        results = run_single_simulation(current_config, pyomo_system_data, run_id)
-        
-        if results is None:
-            logging.warning(f"Run {run_id}: Simulation failed or returned None.")
-            return run_id, "Simulation failed"
-            
-        # save resykts
-        run_dir = output_dir_base_path / f"run_{run_id:03d}"
-        run_dir.mkdir(parents=True, exist_ok=True)
-        
-        re_data = results['renewable_scenarios']
-        re_df = convert_renewable_data_to_df(re_data, current_config['general']['num_scenarios'], current_config['general']['num_periods'])
-        re_df.to_csv(run_dir / "renewable_generation.csv", index=False)
-        
-        results['Total'].to_csv(run_dir / "system_metrics.csv")
-        logging.info(f"Run {run_id}: Successfully completed and results saved to {run_dir}")
-        return run_id, "Success"
+        return run_and_save_simulation(run_id, current_config, pyomo_system_data, output_dir_base_path, profiler)
 
     except Exception as e:
         logging.error(f"Run {run_id}: CRITICAL ERROR in worker: {e}", exc_info=True)
-        return run_id, f"Critical error: {e}"
-    finally:
-        # clean up temp renewable CSV
-        if temp_renewable_csv.exists():
-            try:
-                os.remove(temp_renewable_csv)
-                logging.debug(f"Run {run_id}: Cleaned up {temp_renewable_csv}")
-            except OSError as e:
-                logging.error(f"Run {run_id}: Error cleaning up {temp_renewable_csv}: {e}")
-
-def run_batch_simulations(config_path, num_runs=100, output_dir="results/batch_simulations"):
-    """Run multiple simulations and store results in parallel."""
+        return run_id, f"Critical error: {e}", None, None, None
+
+def failed_run_result(task, reason):
+    """Worker result of a run (a list of them for a pipelined chunk) that timed out or crashed its worker on every attempt."""
+    if isinstance(task, list):
+        return [failed_run_result(t, reason) for t in task]
+    return task[0], reason, None, None, None, None
+
+def run_batch_simulations(config_path, num_runs=100, output_dir="results/batch_simulations", adaptive=None, resume=None, queue=None):
+    """
+    Run multiple simulations and store results in parallel.
+
+    Every finished run is appended to <output_dir>/manifest.jsonl (see RunManifest). With `resume`
+    (default: `batch: resume`, true) a restarted batch in the same output directory keeps the
+    manifest's seeds, skips the runs that completed and re-queues the failed and missing ones.
+
+    With `adaptive` (default: `batch: adaptive: enabled`) `num_runs` is a hard cap: runs are
+    submitted until the confidence intervals of the `batch: adaptive: targets` metrics meet their
+    relative precision, and the estimates are written to <output_dir>/convergence.json.
+
+    With a job `queue` URL (default: `batch: queue`) this process is the coordinator of a
+    distributed batch: the runs are put into the queue (`sqlite:///<file>` or `tcp://<host>:<port>`),
+    workers on any host (batch_worker.py, plus `batch: local_workers` started here) claim and solve
+    them, and their tables come back to this process, which writes the ResultsStore and the manifest.
+    """
     # Setup logging for the main process first.
     # Child processes will inherit this or reconfigure if setup_logging is called in worker.
     # For Pool, it's often better to let children inherit or use a logging queue.
@@ -209,41 +496,212 @@ def run_batch_simulations(config_path, num_runs=100, output_dir="results/batch_s
     setup_logging() # Call it once in the main process
 
     config = load_config(config_path)
+    batch_cfg = config.setdefault('batch', {})
+    if adaptive is None:
+        adaptive = batch_cfg.get('adaptive', {}).get('enabled', False)
+    if resume is None:
+        resume = batch_cfg.get('resume', True)
+    if queue is None:
+        queue = batch_cfg.get('queue')
+    if queue and batch_cfg.get('results_format', 'csv') != 'parquet':
+        # Remote workers have no access to the output directory: their tables come back to the coordinator
+        batch_cfg['results_format'] = 'parquet'
+        logging.info("Distributed batch: results are collected in the Parquet ResultsStore.")
+    pipeline_depth = batch_cfg.get('pipeline_depth', 1)
+    if pipeline_depth > 1 and not (queue or batch_cfg.get('shared_data', False)):
+        logging.warning("batch: pipeline_depth needs shared_data or a job queue, runs are not pipelined.")
+        pipeline_depth = 1
+    if pipeline_depth > 1 and config.get('profiling', {}).get('trace_memory', False):
+        # tracemalloc is process-wide, so the peaks of overlapping runs cannot be told apart
+        config['profiling']['trace_memory'] = False
+        logging.warning("Pipelined batch: profiling: trace_memory is ignored.")
     
     config.setdefault('scenario_selection', {})['criteria'] = "random"
     logging.info(f"Batch simulations will use 'random' scenario selection criteria.")
     
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
+
+    # Ingest the raw renewable CSVs once, so that the workers only memory-map the cached cube
+    cube_path = config['data_paths'].get('renewable_cube', DEFAULT_CUBE_PATH)
+    load_renewable_cube("data/raw/renewable", cube_path)
     
     # determine number of processes - leave one core free for now
     num_processes = max(1, os.cpu_count() - 1 if os.cpu_count() else 1) 
-    logging.info(f"Starting batch simulations with {num_runs} runs using up to {num_processes} parallel processes.")
 
-    tasks = [(i, config, str(output_path)) for i in range(num_runs)]
+    store_dir = output_path / "results"
+    if (batch_cfg.get('results_format', 'csv') == 'parquet' and ResultsStore.tables(str(store_dir))
+            and not (resume and (output_path / MANIFEST_FILE).exists())):
+        # A new manifest's runs would mix with the rows of the earlier batch in the store
+        raise ValueError(f"{store_dir} holds the results of an earlier batch: resume it, or use a new --output-dir")
+
+    # Run ids still to do: all of them in a new batch, the failed and missing ones of a resumed batch
+    manifest = RunManifest(str(output_path), seed=batch_cfg.get('seed'), resume=resume)
+    completed = manifest.completed() & set(range(num_runs))
+    run_ids = [i for i in range(num_runs) if i not in completed]
+    if completed:
+        logging.info(f"Resuming batch (seed {manifest.seed}): {len(completed)} runs already completed, {len(run_ids)} to run.")
+    logging.info(f"Starting batch simulations with {len(run_ids)} runs using up to {num_processes} parallel processes.")
+
+    scenario_shm = None
+    if queue:
+        # Every worker host prepares its own system data and scenarios (init_node_worker); tasks are (run id, seed)
+        worker_init = {}
+        worker, tasks = run_shared_simulation_worker, [(i, manifest.run_seed(i)) for i in run_ids]
+    elif config.get('batch', {}).get('shared_data', False):
+        # Load the system data and the aggregated renewable scenarios once in the parent. Workers receive
+        # them once through the pool initializer (the scenario matrix through shared memory); tasks are (run id, seed).
+        paths = config['data_paths']
+        system_data = DataProcessor(paths['generator_csv'], paths['storage_csv'], paths['demand_csv']).prepare_pyomo_data(config)
+        scenario_descriptor, sim_index = None, None
+        if not config['benchmark']:
+            scenarios, sim_index = aggregate_renewable_scenarios("data/raw/renewable", cube_path)
+            scenario_shm, scenario_descriptor = share_array(scenarios)
+        worker_init = dict(
+            initializer=init_batch_worker,
+            initargs=(config, system_data, scenario_descriptor, sim_index, str(output_path)),
+        )
+        worker, tasks = run_shared_simulation_worker, [(i, manifest.run_seed(i)) for i in run_ids]
+    else:
+        worker_init = {}
+        worker, tasks = run_simulation_worker, [(i, config, str(output_path), manifest.run_seed(i)) for i in run_ids]
+
+    timeout, chunk_size = batch_cfg.get('run_timeout_s'), batch_cfg.get('chunk_size', 1)
+    if pipeline_depth > 1:
+        # A task is a chunk of runs that one worker solves through its pipeline; time limits and retries apply to the whole chunk
+        chunk = max(chunk_size, pipeline_depth)
+        worker, tasks = run_pipelined_simulation_worker, [tasks[k:k + chunk] for k in range(0, len(tasks), chunk)]
+        timeout, chunk_size = timeout and timeout * chunk, 1
+        logging.info(f"Pipelined batch: {len(tasks)} chunks of up to {chunk} runs, {pipeline_depth} runs in flight per worker.")
+
+    # Columnar results: the parent is the only writer and appends the tables as the runs complete
+    store = None
+    if batch_cfg.get('results_format', 'csv') == 'parquet':
+        # Manifest entries wait for their part file, so `checkpoint_s` bounds the runs a crash can lose
+        store = ResultsStore(str(output_path / "results"), batch_cfg.get('runs_per_part', 500), batch_cfg.get('checkpoint_s', 60))
 
     results_summary = []
-    with multiprocessing.Pool(processes=num_processes) as pool:
-        # Using map, so worker function takes a single argument (the tuple)
-        # starmap would unpack the tuple into arguments for the worker
-        for result in pool.map(run_simulation_worker, tasks):
-            results_summary.append(result)
-            run_id, status = result
-            if status == "Success":
-                logging.info(f"Main: Noted success for run {run_id}")
-            else:
-                logging.warning(f"Main: Noted failure for run {run_id}: {status}")
+    run_profiles = []
+    monitor = ConvergenceMonitor.from_config(config) if adaptive else None
+    if monitor is not None:
+        for run_id in completed:
+            monitor.update(manifest.runs[run_id].get('metrics') or {})
+    # Manifest entries of runs whose tables are still buffered in the store, written once the store flushes them
+    unflushed = []
+
+    def record(result):
+        """Books one finished run: status, profile, store tables, manifest entry and (adaptive) running statistics."""
+        run_id, status, tables, profile, metrics, elapsed_s = result
+        results_summary.append((run_id, status))
+        if profile is not None:
+            run_profiles.append(dict(profile, status=status))
+        if status == "Success":
+            logging.info(f"Main: Noted success for run {run_id}")
+        else:
+            logging.warning(f"Main: Noted failure for run {run_id}: {status}")
+        if monitor is not None and metrics is not None:
+            monitor.update(metrics)
+        if store is None:
+            output = str(output_path / f"run_{run_id:03d}") if status == "Success" else None
+            manifest.record(run_id, status, elapsed_s, output, metrics)
+            return
+        # Failed runs only get their row in the `runs` table
+        unflushed.append((run_id, status, elapsed_s, store.store_dir, metrics))
+        if store.append(run_id, dict(tables or {}, runs=pd.DataFrame({'status': [status]}))):
+            flush_manifest()
 
+    def flush_manifest():
+        for entry in unflushed:
+            manifest.record(*entry)
+        unflushed.clear()
+
+    job_queue, local_workers = None, []
+    if queue:
+        # Coordinator: a task claimed longer than the lease ago (lost or hung worker host) is requeued
+        lease_s = batch_cfg.get('queue_lease_s')
+        if lease_s is None:
+            lease_s = DEFAULT_LEASE_S * (len(tasks[0]) if tasks and isinstance(tasks[0], list) else 1)
+            logging.warning(f"No batch: queue_lease_s configured, runs of lost workers are requeued after {lease_s:g}s")
+        authkey = queue_authkey(config)
+        job_queue = open_job_queue(queue, authkey, server=True)
+        job_queue.publish(config)
+        scheduler = DistributedScheduler(
+            job_queue, lease_s=lease_s, max_retries=batch_cfg.get('max_retries', 1),
+            poll_s=batch_cfg.get('queue_poll_s', 1.0), on_failure=failed_run_result,
+        )
+        for _ in range(batch_cfg.get('local_workers', 0) if tasks else 0):
+            process = multiprocessing.Process(
+                target=run_queue_worker, args=(job_queue.client_url(), run_node_simulation_worker, init_node_worker, authkey,
+                      batch_cfg.get('queue_poll_s', 1.0)),
+            )
+            process.start()
+            local_workers.append(process)
+        logging.info(f"Coordinator: {len(run_ids)} runs queued on {queue}, {len(local_workers)} local workers.")
+    else:
+        # Runs stream back in completion order; a run over `run_timeout_s` has its worker killed and is retried
+        scheduler = TaskScheduler(
+            worker, num_processes, timeout=timeout, max_retries=batch_cfg.get('max_retries', 1),
+            chunk_size=chunk_size, on_failure=failed_run_result, **worker_init,
+        )
+    progress = ProgressReporter(len(run_ids), batch_cfg.get('progress_interval_s', 10))
+    # A resumed adaptive batch may already meet the targets with the runs of the manifest
+    converged = monitor is not None and monitor.converged()
+    try:
+        if tasks and not converged:
+            for _, task_result in scheduler.run(tasks):
+                # A pipelined chunk returns the results of all its runs
+                for result in (task_result if isinstance(task_result, list) else [task_result]):
+                    record(result)
+                    progress.update(failed=result[1] != "Success")
+                    if monitor is not None and not converged and monitor.converged():
+                        converged = True
+                        status = ", ".join(f"{m} {r['mean']:.4g} +/- {r['relative_half_width']:.2%}" for m, r in monitor.report().items())
+                        logging.info(f"Main: precision targets met after {monitor.count} successful runs ({status}), finishing the runs already started")
+                        scheduler.stop()
+            if monitor is not None and not converged:
+                logging.warning(f"Main: hard cap reached before the precision targets were met: {monitor.report()}")
+    finally:
+        if store is not None:
+            store.close()
+            flush_manifest()
+        manifest.close()
+        if scenario_shm is not None:
+            release_array(scenario_shm)
+        if job_queue is not None:
+            job_queue.close_batch()
+            for process in local_workers:
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+            job_queue.close()
 
     successful_runs = sum(1 for _, status in results_summary if status == "Success")
-    failed_runs = num_runs - successful_runs
-    logging.info(f"Completed all {num_runs} simulation tasks.")
+    failed_runs = len(results_summary) - successful_runs
+    logging.info(f"Completed {len(results_summary)} of {len(run_ids)} simulation tasks ({len(completed)} completed before).")
     logging.info(f"Successful runs: {successful_runs}")
     logging.info(f"Failed runs: {failed_runs}")
     if failed_runs > 0:
         logging.warning("Some runs failed. Check logs for details.")
 
-    logging.info(f"Per-run data saved to {output_path}")
+    if run_profiles:
+        # Per-run stage timings of all workers and their aggregate over the batch
+        profile_path = output_path / "profile.json"
+        with open(profile_path, 'w') as f:
+            json.dump({'summary': aggregate_profiles(run_profiles), 'runs': run_profiles}, f, indent=2)
+        logging.info(f"Stage timings saved to {profile_path}")
+
+    if monitor is not None:
+        # Estimates of the target metrics with their confidence intervals at the point the batch stopped
+        convergence_path = output_path / "convergence.json"
+        with open(convergence_path, 'w') as f:
+            json.dump({'converged': monitor.converged(), 'runs': monitor.count, 'max_runs': num_runs,
+                       'confidence': monitor.confidence, 'metrics': monitor.report()}, f, indent=2)
+        logging.info(f"Convergence report saved to {convergence_path}")
+
+    if store is not None:
+        logging.info(f"Batch results saved to {store.store_dir} (load with ResultsStore.load)")
+    else:
+        logging.info(f"Per-run data saved to {output_path}")
 
 
 if __name__ == "__main__":
@@ -254,9 +712,15 @@ if __name__ == "__main__":
     parser.add_argument("--config", default="config/model_config.yaml",
                       help="Path to configuration file")
     parser.add_argument("--num-runs", type=int, default=5,
-                      help="Number of simulation runs")
+                      help="Number of simulation runs (the hard cap with --adaptive)")
     parser.add_argument("--output-dir", default="results/batch_simulations",
                       help="Output directory for results")
+    parser.add_argument("--adaptive", action="store_true", default=None,
+                      help="Stop once the precision targets of `batch: adaptive` are met")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", default=None,
+                      help="Start a new manifest instead of resuming the batch in --output-dir")
+    parser.add_argument("--queue", default=None,
+                      help="Coordinate a distributed batch through this job queue (sqlite:///<file> or tcp://<host>:<port>)")
     args = parser.parse_args()
     
-    run_batch_simulations(args.config, args.num_runs, args.output_dir) 
\ No newline at end of file
+    run_batch_simulations(args.config, args.num_runs, args.output_dir, args.adaptive, args.resume, args.queue) 
\ No newline at end of file
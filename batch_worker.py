@@ -0,0 +1,65 @@
+import os
+import sys
+import argparse
+import logging
+import multiprocessing
+
+sys.path.append('./src')
+
+from data_utils.job_queue import run_queue_worker
+from batch_simulation import (
+    setup_logging,
+    load_config,
+    queue_authkey,
+    init_node_worker,
+    run_node_simulation_worker
+)
+
+def run_batch_worker(config_path, queue=None, processes=None):
+    """
+    Worker host of a distributed batch: starts `processes` workers that claim runs from the job
+    queue of a coordinator (batch_simulation.py --queue), solve them and push their results back.
+
+    The run specifications and the batch config come from the coordinator; this host only needs
+    the repository with its input data. The local config file provides the queue URL and the
+    tcp queue authkey (`batch: queue`, `batch: queue_authkey` or BATCH_QUEUE_AUTHKEY). Workers
+    exit when the coordinator closes the batch.
+    """
+    if multiprocessing.get_start_method(allow_none=True) is None:
+        multiprocessing.set_start_method("spawn", force=True)
+    setup_logging()
+
+    config = load_config(config_path)
+    queue = queue or config.get('batch', {}).get('queue')
+    if not queue:
+        raise ValueError("No job queue given (--queue or batch: queue)")
+    if processes is None:
+        processes = max(1, os.cpu_count() - 1 if os.cpu_count() else 1)
+    authkey = queue_authkey(config)
+    poll_s = config.get('batch', {}).get('queue_poll_s', 1.0)
+
+    logging.info(f"Starting {processes} batch workers on {queue}")
+    workers = [
+        multiprocessing.Process(
+            target=run_queue_worker, args=(queue, run_node_simulation_worker, init_node_worker, authkey, poll_s)
+        )
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    logging.info("Batch closed by the coordinator, workers stopped.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run batch simulations claimed from a coordinator's job queue")
+    parser.add_argument("--config", default="config/model_config.yaml",
+                        help="Path to configuration file (queue URL and authkey)")
+    parser.add_argument("--queue", default=None,
+                        help="Job queue of the coordinator (sqlite:///<file> or tcp://<host>:<port>), overrides batch: queue")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Worker processes on this host (default: all cores but one)")
+    args = parser.parse_args()
+
+    run_batch_worker(args.config, args.queue, args.processes)
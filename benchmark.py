@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import yaml
+import logging
+import argparse
+import platform
+import subprocess
+import statistics
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import pyomo.environ as pyo
+
+sys.path.append('./src')
+
+from models.DAFOModel import DAFOModel
+from models.RTSimModel import RTSimModel
+from models.DAFOMatrixModel import DAFOMatrixModel
+from models.RTSimMatrixModel import RTSimMatrixModel
+from models.solver_utils import ModelSolver
+from data_utils.extract_da import extract_da
+from data_utils.profiling import StageProfiler, peak_rss_mb
+from data_utils.synthetic_system import synthetic_config, generate_synthetic_system
+
+# Version of the baseline file layout, bumped when the recorded metrics change meaning
+BASELINE_VERSION = 1
+
+# Per-case metrics: timings (median over the repeats) and problem sizes
+TIME_METRICS = ['build_s', 'solve_s', 'extract_s', 'da_build_s', 'da_solve_s', 'rt_build_s', 'rt_solve_s']
+SIZE_METRICS = ['da_nnz', 'rt_nnz', 'peak_rss_mb']
+
+def setup_logging():
+    """Configures logging for the script."""
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+
+def load_config(config_path):
+    """Load configuration from YAML file."""
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+def count_nonzeros(instance):
+    """Nonzeros of the constraint matrix of a matrix-backend or Pyomo instance."""
+    if hasattr(instance, 'nnz'):
+        return int(instance.nnz)
+    from pyomo.repn import generate_standard_repn
+    return sum(
+        len(generate_standard_repn(con.body, compute_values=False, quadratic=False).linear_vars)
+        for con in instance.component_data_objects(pyo.Constraint, active=True)
+    )
+
+def solve_instance(instance, config, solver):
+    """Solves a built instance (in-process HiGHS for the matrix backend) and returns its termination condition."""
+    if solver is None:
+        return instance.solve(config.get('matrix_solver_options', {}))
+    result = solver.solve(instance)
+    return str(result.solver.termination_condition)
+
+def run_case(case, base_config, backend, solver_name, repeats, seed):
+    """
+    Runs DAFO and RTSim end to end on a synthetic system of the size of `case` and returns its metrics.
+
+    Each repeat builds and solves both models from scratch; times are the median over the repeats.
+    Meant to run in a fresh process, so that `peak_rss_mb` is the peak of this case alone.
+    """
+    config = synthetic_config(
+        base_config, case['generators'], case['storage'], case['tiers'], case['scenarios'], case['periods']
+    )
+    config['model_backend'] = backend
+    data = generate_synthetic_system(config, seed=seed)
+    if backend == 'matrix':
+        dafo_model, rt_model, solver = DAFOMatrixModel(config), RTSimMatrixModel(config), None
+    else:
+        dafo_model, rt_model, solver = DAFOModel(config), RTSimModel(config), ModelSolver({'name': solver_name})
+
+    runs = []
+    for _ in range(repeats):
+        profiler = StageProfiler()
+        with profiler.stage('da_build'):
+            da_instance = dafo_model.create_instance(data)
+        with profiler.stage('da_solve'):
+            da_status = solve_instance(da_instance, config, solver)
+        with profiler.stage('extract'):
+            dataRT = extract_da(da_instance, data)[0]
+        with profiler.stage('rt_build'):
+            rt_instance = rt_model.create_instance(dataRT)
+        with profiler.stage('rt_solve'):
+            rt_status = solve_instance(rt_instance, config, solver)
+        runs.append({name: entry['wall_s'] for name, entry in profiler.stages.items()})
+
+    metrics = {f'{stage}_s': statistics.median(run[stage] for run in runs)
+               for stage in ('da_build', 'da_solve', 'rt_build', 'rt_solve', 'extract')}
+    metrics.update({
+        'da_nnz': count_nonzeros(da_instance),
+        'rt_nnz': count_nonzeros(rt_instance),
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    metrics['build_s'] = metrics['da_build_s'] + metrics['rt_build_s']
+    metrics['solve_s'] = metrics['da_solve_s'] + metrics['rt_solve_s']
+    return {'size': {k: case[k] for k in ('generators', 'storage', 'tiers', 'scenarios', 'periods')},
+            'status': {'da': da_status, 'rt': rt_status},
+            'metrics': metrics}
+
+def run_suite(suite, base_config, backend, solver_name, repeats, seed, case_names=None):
+    """Runs every case of the suite, each in a fresh process. Returns {case name: result}."""
+    results = {}
+    spawn = multiprocessing.get_context('spawn')
+    for case in suite['cases']:
+        if case_names and case['name'] not in case_names:
+            continue
+        logging.info(f"Running case {case['name']}: {case['generators']} generators, {case['storage']} storage, "
+                     f"{case['tiers']} tiers, {case['scenarios']} scenarios, {case['periods']} periods")
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            result = pool.submit(run_case, case, base_config, backend, solver_name, repeats, seed).result()
+        m = result['metrics']
+        logging.info(f"  build {m['build_s']:.3f}s, solve {m['solve_s']:.3f}s, extract {m['extract_s']:.3f}s, "
+                     f"nnz {m['da_nnz']}/{m['rt_nnz']}, peak RSS {m['peak_rss_mb']} MB, status {result['status']}")
+        results[case['name']] = result
+    return results
+
+def git_commit():
+    """Current git commit of the working tree, or None outside a repository."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_baseline(results, backend, solver_name, repeats, seed):
+    """Wraps the case results with the version and environment information of a baseline file."""
+    return {
+        'version': BASELINE_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': backend,
+        'solver': 'highs' if backend == 'matrix' else solver_name,
+        'repeats': repeats,
+        'seed': seed,
+        'cases': results,
+    }
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Compares case results to a baseline. A time metric regresses if it is more than `tolerance`
+    (relative) slower than the baseline, a size metric if it grew at all (peak RSS: beyond the tolerance).
+
+    Returns:
+        tuple: (list of report lines, number of regressions)
+    """
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"Baseline version {baseline.get('version')} does not match the benchmark version {BASELINE_VERSION}")
+    lines, regressions = [], 0
+    for name, result in results.items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            lines.append(f"{name}: not in baseline")
+            continue
+        if base['size'] != result['size']:
+            lines.append(f"{name}: size changed from {base['size']} to {result['size']}, not compared")
+            continue
+        for metric in TIME_METRICS + SIZE_METRICS:
+            old, new = base['metrics'].get(metric), result['metrics'].get(metric)
+            if old is None or new is None:
+                continue
+            if old:
+                ratio = new / old
+            else:
+                ratio = float('inf') if new else 1.0
+            allowed = 1.0 if metric.endswith('_nnz') else 1.0 + tolerance
+            flag = ''
+            if ratio > allowed:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif ratio < 1.0 - tolerance:
+                flag = '  improved'
+            lines.append(f"{name:>16} {metric:>12}: {old:12.4g} -> {new:12.4g} ({ratio:6.2f}x){flag}")
+    return lines, regressions
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Benchmark DAFO and RTSim on synthetic systems of configurable size.")
+    parser.add_argument("--config", default="config/model_config.yaml",
+                        help="Model configuration (FO parameters, formulation options), default is config/model_config.yaml.")
+    parser.add_argument("--suite", default="config/benchmark_config.yaml",
+                        help="Benchmark suite with the case sizes, default is config/benchmark_config.yaml.")
+    parser.add_argument("--cases", nargs="+", help="Run only these cases of the suite.")
+    parser.add_argument("--backend", choices=['matrix', 'pyomo'], default='matrix',
+                        help="Model backend: 'matrix' solves in-process with HiGHS, 'pyomo' uses --solver. Default is matrix.")
+    parser.add_argument("--solver", default="appsi_highs",
+                        help="Pyomo solver of the pyomo backend (must support QP objectives and duals), default is appsi_highs.")
+    parser.add_argument("--repeats", type=int, help="Repeats per case (overrides the suite value).")
+    parser.add_argument("--output", help="Write the results as a baseline file to this path.")
+    parser.add_argument("--compare", help="Compare the results to this baseline file; exits with 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative slowdown of a time metric that counts as a regression, default is 0.25.")
+    args = parser.parse_args()
+
+    base_config = load_config(args.config)
+    suite = load_config(args.suite)
+    repeats = args.repeats or suite.get('repeats', 3)
+    seed = suite.get('seed', 0)
+
+    results = run_suite(suite, base_config, args.backend, args.solver, repeats, seed, args.cases)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(make_baseline(results, args.backend, args.solver, repeats, seed), f, indent=2)
+        logging.info(f"Baseline written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare_to_baseline(results, baseline, args.tolerance)
+        print(f"Comparison with {args.compare} (commit {baseline.get('git_commit')}, {baseline.get('created')}):")
+        print("\n".join(lines))
+        if regressions:
+            logging.warning(f"{regressions} metric(s) regressed beyond the tolerance.")
+            sys.exit(1)
+        logging.info("No regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,11 @@ sys.path.append('./src')
 
 from models.DAFOModel import DAFOModel
 from models.RTSimModel import RTSimModel
+from models.DAFOMatrixModel import DAFOMatrixModel
+from models.RTSimMatrixModel import RTSimMatrixModel
+from models.RTSimDecomposedModel import RTSimDecomposedModel
+from models.RTSimMeritOrderModel import RTSimMeritOrderModel
+from models.solver_utils import ModelSolver
 from data_utils.DataProcessor import DataProcessor
 from data_utils.extract_da import extract_da
 from data_utils.results_processing import (
@@ -21,8 +26,11 @@ from data_utils.results_processing import (
     calculate_premium_convergence,
     calculate_total_margins
 )
-from data_utils.scenario_generation import scenario_generation
+from data_utils.scenario_generation import scenario_generation, load_scenario_probabilities, scenario_probabilities_path
+from data_utils.data_cache import pyomo_data_cache_key, load_cached_pyomo_data, save_cached_pyomo_data
+from data_utils.results_io import save_results_tables, FORMATS
 from data_utils.gen_flag import add_flag_column  # Import the flag function
+from data_utils.profiling import StageProfiler, PROFILE_FILE
 
 def setup_logging():
     """Configures logging for the script."""
@@ -50,7 +58,13 @@ def ensure_dir_exists(path):
     logging.debug(f"Ensured directory exists: {path}")
 
 def preprocess_data(config):
-    """Loads and preprocesses data using DataProcessor."""
+    """
+    Loads and preprocesses data using DataProcessor.
+
+    With `data_paths: pyomo_data_cache` set, the prepared data is stored under a hash of the
+    input files and the relevant config keys; a later run with the same inputs loads it
+    without parsing anything (the DataProcessor returned is then None).
+    """
     paths = config['data_paths']
     general_cfg = config['general']
     
@@ -72,13 +86,32 @@ def preprocess_data(config):
         logging.info(f"Renewable generation scenario data saved to {renewable_output_file}")
     else:
         logging.info(f"Using existing renewable generation scenarios: {renewable_output_file}")
+
+    cache_dir = paths.get('pyomo_data_cache')
+    if cache_dir:
+        cache_key = pyomo_data_cache_key(
+            [paths['generator_csv'], paths['storage_csv'], paths['demand_csv'], paths['renewable_csv'],
+             scenario_probabilities_path(paths['renewable_csv'])],
+            config,
+        )
+        pyomo_system_data = load_cached_pyomo_data(cache_dir, cache_key)
+        if pyomo_system_data is not None:
+            logging.info(f"System data loaded from cache {cache_dir} (key {cache_key[:16]}).")
+            return pyomo_system_data, None
         
     # Add flag to generators to identify flexibility sellers and buyers
     gen_data = pd.read_csv(paths['generator_csv'])
     gen_data = add_flag_column(gen_data)
     gen_processed_path = os.path.join(processed_data_dir, "gen.csv") 
-    gen_data.to_csv(gen_processed_path, index=False)
-    logging.info(f"Generator data with flags saved to {gen_processed_path}")
+    gen_csv = gen_data.to_csv(index=False)
+    existing_csv = None
+    if os.path.exists(gen_processed_path):
+        with open(gen_processed_path, newline='') as f:
+            existing_csv = f.read()
+    if existing_csv != gen_csv: # rewritten only when the flagged data changed
+        with open(gen_processed_path, 'w', newline='') as f:
+            f.write(gen_csv)
+        logging.info(f"Generator data with flags saved to {gen_processed_path}")
     
     # Update paths to use processed data
     gen_csv_path = gen_processed_path
@@ -92,48 +125,68 @@ def preprocess_data(config):
         paths['renewable_csv']
     )
     
+    # Probabilities of reduced scenarios, if the renewable scenarios came from a scenario reduction
+    scenario_probabilities = load_scenario_probabilities(paths['renewable_csv'])
+    if scenario_probabilities is not None:
+        logging.info(f"Using scenario probabilities: {scenario_probabilities.round(4).tolist()}")
+
     # DataProcessor.load_data is called within prepare_pyomo_data if needed
-    pyomo_system_data = system_data.prepare_pyomo_data(config)
+    pyomo_system_data = system_data.prepare_pyomo_data(config, scenario_probabilities=scenario_probabilities)
     
     if pyomo_system_data is None:
         logging.error("Failed to prepare Pyomo data.")
         sys.exit(1)
         
     logging.info("System data processed successfully.")
+    if cache_dir:
+        save_cached_pyomo_data(cache_dir, cache_key, pyomo_system_data)
+        logging.info(f"System data cached in {cache_dir}.")
     return pyomo_system_data, system_data # Return system_data if needed later
 
-def run_da_model(config, pyomo_system_data):
-    """Instantiates and solves the DAFO model."""
+def run_da_model(config, pyomo_system_data, profiler=None):
+    """Instantiates and solves the DAFO model. Build and solve are timed as stages of `profiler`, if given."""
+    profiler = profiler or StageProfiler(enabled=False)
     logging.info("Setting up and solving Day-Ahead (DAFO) model...")
-    dafo_model = DAFOModel(config)
+    backend = config.get('model_backend', 'pyomo')
+    if backend == 'matrix':
+        dafo_model = DAFOMatrixModel(config)
+    else:
+        dafo_model = DAFOModel(config)
     
     try:
-        da_instance = dafo_model.create_instance(pyomo_system_data)
+        with profiler.stage('da_build'):
+            da_instance = dafo_model.create_instance(pyomo_system_data)
     except Exception as e:
         logging.error(f"Error creating DAFO model instance: {e}")
         sys.exit(1)
 
-    solver_cfg = config['solver']
-    solver_name = solver_cfg['name']
-    solver_exec = solver_cfg.get('executable')
-    solver_options = solver_cfg.get('options', {})
-    
-    opt = pyo.SolverFactory(solver_name, executable=solver_exec)
-    
-    # Add options if provided
-    for key, value in solver_options.items():
-        if key != 'tee': # tee handled separately
-            opt.options[key] = value
+    # Shell solver (LP file + subprocess) or in-process APPSI/persistent interface, by solver name
+    opt = ModelSolver(config['solver'])
+
+    if backend == 'matrix':
+        # The matrix backend is solved in-process with HiGHS, independently of the configured solver
+        try:
+            with profiler.stage('da_solve'):
+                termination = da_instance.solve(config.get('matrix_solver_options', {}))
+        except Exception as e:
+            logging.error(f"Error solving DAFO model: {e}")
+            sys.exit(1)
+        if termination == 'optimal':
+            logging.info("DAFO model solved successfully.")
+        else:
+            logging.warning(f"DAFO model solved with condition: {termination}")
+        return da_instance, opt
     
     try:        
-        result = opt.solve(da_instance, tee=solver_options.get('tee', False))
+        with profiler.stage('da_solve'):
+            result = opt.solve(da_instance)
     except Exception as e:
         logging.error(f"Error solving DAFO model: {e}")
         sys.exit(1)
+    profiler.record_solver_time('da_solve', result)
 
     # Basic check of solver status
-    if (result.solver.status == pyo.SolverStatus.ok) and \
-       (result.solver.termination_condition == pyo.TerminationCondition.optimal):
+    if ModelSolver.is_optimal(result):
         logging.info("DAFO model solved successfully.")
     else:
         logging.warning(f"DAFO model solved with status: {result.solver.status}, condition: {result.solver.termination_condition}")
@@ -142,28 +195,68 @@ def run_da_model(config, pyomo_system_data):
 
     return da_instance, opt # Return solver for reuse
 
-def run_rt_model(config, dataRT, solver):
-    """Instantiates and solves the RTSim model."""
+def run_rt_model(config, dataRT, solver, profiler=None):
+    """Instantiates and solves the RTSim model. Build and solve are timed as stages of `profiler`, if given."""
+    profiler = profiler or StageProfiler(enabled=False)
     logging.info("Setting up and solving Real-Time (RTSim) model...")
-    rt_sim_model = RTSimModel(config) 
+    rt_method = config.get('rt_simulation', {}).get('method', 'joint')
+    if rt_method in ('decomposed', 'merit_order'):
+        # Independent per-scenario subproblems solved in parallel, or the closed-form storage-free dispatch
+        try:
+            with profiler.stage('rt_solve'):
+                if rt_method == 'decomposed':
+                    rt_model = RTSimDecomposedModel(config)
+                    try:
+                        rt_instance = rt_model.solve(dataRT)
+                    finally:
+                        rt_model.close()
+                else:
+                    rt_instance = RTSimMeritOrderModel(config).solve(dataRT)
+        except Exception as e:
+            logging.error(f"Error solving RTSim model: {e}")
+            sys.exit(1)
+        if rt_instance.termination_condition == 'optimal':
+            logging.info("RTSim model solved successfully.")
+        else:
+            logging.warning(f"RTSim model solved with condition: {rt_instance.termination_condition}")
+        return rt_instance
+
+    backend = config.get('model_backend', 'pyomo')
+    if backend == 'matrix':
+        rt_sim_model = RTSimMatrixModel(config)
+    else:
+        rt_sim_model = RTSimModel(config) 
     
     try:
-        rt_instance = rt_sim_model.create_instance(dataRT)
+        with profiler.stage('rt_build'):
+            rt_instance = rt_sim_model.create_instance(dataRT)
     except Exception as e:
         logging.error(f"Error creating RTSim model instance: {e}")
         sys.exit(1)
-    
-    solver_options = config['solver'].get('options', {})
+
+    if backend == 'matrix':
+        try:
+            with profiler.stage('rt_solve'):
+                termination = rt_instance.solve(config.get('matrix_solver_options', {}))
+        except Exception as e:
+            logging.error(f"Error solving RTSim model: {e}")
+            sys.exit(1)
+        if termination == 'optimal':
+            logging.info("RTSim model solved successfully.")
+        else:
+            logging.warning(f"RTSim model solved with condition: {termination}")
+        return rt_instance
     
     try:
-        result = solver.solve(rt_instance, tee=solver_options.get('tee', False))
+        with profiler.stage('rt_solve'):
+            result = solver.solve(rt_instance)
     except Exception as e:
         logging.error(f"Error solving RTSim model: {e}")
         sys.exit(1)
+    profiler.record_solver_time('rt_solve', result)
 
     # Basic check of solver status
-    if (result.solver.status == pyo.SolverStatus.ok) and \
-       (result.solver.termination_condition == pyo.TerminationCondition.optimal):
+    if ModelSolver.is_optimal(result):
         logging.info("RTSim model solved successfully.")
     else:
         logging.warning(f"RTSim model solved with status: {result.solver.status}, condition: {result.solver.termination_condition}")
@@ -171,16 +264,33 @@ def run_rt_model(config, dataRT, solver):
 
     return rt_instance
 
-def process_and_save_results(da_instance, rt_instance, pyomo_system_data, dataRT, config, results_dir="results"):
-    """Extracts results, calculates metrics, and saves to Excel."""
+# Results tables and their Excel sheet names
+RESULT_SHEETS = {
+    'rt_margins': 'RT Margins',
+    'rt_payoffs': 'RT Payoffs',
+    'system_metrics': 'System Metrics',
+    'premium_convergence': 'Premium Convergence',
+    'total_margins': 'Total Margins',
+    'fo_supply_awards': 'FO Supply AWARDS',
+    'fo_demand_awards': 'FO Demand AWARDS',
+    'da_energy': 'DA Energy',
+    'da_prices': 'DA Prices',
+}
+
+def process_and_save_results(da_instance, rt_instance, pyomo_system_data, dataRT, config, results_dir="results", output_format="parquet", profiler=None):
+    """
+    Extracts results, calculates metrics, and saves them as one Parquet/Feather file per table
+    plus a JSON manifest (see data_utils.results_io), or as sheets of results.xlsx with output_format "excel".
+    """
+    profiler = profiler or StageProfiler(enabled=False)
     logging.info("Processing and saving results...")
     ensure_dir_exists(results_dir)
-    output_excel_path = os.path.join(results_dir, "results.xlsx")
 
     # Extract DA results needed for RT data prep and final results
     logging.info("Extracting DA results...")
     try:
-        dataRT_extract, total_da, df, demand, Energy, Prices, Gross_margins = extract_da(da_instance, pyomo_system_data)
+        with profiler.stage('results_extract_da'):
+            dataRT_extract, total_da, df, demand, Energy, Prices, Gross_margins = extract_da(da_instance, pyomo_system_data)
         if dataRT_extract is None:
             raise Exception("Failed to extract DA results properly")
     except Exception as e:
@@ -189,30 +299,34 @@ def process_and_save_results(da_instance, rt_instance, pyomo_system_data, dataRT
 
     logging.info("Calculating RT metrics...")
     try:
-        RTmargins = calculate_rt_margins(rt_instance, dataRT) 
-        RTpayoffs = calculate_rt_payoffs(rt_instance, dataRT, df) 
-        Total = calculate_system_metrics(rt_instance, dataRT, total_da) 
-        premium_convergence = calculate_premium_convergence(Gross_margins, RTpayoffs)
-        Total_margin = calculate_total_margins(rt_instance, dataRT, Gross_margins, RTmargins, RTpayoffs, premium_convergence, total_da)
+        with profiler.stage('results_metrics'):
+            RTmargins = calculate_rt_margins(rt_instance, dataRT) 
+            RTpayoffs = calculate_rt_payoffs(rt_instance, dataRT, df) 
+            Total = calculate_system_metrics(rt_instance, dataRT, total_da) 
+            premium_convergence = calculate_premium_convergence(Gross_margins, RTpayoffs)
+            Total_margin = calculate_total_margins(rt_instance, dataRT, Gross_margins, RTmargins, RTpayoffs, premium_convergence, total_da)
     except Exception as e:
         logging.error(f"Error calculating RT metrics: {e}")
         sys.exit(1)
 
-    logging.info(f"Saving results to {output_excel_path}...")
+    tables = {
+        'rt_margins': RTmargins,
+        'rt_payoffs': RTpayoffs,
+        'system_metrics': Total,
+        'premium_convergence': premium_convergence,
+        'total_margins': Total_margin,
+        'fo_supply_awards': df,
+        'fo_demand_awards': demand,
+        'da_energy': Energy,
+        'da_prices': Prices,
+    }
+    logging.info(f"Saving results to {results_dir} ({output_format})...")
     try:
-        with pd.ExcelWriter(output_excel_path) as writer:
-            RTmargins.to_excel(writer, sheet_name='RT Margins')
-            RTpayoffs.to_excel(writer, sheet_name='RT Payoffs')
-            Total.to_excel(writer, sheet_name='System Metrics')
-            premium_convergence.to_excel(writer, sheet_name='Premium Convergence')
-            Total_margin.to_excel(writer, sheet_name='Total Margins')
-            df.to_excel(writer, sheet_name='FO Supply AWARDS')
-            demand.to_excel(writer, sheet_name='FO Demand AWARDS')
-            Energy.to_excel(writer, sheet_name='DA Energy')
-            Prices.to_excel(writer, sheet_name='DA Prices')
-        logging.info("Results saved successfully.")
+        with profiler.stage('results_save'):
+            output_path = save_results_tables(tables, results_dir, output_format, sheet_names=RESULT_SHEETS)
+        logging.info(f"Results saved successfully to {output_path}.")
     except Exception as e:
-        logging.error(f"Error saving results to Excel: {e}")
+        logging.error(f"Error saving results as {output_format}: {e}")
 
 def main():
     """Main execution function."""
@@ -223,8 +337,12 @@ def main():
                         help="Path to the configuration YAML file, default is config/model_config.yaml.")
     parser.add_argument("--results-dir", default="results",
                         help="Directory to save output results, default is results.")
+    parser.add_argument("--output-format", default="parquet", choices=sorted(FORMATS) + ['excel'],
+                        help="Format of the saved results: one parquet/feather file per table plus manifest.json, or results.xlsx with excel. Default is parquet.")
     parser.add_argument("--benchmark", type=str, choices=['true', 'false'],
                         help="Enable or disable benchmark mode (overrides config file value). Example: --benchmark true")
+    parser.add_argument("--profile", choices=['time', 'memory'],
+                        help="Record per-stage wall/CPU time (and tracemalloc peak memory with 'memory') to <results-dir>/profile.json, overriding the profiling config.")
     args = parser.parse_args()
 
     config = load_config(args.config)
@@ -234,21 +352,33 @@ def main():
         config['benchmark'] = (args.benchmark.lower() == 'true')
         logging.info(f"Benchmark mode overridden by CLI: {config['benchmark']}")
     
-    pyomo_system_data, _ = preprocess_data(config) # system_data object ignored for now
+    # Per-stage wall/CPU time (and tracemalloc peaks) of this run, written to <results-dir>/profile.json
+    profiler = StageProfiler.from_config(config)
+    if args.profile:
+        profiler = StageProfiler(trace_memory=args.profile == 'memory')
+
+    with profiler.stage('preprocess'):
+        pyomo_system_data, _ = preprocess_data(config) # system_data object ignored for now
     
-    da_instance, solver = run_da_model(config, pyomo_system_data)
+    da_instance, solver = run_da_model(config, pyomo_system_data, profiler)
     
     # Extract data for RT model
     logging.info("Preparing data for RT model...")
-    dataRT, _, _, _, _, _, _ = extract_da(da_instance, pyomo_system_data) 
+    with profiler.stage('extract_da'):
+        dataRT, _, _, _, _, _, _ = extract_da(da_instance, pyomo_system_data) 
     
     if dataRT is None:
         logging.error("Failed to extract data for RT model.")
         sys.exit(1)
     
-    rt_instance = run_rt_model(config, dataRT, solver)
+    rt_instance = run_rt_model(config, dataRT, solver, profiler)
     
-    process_and_save_results(da_instance, rt_instance, pyomo_system_data, dataRT, config, args.results_dir)
+    process_and_save_results(da_instance, rt_instance, pyomo_system_data, dataRT, config, args.results_dir, args.output_format, profiler)
+
+    if profiler.enabled:
+        profile_path = profiler.write_json(os.path.join(args.results_dir, PROFILE_FILE))
+        profiler.close()
+        logging.info(f"Stage timings saved to {profile_path}")
 
     logging.info("Analysis complete.")
 
@@ -0,0 +1,173 @@
+import pandas as pd
+import os
+import sys
+import logging
+import argparse
+import itertools
+import multiprocessing
+from pathlib import Path
+
+sys.path.append('./src')
+
+from data_utils.DataProcessor import DataProcessor
+from data_utils.scenario_generation import scenario_generation
+from data_utils.results_processing import summarize_run
+from batch_simulation import setup_logging, load_config, run_single_simulation
+
+# Parameters a sweep point can override. All of them are mutable in the DAFO/RTSim models, so a
+# point only re-parameterizes the persistent instances of the worker. VC_scale multiplies VC, VCUP and VCDN.
+SCALAR_PARAMS = ['D1', 'D2', 'PEN', 'PENDN', 'smallM']
+TIER_PARAMS = ['probTU', 'probTD']
+SWEEP_PARAMS = SCALAR_PARAMS + TIER_PARAMS + ['VC_scale']
+
+def _serpentine_product(values):
+    """Cartesian product in which consecutive points differ in one parameter by one grid step."""
+    if not values:
+        return [()]
+    rest = _serpentine_product(values[1:])
+    return [(v,) + point for k, v in enumerate(values[0]) for point in (rest if k % 2 == 0 else rest[::-1])]
+
+def sweep_points(sweep_cfg):
+    """
+    Sweep points from the `sweep` config block: the explicit `points` list of overrides, or the
+    Cartesian product of the `grid` values. With `warm_start` the grid is walked in serpentine
+    order, so that every point is a neighbour of the one solved before it.
+
+    Returns:
+        list: One {parameter: value} dict per point.
+    """
+    if sweep_cfg.get('points'):
+        points = [dict(point) for point in sweep_cfg['points']]
+    else:
+        grid = sweep_cfg.get('grid') or {}
+        if not grid:
+            raise ValueError("The sweep needs a 'grid' or a list of 'points'")
+        names, values = list(grid), [list(v) for v in grid.values()]
+        product = _serpentine_product(values) if sweep_cfg.get('warm_start', True) else itertools.product(*values)
+        points = [dict(zip(names, point)) for point in product]
+    unknown = sorted({name for point in points for name in point} - set(SWEEP_PARAMS))
+    if unknown:
+        raise ValueError(f"Parameters {unknown} cannot be swept, choose from {SWEEP_PARAMS}")
+    return points
+
+def apply_overrides(system_data, point):
+    """
+    Pyomo data of a sweep point: a shallow copy of `system_data` with the overridden parameters
+    replaced. Scalars are given as values, probTU/probTD as a list or a {tier: value} mapping.
+    """
+    data = dict(system_data[None])
+    for name, value in point.items():
+        if name in SCALAR_PARAMS:
+            data[name] = {None: value}
+        elif name in TIER_PARAMS:
+            data[name] = dict(value) if isinstance(value, dict) else dict(enumerate(value, start=1))
+        elif name == 'VC_scale':
+            for cost in ('VC', 'VCUP', 'VCDN'):
+                data[cost] = {g: c * value for g, c in system_data[None][cost].items()}
+    return {None: data}
+
+def _point_columns(point):
+    """Table columns of a point's parameter values (per-tier values of probTU/probTD in their own columns)."""
+    columns = {}
+    for name, value in point.items():
+        if name in TIER_PARAMS:
+            tiers = value.items() if isinstance(value, dict) else enumerate(value, start=1)
+            columns.update({f'{name}_{r}': v for r, v in tiers})
+        else:
+            columns[name] = value
+    return columns
+
+# Sweep data of this worker process, set once by init_sweep_worker
+_sweep_context = None
+
+def init_sweep_worker(config, system_data):
+    """Pool initializer: receives the config and the base system data once per worker."""
+    global _sweep_context
+    _sweep_context = {'config': config, 'system_data': system_data}
+
+def run_sweep_chunk(chunk):
+    """
+    Worker: solves a chunk of consecutive (point_id, point) pairs on the persistent DAFO/RTSim
+    instances of this process, so each solve only changes the swept parameters of the one before.
+    """
+    config, system_data = _sweep_context['config'], _sweep_context['system_data']
+    rows = []
+    for point_id, point in chunk:
+        row = {'point_id': point_id, **_point_columns(point)}
+        try:
+            results = run_single_simulation(config, apply_overrides(system_data, point), point_id)
+        except Exception as e:
+            logging.error(f"Point {point_id}: error: {e}", exc_info=True)
+            results = None
+        row['status'] = 'Success' if results is not None else 'failed'
+        if results is not None:
+            row.update(summarize_run(results))
+        rows.append(row)
+    return rows
+
+def run_parameter_sweep(config_path, output_file="results/parameter_sweep.csv"):
+    """
+    Runs DAFO -> RTSim over the points of the `sweep` config block on fixed renewable scenarios.
+
+    The system data and the scenarios are prepared once and handed to the workers through the pool
+    initializer. Each worker builds its DAFO/RTSim instances on its first point and afterwards only
+    updates the swept (mutable) parameters, so a sweep costs about one solve per point instead of
+    one full pipeline. Points are handed out in chunks of `chunk_size` consecutive points; with
+    `warm_start` consecutive points are grid neighbours, and in-process solvers (APPSI, the matrix
+    RT model) restart from the previous point's basis. Writes one row per point to `output_file`.
+    """
+    if multiprocessing.get_start_method(allow_none=True) is None:
+        multiprocessing.set_start_method("spawn", force=True)
+    setup_logging()
+
+    config = load_config(config_path)
+    # The sweep relies on re-parameterizing the instances kept by each worker
+    config.setdefault('batch', {})['persistent_models'] = True
+    sweep_cfg = config.get('sweep', {})
+    points = sweep_points(sweep_cfg)
+
+    renewable_scenarios, scenario_probabilities = None, None
+    if not config['benchmark']:
+        renewable_scenarios, scenario_probabilities = scenario_generation(
+            input_dir="data/raw/renewable", output_file=None, config=config
+        )
+    paths = config['data_paths']
+    system_data = DataProcessor(paths['generator_csv'], paths['storage_csv'], paths['demand_csv']).prepare_pyomo_data(
+        config, renewable_scenarios=renewable_scenarios, scenario_probabilities=scenario_probabilities
+    )
+
+    chunk_size = max(1, sweep_cfg.get('chunk_size', 10))
+    indexed = list(enumerate(points))
+    chunks = [indexed[k:k + chunk_size] for k in range(0, len(indexed), chunk_size)]
+    max_workers = sweep_cfg.get('max_workers') or max(1, (os.cpu_count() or 2) - 1)
+    num_processes = min(max_workers, len(chunks))
+    logging.info(f"Sweeping {len(points)} points over {sorted({n for p in points for n in p})} "
+                 f"in {len(chunks)} chunks on {num_processes} processes")
+
+    rows = []
+    with multiprocessing.Pool(processes=num_processes, initializer=init_sweep_worker,
+                              initargs=(config, system_data)) as pool:
+        for chunk_rows in pool.imap_unordered(run_sweep_chunk, chunks):
+            rows.extend(chunk_rows)
+            logging.info(f"Main: {len(rows)}/{len(points)} points done")
+
+    table = pd.DataFrame(rows).sort_values('point_id').set_index('point_id')
+    failed = int((table['status'] != 'Success').sum())
+    if failed:
+        logging.warning(f"{failed} of {len(table)} points failed. Check logs for details.")
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output_path)
+    logging.info(f"Sweep results saved to {output_path}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parametric sensitivity sweep of DAFO and RTSim")
+    parser.add_argument("--config", default="config/model_config.yaml",
+                        help="Path to configuration file (sweep points in the `sweep` block)")
+    parser.add_argument("--output", default="results/parameter_sweep.csv",
+                        help="Output CSV with one row per sweep point")
+    args = parser.parse_args()
+
+    run_parameter_sweep(args.config, args.output)
@@ -0,0 +1,163 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import logging
+import argparse
+import multiprocessing
+from datetime import date
+from pathlib import Path
+
+sys.path.append('./src')
+
+from data_utils.DataProcessor import DataProcessor
+from data_utils.scenario_generation import aggregate_renewable_scenarios, select_scenario_positions, DEFAULT_CUBE_PATH
+from data_utils.results_processing import summarize_run
+from batch_simulation import setup_logging, load_config, run_single_simulation
+
+def day_pyomo_data(base_data, config, day_index, demand, scenarios, sim_index, state=None):
+    """
+    Pyomo data of one day: the shared system parameters with the day's demand, a scenario
+    draw seeded by the day and, if given, the state carried over from the previous day.
+
+    Args:
+        base_data (dict): System data from DataProcessor.prepare_pyomo_data ({None: {...}}).
+        day_index (int): Position of the day in the horizon, seeds the 'random' scenario selection.
+        demand (np.ndarray): Demand of the day's periods.
+        scenarios (np.ndarray): (simulation x period) site-aggregated renewable matrix.
+        sim_index (np.ndarray): Simulation indices of the rows of `scenarios`.
+        state (dict, optional): 'X0' (DA output of the FO sellers in the last period) and 'E0'
+            (storage level) at the end of the previous day.
+    """
+    general_cfg = config['general']
+    rh_cfg = config.get('rolling_horizon', {})
+    data = dict(base_data[None])
+    data['DEMAND'] = dict(zip(range(1, len(demand) + 1), np.asarray(demand, dtype=float).tolist()))
+
+    num_periods = general_cfg['num_periods']
+    positions, probabilities = select_scenario_positions(
+        sim_index, general_cfg['num_scenarios'], config['scenario_selection']['criteria'],
+        profiles=scenarios[:, :num_periods], random_state=rh_cfg.get('seed', 0) + day_index,
+    )
+    data['RE'] = DataProcessor.process_renewable_scenarios(scenarios[positions], num_periods)
+    if probabilities is not None:
+        data.update(DataProcessor.process_scenario_probabilities(probabilities, general_cfg['num_tiers']))
+
+    if state is not None:
+        data['X0'] = state['X0']
+        data['G_RAMP0'] = {None: sorted(state['X0'])}
+        if state['E0']:
+            data['E0'] = state['E0']
+    if rh_cfg.get('cyclic_storage', False) and data.get('E0'):
+        # The day has to end with at least the energy it started with
+        data['E_FINAL'] = dict(data['E0'])
+        data['B_FINAL'] = {None: sorted(data['E0'])}
+    return {None: data}
+
+def summarize_day(day, day_index, results):
+    """One row of the daily results table: DA/RT system metrics and FO awards and costs of a solved day."""
+    row = {'date': day, 'day': day_index + 1}
+    if results is None:
+        row['status'] = 'failed'
+        return row
+    row['status'] = 'Success'
+    row.update(summarize_run(results))
+    return row
+
+def run_day(args_tuple):
+    """Worker for independent days: solves one day without carried state."""
+    day, day_index, config, data = args_tuple
+    logging.info(f"Day {day}: starting")
+    try:
+        results = run_single_simulation(config, data, day_index)
+    except Exception as e:
+        logging.error(f"Day {day}: error: {e}", exc_info=True)
+        results = None
+    return summarize_day(day, day_index, results)
+
+def run_rolling_horizon(config_path, start_date=None, end_date=None, output_dir="results/rolling_horizon"):
+    """
+    Steps DAFO -> RTSim day by day over a date range of the demand file.
+
+    With `rolling_horizon: carry_state: true` the days run in sequence and each day starts from
+    the previous day's end state: storage level (E0, and E_FINAL with cyclic_storage) and the
+    DA output of the FO sellers, which limits their ramp into the first period. Without carried
+    state the days are independent and run on a process pool. Writes daily_results.csv (one
+    row per day) and summary.csv (statistics over the days) to `output_dir`.
+    """
+    if multiprocessing.get_start_method(allow_none=True) is None:
+        multiprocessing.set_start_method("spawn", force=True)
+    setup_logging()
+
+    config = load_config(config_path)
+    rh_cfg = config.setdefault('rolling_horizon', {})
+    start_date = date.fromisoformat(str(start_date or rh_cfg['start_date']))
+    end_date = date.fromisoformat(str(end_date or rh_cfg['end_date']))
+    carry_state = rh_cfg.get('carry_state', True)
+    if config['benchmark']:
+        raise ValueError("The rolling horizon runs on the full system data, set benchmark: false")
+    num_periods = config['general']['num_periods']
+    if num_periods > 24:
+        raise ValueError("The rolling horizon steps one day at a time: num_periods must be at most 24")
+    criteria = config.get('scenario_selection', {}).get('criteria', 'first_n')
+    if criteria != 'random':
+        logging.warning(f"scenario_selection: criteria is {criteria!r}: every day gets the same renewable scenarios, "
+                        f"only 'random' draws new ones per day (seeded by rolling_horizon: seed)")
+
+    paths = config['data_paths']
+    processor = DataProcessor(paths['generator_csv'], paths['storage_csv'], paths['demand_csv'])
+    base_data = processor.prepare_pyomo_data(config)
+    daily_demand = processor.load_daily_demand(num_periods)
+    days = [d for d in daily_demand.index if start_date <= d <= end_date]
+    if not days:
+        raise ValueError(f"No demand data between {start_date} and {end_date}")
+
+    cube_path = paths.get('renewable_cube', DEFAULT_CUBE_PATH)
+    scenarios, sim_index = aggregate_renewable_scenarios("data/raw/renewable", cube_path)
+    logging.info(f"Rolling horizon over {len(days)} days ({days[0]} to {days[-1]}), carry_state={carry_state}")
+
+    rows = []
+    if carry_state:
+        state = None
+        for k, day in enumerate(days):
+            data = day_pyomo_data(base_data, config, k, daily_demand.loc[day].to_numpy(), scenarios, sim_index, state)
+            results = run_single_simulation(config, data, k, end_state=True)
+            rows.append(summarize_day(day, k, results))
+            if results is None:
+                logging.warning(f"Day {day}: failed, the next day starts from the configured initial state")
+                state = None
+            else:
+                state = results['end_state']
+            logging.info(f"Day {day}: {rows[-1]['status']}")
+    else:
+        tasks = [
+            (day, k, config, day_pyomo_data(base_data, config, k, daily_demand.loc[day].to_numpy(), scenarios, sim_index))
+            for k, day in enumerate(days)
+        ]
+        max_workers = rh_cfg.get('max_workers') or max(1, (os.cpu_count() or 2) - 1)
+        with multiprocessing.Pool(processes=min(max_workers, len(tasks))) as pool:
+            rows = pool.map(run_day, tasks)
+
+    daily = pd.DataFrame(rows).set_index('date')
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    daily.to_csv(output_path / "daily_results.csv")
+
+    solved = daily[daily['status'] == 'Success'].drop(columns=['status', 'day'])
+    summary = solved.astype(float).agg(['count', 'sum', 'mean', 'std', 'min', 'max']).T
+    summary.to_csv(output_path / "summary.csv")
+    logging.info(f"Solved {len(solved)} of {len(daily)} days. Results saved to {output_path}")
+    return daily, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run DAFO and RTSim day by day over a date range")
+    parser.add_argument("--config", default="config/model_config.yaml",
+                        help="Path to configuration file")
+    parser.add_argument("--start-date", help="First day (YYYY-MM-DD), overrides rolling_horizon: start_date")
+    parser.add_argument("--end-date", help="Last day (YYYY-MM-DD), overrides rolling_horizon: end_date")
+    parser.add_argument("--output-dir", default="results/rolling_horizon",
+                        help="Output directory for results")
+    args = parser.parse_args()
+
+    run_rolling_horizon(args.config, args.start_date, args.end_date, args.output_dir)
@@ -6,6 +6,13 @@ import argparse
 import logging
 import sys
 
+sys.path.append('./src')
+
+from data_utils.ResultsStore import ResultsStore
+
+# Scenario columns of the system metrics whose total cost is summed per run
+SCENARIO_COLS = ['1', '2', '3', '4', '5']
+
 def setup_logging():
     """Configures logging for the script."""
     logging.basicConfig(
@@ -14,18 +21,47 @@ def setup_logging():
         handlers=[logging.StreamHandler(sys.stdout)]
     )
 
+def summarize_store(store_dir):
+    """
+    Summary rows of a batch written with `batch: results_format: "parquet"`: the same statistics
+    as the run_XXX/ files give, computed from the ResultsStore tables of all runs at once.
+    """
+    scenarios = ResultsStore.load(store_dir, 'scenario_inputs', columns=['run_id', 'time_period', 'generation'])
+    generation = scenarios.groupby('run_id')['generation']
+    scenario_std = scenarios.groupby(['run_id', 'time_period'])['generation'].std(ddof=0).groupby('run_id').mean()
+
+    metrics = ResultsStore.load(store_dir, 'system_metrics', columns=['run_id', 'metric', 'case', 'value'])
+    costs = metrics[(metrics['metric'] == 'total cost') & metrics['case'].isin(SCENARIO_COLS)]
+    total_cost = costs.groupby('run_id')['value'].sum()
+
+    summary = pd.DataFrame({
+        'mean_renewable_generation': generation.mean(),
+        'overall_std_renewable_generation': generation.std(),
+        'mean_scenario_std_renewable_generation': scenario_std,
+        'sum_total_cost': total_cost,
+    }).sort_index()
+    summary.insert(0, 'run_id', [f"run_{run_id:03d}" for run_id in summary.index])
+    return summary.to_dict('records')
+
 def summarize_batch_results(batch_results_dir, output_summary_file):
     """
     Summarizes results from batch simulations.
 
     Args:
-        batch_results_dir (str): Directory containing the batch simulation run folders.
+        batch_results_dir (str): Directory containing the batch simulation run folders, or the
+            ResultsStore under <batch_results_dir>/results of a Parquet batch.
         output_summary_file (str): Path to save the summary CSV file.
     """
     setup_logging()
     logging.info(f"Starting batch results summarization from: {batch_results_dir}")
 
     batch_path = Path(batch_results_dir)
+    store_dir = batch_path / "results"
+    if ResultsStore.tables(str(store_dir)):
+        logging.info(f"Reading the batch ResultsStore in {store_dir}")
+        write_summary(summarize_store(str(store_dir)), output_summary_file)
+        return
+
     summary_data = []
 
     run_dirs = sorted([d for d in batch_path.iterdir() if d.is_dir() and d.name.startswith('run_')])
@@ -73,7 +109,7 @@ def summarize_batch_results(batch_results_dir, output_summary_file):
             try:
                 df_metrics = pd.read_csv(system_metrics_file, index_col=0)
                 
-                scenario_cols = ['1', '2', '3', '4', '5'] 
+                scenario_cols = SCENARIO_COLS
                 actual_scenario_cols = [col for col in scenario_cols if col in df_metrics.columns]
 
                 if 'total cost' in df_metrics.index and actual_scenario_cols:
@@ -98,6 +134,10 @@ def summarize_batch_results(batch_results_dir, output_summary_file):
             'sum_total_cost': sum_total_cost
         })
 
+    write_summary(summary_data, output_summary_file)
+
+def write_summary(summary_data, output_summary_file):
+    """Writes the summary rows (one per run) to `output_summary_file`."""
     if not summary_data:
         logging.info("No data processed. Summary will be empty.")
         return
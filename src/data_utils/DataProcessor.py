@@ -1,9 +1,10 @@
+import itertools
 import pandas as pd
 import numpy as np
 import yaml
 
 class DataProcessor:
-    def __init__(self, gen_csv_path, storage_csv_path, demand_csv_path, renewable_csv_path):
+    def __init__(self, gen_csv_path, storage_csv_path, demand_csv_path, renewable_csv_path=None):
         self.gen_csv_path = gen_csv_path
         self.storage_csv_path = storage_csv_path
         self.demand_csv_path = demand_csv_path
@@ -34,11 +35,12 @@ class DataProcessor:
             self.demand_data = self.demand_data.head(num_periods)
             print(f"Demand data loaded: {len(self.demand_data)} of {total_periods} periods loaded.")
 
-            # Load renewable data
-            self.renewable_data = pd.read_csv(self.renewable_csv_path, index_col='T')
-            total_periods = len(self.renewable_data)
-            self.renewable_data = self.renewable_data.head(num_periods)
-            print(f"Renewable data loaded: {len(self.renewable_data)} of {total_periods} periods loaded.")
+            # Load renewable data (no path: the scenarios are supplied separately, e.g. by a batch run)
+            if self.renewable_csv_path is not None:
+                self.renewable_data = pd.read_csv(self.renewable_csv_path, index_col='T')
+                total_periods = len(self.renewable_data)
+                self.renewable_data = self.renewable_data.head(num_periods)
+                print(f"Renewable data loaded: {len(self.renewable_data)} of {total_periods} periods loaded.")
             
             return True
         except Exception as e:
@@ -86,16 +88,13 @@ class DataProcessor:
         params = ['CAP', 'RR', 'VC', 'VCUP', 'VCDN']
         gen_data_dict = {}
 
+        # One {generator: value} dict per column
+        ids = gen_data_filtered.index.tolist()
         for param in params:
             if param in gen_data_filtered.columns:
-                param_dict = {}
-                for gen_idx in gen_data_filtered.index:
-                    param_dict[gen_idx] = gen_data_filtered.loc[gen_idx, param]
-                gen_data_dict[param] = param_dict
+                gen_data_dict[param] = dict(zip(ids, gen_data_filtered[param].to_numpy(dtype=np.float64).tolist()))
 
-        param_dict = {gen_idx: int(gen_data_filtered.at[gen_idx, 'flag'])
-                    for gen_idx in gen_data_filtered.index}
-        gen_data_dict['flag'] = param_dict
+        gen_data_dict['flag'] = dict(zip(ids, gen_data_filtered['flag'].to_numpy(dtype=np.int64).tolist()))
 
         return gen_data_dict
 
@@ -129,18 +128,13 @@ class DataProcessor:
             storage_data_filtered.set_index(id_col, inplace=True)
 
             storage_data_dict = {}
+            ids = storage_data_filtered.index.tolist()
 
             if 'E_MAX' in storage_data_filtered.columns:
-                storage_data_dict['E_MAX'] = {
-                    storage_idx: float(storage_data_filtered.at[storage_idx, 'E_MAX']) * 1000
-                    for storage_idx in storage_data_filtered.index
-                }
+                storage_data_dict['E_MAX'] = dict(zip(ids, (storage_data_filtered['E_MAX'].to_numpy(dtype=np.float64) * 1000).tolist()))
                 
             if 'P_MAX' in storage_data_filtered.columns:
-                storage_data_dict['P_MAX'] = {
-                    storage_idx: float(storage_data_filtered.loc[storage_idx, 'P_MAX'])
-                    for storage_idx in storage_data_filtered.index
-                }
+                storage_data_dict['P_MAX'] = dict(zip(ids, storage_data_filtered['P_MAX'].to_numpy(dtype=np.float64).tolist()))
             
             # check charging and discharging efficiency
             storage_data_dict['ETA_CH'] = {
@@ -173,27 +167,71 @@ class DataProcessor:
     def process_demand_data(self, num_periods=24):
         try:
             demand_data = self.demand_data.head(num_periods)
-            demand_dict = {
-                idx + 1: row['1'] + row['2'] + row['3'] 
-                for idx, row in demand_data.iterrows()
-            }
-            return demand_dict
+            # Sum of the three regions per period
+            total = demand_data[['1', '2', '3']].to_numpy(dtype=np.float64).sum(axis=1)
+            return dict(zip((demand_data.index + 1).tolist(), total.tolist()))
         except Exception as e:
             print(f"Error processing demand data: {str(e)}")
             return {}
     
+    def load_daily_demand(self, num_periods=24):
+        """
+        Reads the whole demand file and returns the regional demand sum as a (day x period)
+        DataFrame indexed by date, for runs over more than the first day (see rolling_horizon.py).
+        """
+        demand = pd.read_csv(self.demand_csv_path)
+        dates = pd.to_datetime(demand[['Year', 'Month', 'Day']].rename(columns=str.lower)).dt.date
+        total = demand[['1', '2', '3']].to_numpy(dtype=np.float64).sum(axis=1)
+        daily = pd.DataFrame({'date': dates, 'period': demand['Period'], 'demand': total}).pivot(
+            index='date', columns='period', values='demand'
+        )
+        return daily.iloc[:, :num_periods]
+
     def process_renewable_data(self, num_periods=24):
         try:
             renewable_data = self.renewable_data.head(num_periods)
-            renewable_dict = {(int(col), int(time_period)): renewable_data.at[time_period, col] 
-                for col in renewable_data.columns 
-                for time_period in renewable_data.index}
-            return renewable_dict
+            # (scenario, period) keys in column-major order of the (period x scenario) table
+            keys = itertools.product(renewable_data.columns.astype(int).tolist(), renewable_data.index.astype(int).tolist())
+            return dict(zip(keys, renewable_data.to_numpy(dtype=np.float64).T.ravel().tolist()))
         except Exception as e:
             print(f"Error processing renewable data: {str(e)}")
             return {}
 
-    def prepare_pyomo_data(self, config):
+    @staticmethod
+    def process_renewable_scenarios(renewable_scenarios, num_periods=24):
+        """
+        Builds the RE parameter from an in-memory (scenario x period) array, e.g. as returned by
+        scenario_generation, numbering the scenarios and periods from 1.
+        """
+        values = np.asarray(renewable_scenarios, dtype=np.float64)[:, :num_periods]
+        keys = itertools.product(range(1, values.shape[0] + 1), range(1, values.shape[1] + 1))
+        return dict(zip(keys, values.ravel().tolist()))
+
+    @staticmethod
+    def process_scenario_probabilities(scenario_probabilities, num_tiers):
+        """
+        Builds the scenario probability parameters from reduced-scenario probabilities (ordered
+        like the scenarios). With one tier between each pair of consecutive scenarios
+        (num_tiers == scenarios - 1) the FO exercise probabilities follow from them as well:
+        tier r is exercised up in scenarios s <= r and down in scenarios s > r.
+        """
+        p = np.asarray(scenario_probabilities, dtype=np.float64)
+        params = {'prob': {s + 1: float(p[s]) for s in range(len(p))}}
+        if num_tiers == len(p) - 1:
+            cumulative = np.cumsum(p)
+            params['probTU'] = {r: float(cumulative[r - 1]) for r in range(1, num_tiers + 1)}
+            params['probTD'] = {r: float(1.0 - cumulative[r - 1]) for r in range(1, num_tiers + 1)}
+        else:
+            print(f"Scenario probabilities given for {len(p)} scenarios and {num_tiers} tiers: keeping the configured probTU/probTD.")
+        return params
+
+    def prepare_pyomo_data(self, config, renewable_scenarios=None, scenario_probabilities=None):
+        """
+        Builds the Pyomo data dict. The renewable scenarios are read from `renewable_csv_path`,
+        or taken from `renewable_scenarios` ((scenario x period) array) if given.
+        `scenario_probabilities` (e.g. from a scenario reduction) set the scenario weights of
+        the DAFO and RT models; without them the scenarios are equiprobable.
+        """
         # Use the loaded fo_params
         fo_params_data = config.get('fo_params', {})
         fo_params = {
@@ -255,7 +293,12 @@ class DataProcessor:
                 gen_data_dict = self.process_gen_data()
                 storage_data_dict = self.process_storage_data()
                 demand_data_dict = self.process_demand_data(num_periods)
-                renewable_data_dict = self.process_renewable_data(num_periods)
+                if renewable_scenarios is not None:
+                    renewable_data_dict = self.process_renewable_scenarios(renewable_scenarios, num_periods)
+                elif self.renewable_csv_path is not None:
+                    renewable_data_dict = self.process_renewable_data(num_periods)
+                else:
+                    renewable_data_dict = None
             except Exception as e:
                 print(f"Error in data processing: {str(e)}")
                 raise
@@ -263,7 +306,15 @@ class DataProcessor:
             pyomo_data.update(gen_data_dict)
             pyomo_data.update(storage_data_dict)
             pyomo_data['DEMAND'] = demand_data_dict
-            pyomo_data['RE'] = renewable_data_dict
+            if renewable_data_dict is not None:
+                pyomo_data['RE'] = renewable_data_dict
+            if scenario_probabilities is not None:
+                pyomo_data.update(self.process_scenario_probabilities(scenario_probabilities, num_tiers))
+
+        if 'prob' not in pyomo_data:
+            # Equiprobable scenarios, the weights extract_da and the RT model use as well
+            scenarios = pyomo_data['S'][None]
+            pyomo_data['prob'] = {s: 1.0 / len(scenarios) for s in scenarios}
 
         pyomo_data = {None: pyomo_data} # reformat for pyomo
 
@@ -275,6 +326,9 @@ class DataProcessor:
             'DEMAND', 'RE'
         ]
         
+        if self.renewable_csv_path is None and renewable_scenarios is None and not config['benchmark']:
+            required_params.remove('RE')
+        
         missing_params = [param for param in required_params if param not in pyomo_data[None]]
         if missing_params:
             print(f"Warning: Missing parameters: {missing_params}")
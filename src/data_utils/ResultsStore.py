@@ -0,0 +1,140 @@
+import os
+import glob
+import time
+import pandas as pd
+import numpy as np
+
+class ResultsStore:
+    """
+    Append-only columnar store for batch results.
+
+    Every table (system metrics, DA prices, FO awards, scenario inputs, ...) is a directory of
+    Parquet part files in long format with a `run_id` column:
+
+        <store_dir>/<table>/part-00000.parquet
+        <store_dir>/<table>/part-00001.parquet
+
+    Runs are buffered in memory and written as one new part file per table every
+    `runs_per_part` runs (and on close), so a batch of N runs produces about N / runs_per_part
+    files per table instead of one directory per run. With `max_delay_s` the buffer is also
+    written once its oldest run has waited that long, which bounds the work a crash can lose
+    on slow batches. Existing parts are never rewritten; reopening a store continues the part
+    numbering. A run written more than once (retried after a failure or a crash between its
+    part file and its manifest entry) is read back from its latest part only. Requires `pyarrow`.
+    """
+    def __init__(self, store_dir, runs_per_part=500, max_delay_s=None):
+        self.store_dir = store_dir
+        self.runs_per_part = max(1, int(runs_per_part))
+        self.max_delay_s = max_delay_s
+        self._buffer = {}
+        self._buffered_runs = 0
+        self._buffered_since = None
+        os.makedirs(store_dir, exist_ok=True)
+
+    def append(self, run_id, tables):
+        """
+        Buffers the tables of one run.
+
+        Args:
+            run_id (int): Run identifier, added as the `run_id` column.
+            tables (dict): {table name: pd.DataFrame} with the same columns for every run.
+
+        Returns:
+            bool: True if this call wrote the buffered runs (including this one) to disk.
+        """
+        for name, table in tables.items():
+            table = table.reset_index(drop=True)
+            table.insert(0, 'run_id', np.int64(run_id))
+            self._buffer.setdefault(name, []).append(table)
+        self._buffered_runs += 1
+        if self._buffered_since is None:
+            self._buffered_since = time.monotonic()
+        if self._buffered_runs >= self.runs_per_part or (
+            self.max_delay_s is not None and time.monotonic() - self._buffered_since >= self.max_delay_s
+        ):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """Writes the buffered runs as one new part file per table."""
+        for name, tables in self._buffer.items():
+            table_dir = os.path.join(self.store_dir, name)
+            os.makedirs(table_dir, exist_ok=True)
+            part = ResultsStore._next_part(table_dir)
+            part_path = os.path.join(table_dir, f'part-{part:05d}.parquet')
+
+            # Write to a temporary file first so that readers never see a partial part
+            tmp_path = f"{part_path}.{os.getpid()}.tmp"
+            pd.concat(tables, ignore_index=True).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, part_path)
+        self._buffer = {}
+        self._buffered_runs = 0
+        self._buffered_since = None
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _part_number(path):
+        return int(os.path.basename(path)[len('part-'):-len('.parquet')])
+
+    @staticmethod
+    def _next_part(table_dir):
+        """Number after the highest existing part, so that a new part never replaces one."""
+        parts = glob.glob(os.path.join(table_dir, 'part-*.parquet'))
+        return max(map(ResultsStore._part_number, parts), default=-1) + 1
+
+    @staticmethod
+    def tables(store_dir):
+        """Returns the names of the tables in a store."""
+        if not os.path.isdir(store_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(store_dir)
+            if glob.glob(os.path.join(store_dir, name, 'part-*.parquet'))
+        )
+
+    @staticmethod
+    def summarize(store_dir):
+        """Mean, std, min and max of every system metric per case (DA or scenario) across all runs."""
+        metrics = ResultsStore.load(store_dir, 'system_metrics', columns=['metric', 'case', 'value'])
+        return metrics.groupby(['metric', 'case'], sort=False)['value'].agg(['mean', 'std', 'min', 'max', 'count'])
+
+    @staticmethod
+    def load(store_dir, table=None, columns=None, run_ids=None):
+        """
+        Loads a whole batch in one call.
+
+        Args:
+            store_dir (str): Directory of the store.
+            table (str, optional): Table to load. If None, all tables are loaded.
+            columns (list, optional): Columns to read (only for a single table).
+            run_ids (iterable, optional): Only read these runs (pushed down to the Parquet reader).
+
+        Returns:
+            pd.DataFrame, or {table name: pd.DataFrame} if `table` is None.
+        """
+        if table is None:
+            return {name: ResultsStore.load(store_dir, name, run_ids=run_ids) for name in ResultsStore.tables(store_dir)}
+
+        parts = sorted(glob.glob(os.path.join(store_dir, table, 'part-*.parquet')), key=ResultsStore._part_number)
+        if not parts:
+            raise FileNotFoundError(f"No results for table {table!r} in {store_dir}")
+        filters = [('run_id', 'in', [int(r) for r in run_ids])] if run_ids is not None else None
+        read_columns = columns if columns is None or 'run_id' in columns else ['run_id'] + list(columns)
+        frames = [
+            pd.read_parquet(part, columns=read_columns, filters=filters).assign(_part=ResultsStore._part_number(part))
+            for part in parts
+        ]
+        data = pd.concat(frames, ignore_index=True)
+        # Keep every run's rows of its latest part only
+        data = data[data['_part'] == data.groupby('run_id')['_part'].transform('max')]
+        data = data.drop(columns='_part').reset_index(drop=True)
+        return data[columns] if columns is not None else data
@@ -0,0 +1,101 @@
+import math
+from statistics import NormalDist
+
+# Default relative-precision targets of the adaptive batch: metric of results_processing.summarize_run
+# -> largest accepted confidence-interval half-width relative to the mean
+DEFAULT_TARGETS = {'rt_total_cost': 0.01, 'rt_average_price': 0.01, 'rt_curtail_cost': 0.05}
+
+
+class RunningStats:
+    """Streaming mean and variance of one metric (Welford's algorithm), numerically stable in one pass."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance (nan below two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    def half_width(self, confidence=0.95):
+        """Half-width of the normal-approximation confidence interval of the mean."""
+        if self.count < 2:
+            return math.inf
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return z * self.std / math.sqrt(self.count)
+
+    def relative_half_width(self, confidence=0.95):
+        """Half-width relative to |mean|; 0 for a metric that is constantly zero, inf for a zero mean otherwise."""
+        half = self.half_width(confidence)
+        if self.mean != 0:
+            return half / abs(self.mean)
+        return 0.0 if half == 0 else math.inf
+
+
+class ConvergenceMonitor:
+    """
+    Online statistics of the per-run metrics of a Monte Carlo batch and its stopping rule: the
+    batch has converged once at least `min_runs` runs are in and the confidence-interval
+    half-width of every target metric is within its relative precision target.
+
+    Args:
+        targets (dict): {metric: relative precision}, metrics as named by summarize_run.
+        confidence (float): Confidence level of the intervals.
+        min_runs (int): Runs before the stopping rule is checked (guards the normal approximation).
+    """
+    def __init__(self, targets=None, confidence=0.95, min_runs=20):
+        self.targets = dict(targets or DEFAULT_TARGETS)
+        self.confidence = confidence
+        self.min_runs = max(2, min_runs)
+        self.stats = {metric: RunningStats() for metric in self.targets}
+
+    @classmethod
+    def from_config(cls, config):
+        """Monitor of the `batch: adaptive` config block."""
+        adaptive_cfg = config.get('batch', {}).get('adaptive', {})
+        return cls(adaptive_cfg.get('targets'), adaptive_cfg.get('confidence', 0.95), adaptive_cfg.get('min_runs', 20))
+
+    @property
+    def count(self):
+        return min((s.count for s in self.stats.values()), default=0)
+
+    def update(self, metrics):
+        """Adds the metrics of one successful run (non-finite values are skipped)."""
+        for metric, stats in self.stats.items():
+            value = metrics.get(metric)
+            if value is not None and math.isfinite(value):
+                stats.update(float(value))
+
+    def converged(self):
+        if self.count < self.min_runs:
+            return False
+        return all(self.stats[m].relative_half_width(self.confidence) <= target for m, target in self.targets.items())
+
+    def report(self):
+        """{metric: mean, std, confidence interval, relative half-width and target} of the runs so far."""
+        report = {}
+        for metric, stats in self.stats.items():
+            half = stats.half_width(self.confidence)
+            rel = stats.relative_half_width(self.confidence)
+            report[metric] = {
+                'runs': stats.count,
+                'mean': stats.mean,
+                'std': stats.std,
+                'ci_low': stats.mean - half,
+                'ci_high': stats.mean + half,
+                'relative_half_width': rel,
+                'target': self.targets[metric],
+                'met': rel <= self.targets[metric],
+            }
+        return report
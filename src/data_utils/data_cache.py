@@ -0,0 +1,65 @@
+import os
+import json
+import pickle
+import hashlib
+
+# Bumped when the layout of the prepared data changes, which invalidates all cached entries
+CACHE_VERSION = 2
+
+# Config sections that prepare_pyomo_data reads
+CACHE_CONFIG_KEYS = ('benchmark', 'general', 'fo_params')
+
+
+def pyomo_data_cache_key(input_files, config, config_keys=CACHE_CONFIG_KEYS):
+    """
+    Content hash of the inputs of DataProcessor.prepare_pyomo_data: the bytes of every input
+    file (missing files count as absent) and the relevant config sections.
+
+    Args:
+        input_files (list): Paths of the input files (generators, storage, demand, renewables, ...).
+        config (dict): Model config; only `config_keys` enter the key.
+
+    Returns:
+        str: Hex digest identifying the prepared data.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode())
+    for path in input_files:
+        h.update(b'\0' + str(path).encode() + b'\0')
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        else:
+            h.update(b'<missing>')
+    h.update(json.dumps({key: config.get(key) for key in config_keys}, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f"pyomo_data_{key[:16]}.pkl")
+
+
+def load_cached_pyomo_data(cache_dir, key):
+    """Returns the prepared data stored under `key`, or None on a miss (or an unreadable entry)."""
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable data cache entry {path}: {e}")
+        return None
+    return entry['data'] if entry.get('key') == key else None
+
+
+def save_cached_pyomo_data(cache_dir, key, pyomo_data):
+    """Stores prepared data under `key`; written to a temporary file first, so readers never see a partial entry."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'key': key, 'data': pyomo_data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
@@ -1,117 +1,75 @@
+import itertools
 import pandas as pd
 import numpy as np
+from data_utils.solution_arrays import var_array, dual_array, param_array
 
 def extract_da(i, pyomo_system_data):
-    energy_data = []
-    for g in i.G_FO_sellers:
-        for t in i.T:
-            energy_data.append({'g': g, 't': t, 'en': i.xDA[g, t].value})
-    Energy = pd.DataFrame(energy_data).pivot(index='g', columns='t', values='en')
+    # Solution values and duals as dense arrays: x[g, t], h[r, g, t], hd[r, t], prices[t] / [r, t]
+    T, R, Gs = list(i.T), list(i.R), list(i.G_FO_sellers)
+    xDA = var_array(i, 'xDA', [Gs, T])
+    rgDA = var_array(i, 'rgDA', [T])
+    VC = param_array(i, 'VC', [Gs])
+    VCUP = param_array(i, 'VCUP', [Gs])
+    probTU = param_array(i, 'probTU', [R])
+    price = dual_array(i, 'Con3', [T])
 
-    xDA_data = {(g,t): i.xDA[g,t].value for g in i.G_FO_sellers for t in i.T}
-    rgDA_data = {t: i.rgDA[t].value for t in i.T}
+    Energy = pd.DataFrame(xDA, index=pd.Index(Gs, name='g'), columns=pd.Index(T, name='t')).sort_index().sort_index(axis=1)
+
+    xDA_data = dict(zip(itertools.product(Gs, T), xDA.ravel().tolist()))
+    rgDA_data = dict(zip(T, rgDA.tolist()))
     
     Total = pd.DataFrame()
-    Total['cost'] = {t: sum(i.VC[g] * i.xDA[g,t].value for g in i.G_FO_sellers) for t in i.T}
-    Total['price'] = {t: i.dual[i.Con3[t]] for t in i.T}
+    Total['cost'] = dict(zip(T, (VC @ xDA).tolist()))
+    Total['price'] = dict(zip(T, price.tolist()))
     
     # Extract demand FO data
-    hdu_data = {(R): v.value for (R), v in i.hdu.items()}
-    demand = pd.DataFrame.from_dict(hdu_data, orient="index", columns=["hdu"])
-    hdd_data = {(R): v.value for (R), v in i.hdd.items()}
-    demand['hdd'] = pd.DataFrame.from_dict(hdd_data, orient="index", columns=["hdd"])
-        
-    hsu_data = {}
-    hsd_data = {}
+    demand = pd.DataFrame({
+        'hdu': var_array(i, 'hdu', [R, T]).ravel(),
+        'hdd': var_array(i, 'hdd', [R, T]).ravel(),
+    }, index=pd.MultiIndex.from_tuples(list(itertools.product(R, T))))
     
     print("Extracting hsu and hsd data...")
     try:
-        for r in i.R:
-            for g in i.G_FO_sellers:  # Use G_FO_sellers instead of G
-                for t in i.T:
-                    hsu_data[(r,g,t)] = i.hsu[r,g,t].value
-                    hsd_data[(r,g,t)] = i.hsd[r,g,t].value
+        hsu = var_array(i, 'hsu', [R, Gs, T])
+        hsd = var_array(i, 'hsd', [R, Gs, T])
     except Exception as e:
         print(f"Error extracting hsu/hsd data: {e}")
         return None, None, None, None, None, None, None
 
-    df = pd.DataFrame.from_dict(hsu_data, orient="index", columns=["hsu"])
-    df['hsd'] = pd.DataFrame.from_dict(hsd_data, orient="index", columns=["hsd"])
-    df['R'] = [k[0] for k in df.index]
-    df['G'] = [k[1] for k in df.index]
-    df['T'] = [k[2] for k in df.index]
+    keys = list(itertools.product(R, Gs, T))
+    df = pd.DataFrame({'hsu': hsu.ravel(), 'hsd': hsd.ravel()}, index=pd.MultiIndex.from_tuples(keys))
+    df['R'] = [k[0] for k in keys]
+    df['G'] = [k[1] for k in keys]
+    df['T'] = [k[2] for k in keys]
     
-    up_prices = []
-    down_prices = []
-    time_periods = []
-    reserve_tiers = []
-
-    for t in i.T:
-        for r in i.R:
-            try:
-                up_prices.append(i.dual[i.Con4UP[r,t]])
-                down_prices.append(i.dual[i.Con4DN[r,t]])
-                time_periods.append(t)
-                reserve_tiers.append(r)
-            except Exception as e:
-                print(f"Error extracting price data for r={r}, t={t}: {e}")
-                up_prices.append(0)
-                down_prices.append(0)
-                time_periods.append(t)
-                reserve_tiers.append(r)
-
-    Prices_long = pd.DataFrame({
-        'up': up_prices,
-        'down': down_prices,
-        'T': time_periods,
-        'R': reserve_tiers
-    })
-    Prices = Prices_long.pivot_table(index='T', columns='R', values=['up', 'down'])
-    Prices.columns = [f'{val}_R{col}' for val, col in Prices.columns]
+    up_prices = dual_array(i, 'Con4UP', [R, T])     # (R, T)
+    down_prices = dual_array(i, 'Con4DN', [R, T])
+    order = np.argsort(R, kind='stable')
+    Prices = pd.DataFrame(
+        np.hstack([down_prices[order].T, up_prices[order].T]),
+        index=pd.Index(T, name='T'),
+        columns=[f'down_R{R[k]}' for k in order] + [f'up_R{R[k]}' for k in order],
+    ).sort_index()
 
     # Calculate gross margins
     Gross_margins = pd.DataFrame(index=i.G_FO_sellers)
 
     # Energy margins
-    energy_margins = {}
-    for g in i.G_FO_sellers:
-        margin = sum((i.dual[i.Con3[t]] - i.VC[g]) * i.xDA[g, t].value for t in i.T)
-        energy_margins[g] = margin
-    Gross_margins["en"] = pd.Series(energy_margins)
-
-    # FO margins - only for sellers
-    reserve_margins_up = {}
-    vcup_values = {g: i.VCUP[g] for g in i.G_FO_sellers}
-    df_indexed = df.set_index(['G', 'R', 'T'])
-
-    for g in i.G_FO_sellers:
-        for r in i.R:
-            total_up_margin_gr = 0
-            for t in i.T:
-                try:
-                    price_up = Prices.loc[t, f'up_R{r}']
-                    # Check if this combination exists in the data
-                    if (g, r, t) in df_indexed.index:
-                        hsu_value = df_indexed.loc[(g, r, t), "hsu"]
-                        cost_up_component = vcup_values[g] * i.probTU[r]
-                        total_up_margin_gr += hsu_value * (price_up - cost_up_component)
-                except (KeyError, ValueError) as e:
-                    # Skip if data is missing
-                    pass
-
-            reserve_margins_up[(g, f'up_R{r}')] = total_up_margin_gr
+    Gross_margins["en"] = ((price[None, :] - VC[:, None]) * xDA).sum(axis=1)
 
-    # Convert the margins to DataFrame and join
-    if reserve_margins_up:
-        Reserve_Margins_Up_df = pd.Series(reserve_margins_up).unstack()
-        Gross_margins = Gross_margins.join(Reserve_Margins_Up_df, how='left')
+    # FO margins - only for sellers: sum_t hsu[r,g,t] * (price_up[r,t] - VCUP[g] * probTU[r])
+    up_margins = (hsu * (up_prices[:, None, :] - VCUP[None, :, None] * probTU[:, None, None])).sum(axis=2)   # (R, G)
+    if R:
+        Reserve_Margins_Up_df = pd.DataFrame(up_margins.T, index=Gs, columns=[f'up_R{r}' for r in R])
+        Gross_margins = Gross_margins.join(Reserve_Margins_Up_df[sorted(Reserve_Margins_Up_df.columns)], how='left')
     
     # Fill NaN values with 0
     Gross_margins = Gross_margins.fillna(0)
 
     # Extract storage data if available
-    p_ch_DA_data = {(b,t): i.p_ch[b,t].value for b in i.B for t in i.T}
-    p_dch_DA_data = {(b,t): i.p_dch[b,t].value for b in i.B for t in i.T}
+    B = list(i.B)
+    p_ch_DA_data = dict(zip(itertools.product(B, T), var_array(i, 'p_ch', [B, T]).ravel().tolist()))
+    p_dch_DA_data = dict(zip(itertools.product(B, T), var_array(i, 'p_dch', [B, T]).ravel().tolist()))
 
     # Create dataRT for RT model
     dataRT = {None:{
@@ -124,13 +82,13 @@ def extract_da(i, pyomo_system_data):
         'D1': pyomo_system_data[None]["D1"],
         'D2': pyomo_system_data[None]["D2"],
         'flag': pyomo_system_data[None].get("flag", {}),  # Include flag for G_FO_sellers in RT
-        'prob': {s: 1.0/len(i.S) for s in i.S},  # Equal probability by default
+        'prob': pyomo_system_data[None].get('prob') or {s: 1.0/len(i.S) for s in i.S},  # Equal probability by default
         'RR': pyomo_system_data[None]["RR"],
         'xDA': xDA_data,
         'PEN': pyomo_system_data[None]["PEN"],
         'PENDN': pyomo_system_data[None]["PENDN"],
         'REDA': rgDA_data,
-        'DAdr': {t: i.d[t].value for t in i.T},
+        'DAdr': dict(zip(T, var_array(i, 'd', [T]).tolist())),
     }}
     
     # Add storage parameters if storage exists
@@ -0,0 +1,399 @@
+import os
+import time
+import pickle
+import socket
+import sqlite3
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+# Lease of a claimed job when none is configured: a worker host that is lost for longer gets its job requeued
+DEFAULT_LEASE_S = 3600.0
+
+# Job states: queued -> running -> done (result waiting for the coordinator) -> collected;
+# running jobs whose lease expires go back to queued or, after max_retries, to failed.
+
+
+class SqliteJobQueue:
+    """
+    Job queue of a distributed batch in a SQLite file, used by the coordinator and the workers alike.
+
+    All hosts must open the same file, e.g. on a shared filesystem with working file locks (the
+    default rollback journal is used, WAL mode does not work across hosts). Tasks, results and the
+    batch config are stored pickled; a collected result is deleted from the file right away.
+    """
+    def __init__(self, path, timeout=60.0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB);
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                task BLOB NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                claimed_at REAL,
+                result BLOB,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+        """)
+
+    @contextmanager
+    def _transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    # Coordinator side
+
+    def publish(self, config):
+        """Starts a new batch: clears the file and stores the config the workers initialize from."""
+        with self._transaction():
+            self.db.execute("DELETE FROM jobs")
+            self.db.execute("DELETE FROM meta")
+            self.db.execute("INSERT INTO meta VALUES ('config', ?)", (pickle.dumps(config),))
+
+    def put(self, tasks):
+        with self._transaction():
+            self.db.executemany("INSERT INTO jobs (task, status) VALUES (?, 'queued')", ((pickle.dumps(t),) for t in tasks))
+
+    def collect(self):
+        """Finished jobs since the last call, as (task, result, error) with error None on success."""
+        with self._transaction():
+            rows = self.db.execute("SELECT id, task, result, error FROM jobs WHERE status = 'done'").fetchall()
+            self.db.executemany("UPDATE jobs SET status = 'collected', result = NULL WHERE id = ?", ((row[0],) for row in rows))
+        return [(pickle.loads(task), pickle.loads(result) if result is not None else None, error)
+                for _, task, result, error in rows]
+
+    def requeue_expired(self, lease_s, max_retries):
+        """Requeues running jobs older than `lease_s`; returns (task, reason) of those out of retries."""
+        failed = []
+        with self._transaction():
+            rows = self.db.execute(
+                "SELECT id, task, attempts, worker FROM jobs WHERE status = 'running' AND claimed_at < ?",
+                (time.time() - lease_s,),
+            ).fetchall()
+            for job_id, task, attempts, worker in rows:
+                reason = f"Lease of {lease_s:g}s expired on {worker}"
+                if attempts <= max_retries:
+                    logging.warning(f"Job {job_id}: {reason}, requeued")
+                    self.db.execute("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
+                else:
+                    self.db.execute("UPDATE jobs SET status = 'failed', error = ? WHERE id = ?", (reason, job_id))
+                    failed.append((pickle.loads(task), reason))
+        return failed
+
+    def cancel(self):
+        """Drops the jobs not claimed yet."""
+        self.db.execute("UPDATE jobs SET status = 'cancelled' WHERE status = 'queued'")
+
+    def outstanding(self):
+        """Jobs not yet collected or given up."""
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running', 'done')").fetchone()[0]
+
+    def close_batch(self):
+        """Tells the workers that the batch is over."""
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', 1)")
+
+    def client_url(self):
+        return f"sqlite:///{self.path}"
+
+    # Worker side
+
+    def get_config(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def claim(self, worker):
+        """Claims the oldest queued job: (job_id, task), or None if there is none right now."""
+        with self._transaction():
+            row = self.db.execute("SELECT id, task FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, claimed_at = ? WHERE id = ?",
+                (worker, time.time(), row[0]),
+            )
+        return row[0], pickle.loads(row[1])
+
+    def complete(self, job_id, result, error=None):
+        """Stores the result of a job; the first result of a (requeued) job wins, later ones are dropped."""
+        self.db.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (pickle.dumps(result) if result is not None else None, error, job_id),
+        )
+
+    def finished(self):
+        return self.db.execute("SELECT 1 FROM meta WHERE key = 'closed'").fetchone() is not None
+
+    def close(self):
+        self.db.close()
+
+
+class TcpJobServer:
+    """
+    Coordinator side of the TCP job queue: keeps the jobs in memory and serves the workers' claims
+    and results on `address` from background threads. Connections are authenticated with the
+    shared `authkey` (multiprocessing.connection HMAC handshake); messages are pickled, so the
+    key must only be known to trusted hosts.
+    """
+    def __init__(self, address, authkey):
+        self._lock = threading.Lock()
+        self._config = None
+        self._jobs = {}
+        self._queued = deque()
+        self._done = []
+        self._closed = False
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError as e:
+                logging.warning(f"Job queue: rejected connection: {e}")
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._handle(request))
+
+    def _handle(self, request):
+        kind = request[0]
+        with self._lock:
+            if kind == 'config':
+                return self._config
+            if kind == 'claim':
+                if self._queued:
+                    job_id = self._queued.popleft()
+                    job = self._jobs[job_id]
+                    job.update(status='running', worker=request[1], claimed_at=time.time())
+                    job['attempts'] += 1
+                    return ('job', job_id, job['task'])
+                return ('stop',) if self._closed else ('wait',)
+            if kind == 'complete':
+                _, job_id, result, error = request
+                job = self._jobs.get(job_id)
+                if job is not None and job['status'] in ('queued', 'running'):
+                    if job['status'] == 'queued':
+                        self._queued.remove(job_id)
+                    job['status'] = 'done'
+                    self._done.append((job['task'], result, error))
+                return ('ok',)
+        raise ValueError(f"Unknown job queue request {kind!r}")
+
+    def publish(self, config):
+        with self._lock:
+            self._config = config
+            self._jobs.clear()
+            self._queued.clear()
+            self._done.clear()
+            self._closed = False
+
+    def put(self, tasks):
+        with self._lock:
+            for task in tasks:
+                job_id = len(self._jobs)
+                self._jobs[job_id] = {'task': task, 'status': 'queued', 'attempts': 0}
+                self._queued.append(job_id)
+
+    def collect(self):
+        with self._lock:
+            done, self._done = self._done, []
+            for job in self._jobs.values():
+                if job['status'] == 'done':
+                    job['status'] = 'collected'
+        return done
+
+    def requeue_expired(self, lease_s, max_retries):
+        failed = []
+        cutoff = time.time() - lease_s
+        with self._lock:
+            for job_id, job in self._jobs.items():
+                if job['status'] != 'running' or job['claimed_at'] >= cutoff:
+                    continue
+                reason = f"Lease of {lease_s:g}s expired on {job['worker']}"
+                if job['attempts'] <= max_retries:
+                    logging.warning(f"Job {job_id}: {reason}, requeued")
+                    job['status'] = 'queued'
+                    self._queued.append(job_id)
+                else:
+                    job['status'] = 'failed'
+                    failed.append((job['task'], reason))
+        return failed
+
+    def cancel(self):
+        with self._lock:
+            for job_id in self._queued:
+                self._jobs[job_id]['status'] = 'cancelled'
+            self._queued.clear()
+
+    def outstanding(self):
+        with self._lock:
+            return sum(job['status'] in ('queued', 'running', 'done') for job in self._jobs.values())
+
+    def close_batch(self):
+        with self._lock:
+            self._closed = True
+
+    def client_url(self):
+        host, port = self.address
+        return f"tcp://{'127.0.0.1' if host in ('', '0.0.0.0') else host}:{port}"
+
+    def close(self):
+        self._listener.close()
+
+
+class TcpJobClient:
+    """Worker side of the TCP job queue. A lost connection to the coordinator ends the worker's batch."""
+    def __init__(self, address, authkey):
+        self.conn = Client(address, authkey=authkey)
+        self._finished = False
+
+    def _request(self, *request):
+        try:
+            self.conn.send(request)
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self._finished = True
+            return None
+
+    def get_config(self):
+        return self._request('config')
+
+    def claim(self, worker):
+        reply = self._request('claim', worker)
+        if reply is None or reply[0] == 'stop':
+            self._finished = True
+            return None
+        return (reply[1], reply[2]) if reply[0] == 'job' else None
+
+    def complete(self, job_id, result, error=None):
+        self._request('complete', job_id, result, error)
+
+    def finished(self):
+        return self._finished
+
+    def close(self):
+        self.conn.close()
+
+
+def _tcp_address(url):
+    host, _, port = url[len("tcp://"):].rpartition(':')
+    return host, int(port)
+
+def open_job_queue(url, authkey=None, server=False):
+    """
+    Opens the job queue of a distributed batch from its URL:
+
+    - `sqlite:///path/to/queue.db`: SqliteJobQueue on a file reachable by all hosts.
+    - `tcp://host:port`: TcpJobServer bound to the address on the coordinator (`server=True`),
+      TcpJobClient connecting to it on the workers. Requires the shared `authkey` (bytes).
+    """
+    if url.startswith("sqlite:///"):
+        return SqliteJobQueue(url[len("sqlite:///"):])
+    if url.startswith("tcp://"):
+        if not authkey:
+            raise ValueError("The tcp job queue needs an authkey (batch: queue_authkey or BATCH_QUEUE_AUTHKEY)")
+        return TcpJobServer(_tcp_address(url), authkey) if server else TcpJobClient(_tcp_address(url), authkey)
+    raise ValueError(f"Unknown job queue URL {url!r}, expected sqlite:///<path> or tcp://<host>:<port>")
+
+
+def _failure_reason(task, reason):
+    return reason
+
+
+class DistributedScheduler:
+    """
+    Coordinator of a distributed batch, with the run()/stop() interface of TaskScheduler: puts the
+    tasks into the job queue and yields (task, result) as the workers on any host finish them.
+
+    Jobs claimed longer than `lease_s` ago (a lost or hung worker) are requeued, up to
+    `max_retries` times, and afterwards reported as `on_failure(task, reason)`; so are the jobs
+    whose worker raised. stop() drops the jobs not claimed yet.
+    """
+    def __init__(self, job_queue, lease_s=DEFAULT_LEASE_S, max_retries=1, poll_s=1.0, on_failure=None):
+        if lease_s is None or lease_s <= 0:
+            raise ValueError("A distributed batch needs a finite lease, or the jobs of a lost worker never finish")
+        self.job_queue = job_queue
+        self.lease_s = lease_s
+        self.max_retries = max(0, int(max_retries))
+        self.poll_s = poll_s
+        self.on_failure = on_failure or _failure_reason
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self, tasks):
+        self._stopped = False
+        cancelled = False
+        self.job_queue.put(list(tasks))
+        try:
+            while True:
+                if self._stopped and not cancelled:
+                    self.job_queue.cancel()
+                    cancelled = True
+                finished = self.job_queue.collect()
+                for task, result, error in finished:
+                    yield task, (result if error is None else self.on_failure(task, error))
+                for task, reason in self.job_queue.requeue_expired(self.lease_s, self.max_retries):
+                    yield task, self.on_failure(task, reason)
+                if not self.job_queue.outstanding():
+                    break
+                if not finished:
+                    time.sleep(self.poll_s)
+        finally:
+            self.job_queue.close_batch()
+
+
+def run_queue_worker(url, worker, initializer=None, authkey=None, poll_s=1.0):
+    """
+    Worker loop of a distributed batch: waits for the coordinator's batch config, calls
+    `initializer(config)` once, then claims, runs and completes jobs until the batch is closed.
+    """
+    job_queue = open_job_queue(url, authkey)
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        config = job_queue.get_config()
+        while config is None and not job_queue.finished():
+            time.sleep(poll_s)
+            config = job_queue.get_config()
+        if config is None:
+            return
+        if initializer is not None:
+            initializer(config)
+        while not job_queue.finished():
+            job = job_queue.claim(name)
+            if job is None:
+                time.sleep(poll_s)
+                continue
+            job_id, task = job
+            try:
+                result, error = worker(task), None
+            except Exception as e:
+                logging.error(f"{name}: job {job_id} failed: {e}", exc_info=True)
+                result, error = None, f"{type(e).__name__}: {e}"
+            job_queue.complete(job_id, result, error)
+    finally:
+        job_queue.close()
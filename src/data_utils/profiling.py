@@ -0,0 +1,161 @@
+import sys
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from numbers import Number
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+PROFILE_FILE = 'profile.json'
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB, or None where it is not available (Windows)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def solver_time(result):
+    """Solve time reported by a Pyomo solver result (wall clock if available), or None if the solver reports none."""
+    for field in ('wallclock_time', 'time', 'user_time'):
+        value = getattr(result.solver, field, None)
+        value = getattr(value, 'value', value)
+        if isinstance(value, Number):
+            return float(value)
+    return None
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time and (optionally) peak traced memory of the pipeline stages of a run.
+
+        profiler = StageProfiler(trace_memory=True)
+        with profiler.stage('da_build'):
+            instance = model.create_instance(data)
+
+    A stage entered several times accumulates its times and keeps the largest peak. Stages may
+    be nested; the peak of an outer stage includes its inner stages. Peak memory comes from
+    tracemalloc, i.e. Python and numpy allocations of this process (not the memory of an
+    external solver process), and tracing slows allocations down noticeably. A disabled
+    profiler records nothing.
+    """
+    def __init__(self, enabled=True, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = {}
+        self._stack = []
+        self._started_tracing = False
+
+    @classmethod
+    def from_config(cls, config):
+        """Profiler configured by the `profiling` section of the model config (disabled if absent)."""
+        cfg = config.get('profiling') or {}
+        return cls(enabled=cfg.get('enabled', False), trace_memory=cfg.get('trace_memory', False))
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if self._stack:
+                # Keep the outer stage's peak so far before the peak is reset for this stage
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = {'peak': 0}
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            peak = None
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            self._record(name, wall, cpu, peak)
+
+    def _record(self, name, wall, cpu, peak):
+        entry = self.stages.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+        entry['wall_s'] += wall
+        entry['cpu_s'] += cpu
+        entry['calls'] += 1
+        if peak is not None:
+            entry['peak_mb'] = max(entry.get('peak_mb', 0.0), peak / 2**20)
+
+    def record_solver_time(self, name, result):
+        """
+        Splits a Pyomo solve stage into the time the solver reports and the rest (writing the
+        problem file, starting the solver, reading the solution back).
+        """
+        if not self.enabled or name not in self.stages:
+            return
+        reported = solver_time(result)
+        if reported is not None:
+            entry = self.stages[name]
+            entry['solver_s'] = entry.get('solver_s', 0.0) + reported
+            entry['io_s'] = max(entry['wall_s'] - entry['solver_s'], 0.0)
+
+    def to_dict(self, **info):
+        """The recorded stages and the process peak RSS, with `info` (e.g. run_id) as extra top-level fields."""
+        return dict(info, stages={name: dict(entry) for name, entry in self.stages.items()}, peak_rss_mb=peak_rss_mb())
+
+    def write_json(self, path, **info):
+        """Writes to_dict() to `path`."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(**info), f, indent=2)
+        return path
+
+    def close(self):
+        """Stops tracemalloc if this profiler started it."""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+
+def aggregate_profiles(profiles):
+    """
+    Aggregates the per-run profiles (StageProfiler.to_dict() of each run) across a batch.
+
+    Returns:
+        dict: {'runs', 'stages': {stage: {'runs', 'wall_s_total', 'wall_s_mean', 'wall_s_max',
+            'cpu_s_mean', ...}}, 'peak_rss_mb_max'}, with 'peak_mb_max' / 'solver_s_mean' /
+            'io_s_mean' per stage where the runs recorded them.
+    """
+    summary = {}
+    stages = {}
+    for profile in profiles:
+        for name, entry in profile.get('stages', {}).items():
+            stages.setdefault(name, []).append(entry)
+    for name, entries in stages.items():
+        walls = [e['wall_s'] for e in entries]
+        stat = {
+            'runs': len(entries),
+            'wall_s_total': sum(walls),
+            'wall_s_mean': sum(walls) / len(walls),
+            'wall_s_max': max(walls),
+            'cpu_s_mean': sum(e['cpu_s'] for e in entries) / len(entries),
+        }
+        for field in ('solver_s', 'io_s'):
+            values = [e[field] for e in entries if field in e]
+            if values:
+                stat[f'{field}_mean'] = sum(values) / len(values)
+        peaks = [e['peak_mb'] for e in entries if 'peak_mb' in e]
+        if peaks:
+            stat['peak_mb_max'] = max(peaks)
+        summary[name] = stat
+    rss = [p['peak_rss_mb'] for p in profiles if p.get('peak_rss_mb') is not None]
+    return {'runs': len(profiles), 'stages': summary, 'peak_rss_mb_max': max(rss) if rss else None}
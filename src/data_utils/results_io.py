@@ -0,0 +1,124 @@
+import os
+import json
+from datetime import datetime
+import pandas as pd
+
+MANIFEST_FILE = 'manifest.json'
+
+# Readers/writers of the binary output formats: one file per table
+FORMATS = {
+    'parquet': ('.parquet', lambda df, path: df.to_parquet(path, index=False), pd.read_parquet),
+    'feather': ('.feather', lambda df, path: df.to_feather(path), pd.read_feather),
+}
+
+
+def _json_label(label):
+    """Column/index labels as JSON values (numpy integers become int, everything else keeps its str form)."""
+    if hasattr(label, 'item'):
+        label = label.item()
+    return label if isinstance(label, (int, float, str)) or label is None else str(label)
+
+
+def _to_columnar(table):
+    """
+    Flattens a results DataFrame for a columnar file: the index (tuple indexes become levels)
+    is moved into columns and all column names become strings.
+
+    Returns:
+        tuple: (flat DataFrame, index column names, original column labels, mixed int/str columns)
+    """
+    index = table.index
+    if len(index) and not isinstance(index, pd.MultiIndex) and isinstance(index[0], tuple):
+        index = pd.MultiIndex.from_tuples(index)
+    index_names = [str(name) if name is not None else f'__index_level_{i}__' for i, name in enumerate(index.names)]
+    flat = table.set_axis(index.set_names(index_names), axis=0).reset_index()
+    flat.columns = [str(col) for col in flat.columns]
+
+    # Labels such as generator ids mixed with 'RE'/'Total' rows have no columnar type: stored as str
+    mixed = [col for col in flat.columns if pd.api.types.infer_dtype(flat[col], skipna=True) == 'mixed-integer']
+    for col in mixed:
+        flat[col] = flat[col].astype(str)
+    return flat, index_names, [_json_label(col) for col in table.columns], mixed
+
+
+def _restore_mixed(values):
+    """Inverse of the str conversion of mixed int/str label columns."""
+    return [int(v) if v.lstrip('-').isdigit() else v for v in values]
+
+
+def save_results_tables(tables, results_dir, output_format='parquet', sheet_names=None):
+    """
+    Saves the results tables of a run.
+
+    Args:
+        tables (dict): {table name: pd.DataFrame}.
+        results_dir (str): Output directory.
+        output_format (str): 'parquet' or 'feather' (one file per table plus `manifest.json`),
+            or 'excel' (all tables as sheets of `results.xlsx`).
+        sheet_names (dict, optional): Excel sheet name per table, defaults to the table name.
+
+    Returns:
+        str: Path of the manifest, or of the Excel file.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    sheet_names = sheet_names or {}
+
+    if output_format == 'excel':
+        output_excel_path = os.path.join(results_dir, "results.xlsx")
+        with pd.ExcelWriter(output_excel_path) as writer:
+            for name, table in tables.items():
+                table.to_excel(writer, sheet_name=sheet_names.get(name, name))
+        return output_excel_path
+
+    if output_format not in FORMATS:
+        raise ValueError(f"Invalid output format: {output_format!r}. Must be one of {sorted(FORMATS) + ['excel']}.")
+    suffix, write, _ = FORMATS[output_format]
+
+    manifest = {'format': output_format, 'created': datetime.now().isoformat(timespec='seconds'), 'tables': {}}
+    for name, table in tables.items():
+        flat, index_names, columns, mixed = _to_columnar(table)
+        file_name = name + suffix
+        write(flat, os.path.join(results_dir, file_name))
+        manifest['tables'][name] = {
+            'file': file_name,
+            'sheet': sheet_names.get(name, name),
+            'rows': len(table),
+            'index': index_names,
+            'columns': columns,
+            'mixed': mixed,
+        }
+
+    manifest_path = os.path.join(results_dir, MANIFEST_FILE)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def load_results_tables(results_dir, tables=None):
+    """
+    Loads results saved by save_results_tables in parquet/feather format, restoring the index
+    and the original column labels.
+
+    Args:
+        results_dir (str): Directory containing `manifest.json`.
+        tables (list, optional): Names of the tables to load, defaults to all.
+
+    Returns:
+        dict: {table name: pd.DataFrame}
+    """
+    with open(os.path.join(results_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    _, _, read = FORMATS[manifest['format']]
+
+    loaded = {}
+    for name, entry in manifest['tables'].items():
+        if tables is not None and name not in tables:
+            continue
+        table = read(os.path.join(results_dir, entry['file']))
+        for col in entry.get('mixed', []):
+            table[col] = pd.Series(_restore_mixed(table[col]), index=table.index, dtype=object)
+        table = table.set_index(entry['index'])
+        table.index.names = [None if n.startswith('__index_level_') else n for n in entry['index']]
+        table.columns = entry['columns']
+        loaded[name] = table
+    return loaded
@@ -1,31 +1,50 @@
 import pandas as pd
 import numpy as np
 import pyomo.environ as pyo
+from data_utils.solution_arrays import var_array, dual_array, param_array
+
+def _rt_arrays(iRT):
+    """Sets and dense solution arrays of a solved RT instance: prices[s, t], xup/xdn[s, g, t], d/rgup/rgdn/sdup[s, t]."""
+    S, Gs, T = list(iRT.S), list(iRT.G_FO_sellers), list(iRT.T)
+    return {
+        'S': S, 'G': Gs, 'T': T,
+        'prob': param_array(iRT, 'prob', [S]),
+        'price': dual_array(iRT, 'Con3', [S, T]),
+        'xup': var_array(iRT, 'xup', [S, Gs, T]),
+        'xdn': var_array(iRT, 'xdn', [S, Gs, T]),
+        'd': var_array(iRT, 'd', [S, T]),
+        'rgup': var_array(iRT, 'rgup', [S, T]),
+        'rgdn': var_array(iRT, 'rgdn', [S, T]),
+        'sdup': var_array(iRT, 'sdup', [S, T]),
+    }
+
+
+def _generator_costs(dataRT, name, Gs):
+    """Returns the cost parameter `name` of the FO sellers as an array and a mask of the generators that have it."""
+    values = dataRT[None][name]
+    found = np.array([values.get(g) is not None for g in Gs], dtype=bool)
+    return np.array([values.get(g) if values.get(g) is not None else 0.0 for g in Gs], dtype=float), found
+
 
 def calculate_rt_margins(iRT, dataRT):
     """Calculates the Real-Time margins for each generator and scenario."""
-    rt_margins_data = {}
-    for s in iRT.S:
-        for g in iRT.G_FO_sellers:
-            for t in iRT.T:
-                dual_value = iRT.dual[iRT.Con3[s, t]]
-                vc_g = dataRT[None]["VC"].get(g)
-                if vc_g is None:
-                     print(f"Warning: VC not found for generator {g}. Skipping margin calculation for (s={s}, g={g}, t={t}).")
-                     continue
-
-                vc_component = iRT.prob[s] * vc_g
-                gen_adjustment = iRT.xup[s, g, t].value - iRT.xdn[s, g, t].value
-
-                margin = (dual_value - vc_component) * gen_adjustment
-                rt_margins_data[(s, g, t)] = margin
-
-    # Convert dictionary to a Series with MultiIndex (s, g, t)
-    rt_margins_series = pd.Series(rt_margins_data)
-
-    # Unstack to create DataFrame: Index (Generator, Time), Columns (Scenario)
-    RTmargins = rt_margins_series.unstack(level=0)
-    RTmargins.index.names = ['Generator', 'Time']
+    rt = _rt_arrays(iRT)
+    Gs = rt['G']
+    VC, found = _generator_costs(dataRT, "VC", Gs)
+    for g in np.asarray(Gs, dtype=object)[~found]:
+        print(f"Warning: VC not found for generator {g}. Skipping margin calculation for generator {g}.")
+
+    # margin[s, g, t] = (price[s, t] - prob[s] * VC[g]) * (xup[s, g, t] - xdn[s, g, t])
+    margins = (rt['price'][:, None, :] - rt['prob'][:, None, None] * VC[None, :, None]) * (rt['xup'] - rt['xdn'])
+    margins = margins[:, found, :]
+    kept = [g for g, keep in zip(Gs, found) if keep]
+
+    # DataFrame: Index (Generator, Time), Columns (Scenario)
+    RTmargins = pd.DataFrame(
+        margins.transpose(1, 2, 0).reshape(len(kept) * len(rt['T']), len(rt['S'])),
+        index=pd.MultiIndex.from_product([kept, rt['T']], names=['Generator', 'Time']),
+        columns=rt['S'],
+    ).sort_index().sort_index(axis=1)
 
     # Adjust index if it starts from 0
     if not RTmargins.empty and RTmargins.index.get_level_values('Generator').min() == 0:
@@ -35,51 +54,62 @@ def calculate_rt_margins(iRT, dataRT):
          )
     return RTmargins
 
+def _tier_awards(df, column, Gs, T):
+    """Dense (tier, generator, period) array of the FO awards in `column` of the extract_da award table, and the sorted tiers."""
+    tiers = np.unique(df["R"].to_numpy())
+    r_pos = np.searchsorted(tiers, df["R"].to_numpy())
+    g_pos = pd.Index(Gs).get_indexer(df["G"])
+    t_pos = pd.Index(T).get_indexer(df["T"])
+    keep = (g_pos >= 0) & (t_pos >= 0)
+    awards = np.zeros((len(tiers), len(Gs), len(T)))
+    np.add.at(awards, (r_pos[keep], g_pos[keep], t_pos[keep]), df[column].to_numpy(dtype=float)[keep])
+    return awards, tiers
+
 def calculate_rt_payoffs(iRT, dataRT, df):
-    """Calculates the Real-Time up and down flexibility offer payoffs."""
+    """
+    Calculates the Real-Time up and down flexibility offer payoffs.
+
+    The UP payoff of scenario s covers the hsu awards of all tiers r >= s and the DN payoff the
+    hsd awards of all tiers r < s; both are taken from tier-cumulative sums of the award arrays.
+    """
+    rt = _rt_arrays(iRT)
+    S, Gs, T = rt['S'], rt['G'], rt['T']
+    price, prob = rt['price'], rt['prob']
+    VCUP, found_up = _generator_costs(dataRT, "VCUP", Gs)
+    VCDN, found_dn = _generator_costs(dataRT, "VCDN", Gs)
+    for g, up, dn in zip(Gs, found_up, found_dn):
+        if not up:
+            print(f"Warning: VCUP not found for generator {g}. Skipping its UP payoffs.")
+        if not dn:
+            print(f"Warning: VCDN not found for generator {g}. Skipping its DN payoffs.")
+
+    hsu, tiers = _tier_awards(df, "hsu", Gs, T)
+    hsd, _ = _tier_awards(df, "hsd", Gs, T)
+    # above[k]: sum over the tiers r >= tiers[k], below[k]: sum over the tiers r < tiers[k]
+    above = np.cumsum(hsu[::-1], axis=0)[::-1]
+    below = np.concatenate([np.zeros((1, len(Gs), len(T))), np.cumsum(hsd, axis=0)])
+
     up_payoffs_dict = {}
     dn_payoffs_dict = {}
 
-    for s in iRT.S:
+    for k, s in enumerate(S):
         # Calculate UP payoffs summed over time t
+        # Scenarios without any matching tier keep integer zero payoffs
+        pos = np.searchsorted(tiers, s, side='left')
         if s < iRT.S.last(): # Ensure s is not the last scenario for UP payoffs
-            current_up_payoffs = []
-            for g in iRT.G_FO_sellers:
-                total_payoff_g = 0
-                for t in iRT.T:
-                    mask = (df["R"] >= s) & (df["G"] == g) & (df["T"] == t)
-                    if not mask.empty and len(df.loc[mask]) > 0:
-                        hsu_sum_for_g = df.loc[mask, "hsu"].sum()
-                        price_component = iRT.dual[iRT.Con3[s, t]] * hsu_sum_for_g
-                        vcup_g = dataRT[None]["VCUP"].get(g)
-                        if vcup_g is None:
-                            print(f"Warning: VCUP not found for generator {g}. Skipping UP payoff for (s={s}, g={g}, t={t}).")
-                            continue
-                        cost_component = iRT.prob[s] * vcup_g * hsu_sum_for_g
-                        payoff = -(price_component - cost_component)
-                        total_payoff_g += payoff
-                current_up_payoffs.append(total_payoff_g)
-            up_payoffs_dict[f"UP{s}"] = current_up_payoffs
+            if pos < len(tiers):
+                payoff = -(price[k][None, :] - prob[k] * VCUP[:, None]) * above[pos]   # (G, T)
+                up_payoffs_dict[f"UP{s}"] = list(np.where(found_up, payoff.sum(axis=1), 0.0))
+            else:
+                up_payoffs_dict[f"UP{s}"] = [0] * len(Gs)
 
         # Calculate DN payoffs summed over time t
         if s > iRT.S.first(): # Ensure s is not the first scenario for DN payoffs
-            current_dn_payoffs = []
-            for g in iRT.G_FO_sellers:
-                total_payoff_g = 0
-                for t in iRT.T:
-                    mask = (df["R"] < s) & (df["G"] == g) & (df["T"] == t)
-                    if not mask.empty and len(df.loc[mask]) > 0:
-                        hsd_sum_for_g = df.loc[mask, "hsd"].sum()
-                        price_component = iRT.dual[iRT.Con3[s, t]] * hsd_sum_for_g
-                        vcdn_g = dataRT[None]["VCDN"].get(g)
-                        if vcdn_g is None:
-                            print(f"Warning: VCDN not found for generator {g}. Skipping DN payoff for (s={s}, g={g}, t={t}).")
-                            continue
-                        cost_component = iRT.prob[s] * vcdn_g * hsd_sum_for_g
-                        payoff = price_component - cost_component
-                        total_payoff_g += payoff
-                current_dn_payoffs.append(total_payoff_g)
-            dn_payoffs_dict[f"DN{s}"] = current_dn_payoffs
+            if pos > 0:
+                payoff = (price[k][None, :] - prob[k] * VCDN[:, None]) * below[pos]
+                dn_payoffs_dict[f"DN{s}"] = list(np.where(found_dn, payoff.sum(axis=1), 0.0))
+            else:
+                dn_payoffs_dict[f"DN{s}"] = [0] * len(Gs)
 
     # Combine UP and DN payoffs into the RTpayoffs DataFrame
     RTpayoffs = pd.DataFrame({**up_payoffs_dict, **dn_payoffs_dict})
@@ -99,36 +129,56 @@ def calculate_system_metrics(iRT, dataRT, total_da):
     Total.loc['unmet_demand', 'DA'] = np.nan # No unmet demand in DA
     Total.loc['curtail cost', 'DA'] = np.nan # No curtailment in DA
 
-
-    for s in iRT.S:
-        # RT Cost (summed over t)
-        up_costs = sum(dataRT[None]["VCUP"].get(g, 0) * iRT.xup[s, g, t].value 
-                      for g in iRT.G_FO_sellers for t in iRT.T)
-        down_costs = sum(dataRT[None]["VCDN"].get(g, 0) * iRT.xdn[s, g, t].value 
-                        for g in iRT.G_FO_sellers for t in iRT.T)
-        # Note the sign change for down_costs as xdn is reduction
-        Total.at['total cost', s] = iRT.prob[s] * (up_costs - down_costs)
-
-        # RT Price (average price over time)
-        prices_s = [iRT.dual[iRT.Con3[s, t]] for t in iRT.T]
-        Total.at['average price', s] = np.mean(prices_s) if prices_s else np.nan
-
-        # RT Unmet demand cost (summed over t)
-        d1_val = dataRT[None]["D1"].get(None, 0)
-        d2_val = dataRT[None]["D2"].get(None, 0)
-        Total.at['unmet_demand', s] = iRT.prob[s] * sum(
-            d1_val * iRT.d[s, t].value +
-            d2_val * iRT.d[s, t].value**2
-            for t in iRT.T
-        )
-
-        # RT Curtailment cost (summed over t)
-        pendn_val = dataRT[None]["PENDN"].get(None, 0)
-        Total.at['curtail cost', s] = iRT.prob[s] * sum(iRT.sdup[s, t].value * pendn_val for t in iRT.T)
+    rt = _rt_arrays(iRT)
+    prob = rt['prob']
+    VCUP = np.array([dataRT[None]["VCUP"].get(g, 0) for g in rt['G']], dtype=float)
+    VCDN = np.array([dataRT[None]["VCDN"].get(g, 0) for g in rt['G']], dtype=float)
+    d1_val = dataRT[None]["D1"].get(None, 0)
+    d2_val = dataRT[None]["D2"].get(None, 0)
+    pendn_val = dataRT[None]["PENDN"].get(None, 0)
+
+    # RT Cost (summed over g and t); note the sign change for down_costs as xdn is reduction
+    up_costs = np.einsum('g,sgt->s', VCUP, rt['xup'])
+    down_costs = np.einsum('g,sgt->s', VCDN, rt['xdn'])
+    total_cost = prob * (up_costs - down_costs)
+    # RT Price (average price over time)
+    average_price = rt['price'].mean(axis=1) if rt['T'] else np.full(len(rt['S']), np.nan)
+    # RT Unmet demand cost and curtailment cost (summed over t)
+    unmet_demand = prob * (d1_val * rt['d'] + d2_val * rt['d']**2).sum(axis=1)
+    curtail_cost = prob * (rt['sdup'] * pendn_val).sum(axis=1)
+
+    for k, s in enumerate(rt['S']):
+        Total.at['total cost', s] = total_cost[k]
+        Total.at['average price', s] = average_price[k]
+        Total.at['unmet_demand', s] = unmet_demand[k]
+        Total.at['curtail cost', s] = curtail_cost[k]
 
     return Total
 
 
+def calculate_end_state(iDA, iRT):
+    """
+    State at the end of the day that the next day of a rolling horizon starts from.
+
+    Returns:
+        dict: 'X0' {FO seller: DA output in the last period} and 'E0' {storage: expected energy
+            level in the last period over the RT scenarios, or the DA level if the RT solution
+            has no storage variables}.
+    """
+    # Full blocks sliced at the last period: matrix solutions only come as whole variable blocks
+    T = list(iDA.T)
+    Gs, B = list(iDA.G_FO_sellers), list(iDA.B)
+    state = {'X0': dict(zip(Gs, var_array(iDA, 'xDA', [Gs, T])[:, -1].tolist())), 'E0': {}}
+    if B:
+        if hasattr(iRT, 'e'):
+            S = list(iRT.S)
+            energy = param_array(iRT, 'prob', [S]) @ var_array(iRT, 'e', [S, B, T])[:, :, -1]
+        else:
+            energy = var_array(iDA, 'e', [B, T])[:, -1]
+        state['E0'] = dict(zip(B, energy.tolist()))
+    return state
+
+
 def calculate_premium_convergence(Gross_margins, RTpayoffs):
     """Calculates the convergence of flexibility premiums."""
     # Ensure RTpayoffs index matches Gross_margins if possible, assuming 1-based generator index
@@ -182,7 +232,7 @@ def calculate_total_margins(iRT, dataRT, Gross_margins, RTmargins, RTpayoffs, pr
         if Gross_margins.empty:
              da_margins_s = pd.Series(0, index=Total_margin.index)
         else:
-             da_margins_s = iRT.prob[s] * Gross_margins.sum(axis=1)
+             da_margins_s = pyo.value(iRT.prob[s]) * Gross_margins.sum(axis=1)
 
 
         # RT Margins for scenario s
@@ -210,18 +260,23 @@ def calculate_total_margins(iRT, dataRT, Gross_margins, RTmargins, RTpayoffs, pr
     # --- RE and DR Margins ---
     da_price_mean = total_da['price'].mean() if 'price' in total_da and not total_da['price'].empty else 0
 
-    for s in iRT.S:
+    rt = _rt_arrays(iRT)
+    REDA = np.array([dataRT[None]["REDA"].get(t, 0) for t in rt['T']], dtype=float)
+    DAdr = np.array([dataRT[None]["DAdr"].get(t, 0) for t in rt['T']], dtype=float)
+    D1 = dataRT[None]["D1"].get(None, 0)
+    D2 = dataRT[None]["D2"].get(None, 0)
+    RE_rt_adjustment = (rt['price'] * (rt['rgup'] - rt['rgdn'])).sum(axis=1)
+    DR_rt_values = (rt['price'] * rt['d']).sum(axis=1)
+    DR_costs = rt['prob'] * (D1 * (rt['d'] + DAdr) + D2 * (rt['d'] + DAdr)**2).sum(axis=1)
+
+    for k, s in enumerate(rt['S']):
         s_col = s
+        prob_s = rt['prob'][k]
 
         # --- RE margin calculation for scenario s ---
-        RE_rt_adjustment_value = sum(
-            iRT.dual[iRT.Con3[s, t]] * (iRT.rgup[s, t].value - iRT.rgdn[s, t].value)
-            for t in iRT.T
-        )
+        RE_rt_adjustment_value = RE_rt_adjustment[k]
 
-        DA_RE_revenue = iRT.prob[s] * sum(
-            dataRT[None]["REDA"].get(t, 0) * da_price_mean for t in iRT.T
-        )
+        DA_RE_revenue = prob_s * (REDA * da_price_mean).sum()
 
         # Total premium paid by RE (sum across all generators)
         # Need to handle empty premium_convergence
@@ -240,21 +295,45 @@ def calculate_total_margins(iRT, dataRT, Gross_margins, RTmargins, RTpayoffs, pr
                  RE_rt_payoff_adjustment += RTpayoffs[f"UP{s}"].sum()
 
 
-        RE_total = RE_rt_adjustment_value + DA_RE_revenue - iRT.prob[s] * total_premiums # - RE_rt_payoff_adjustment # Removed based on re-evaluating original formula's intent
+        RE_total = RE_rt_adjustment_value + DA_RE_revenue - prob_s * total_premiums # - RE_rt_payoff_adjustment # Removed based on re-evaluating original formula's intent
 
         Total_margin.loc['RE', s_col] = RE_total
 
         # --- DR margin calculation for scenario s ---
-        DR_rt_value = sum( iRT.dual[iRT.Con3[s, t]] * iRT.d[s, t].value for t in iRT.T)
+        DR_rt_value = DR_rt_values[k]
 
-        DA_DR_revenue = iRT.prob[s] * sum( dataRT[None]["DAdr"].get(t, 0) * da_price_mean for t in iRT.T)
+        DA_DR_revenue = prob_s * (DAdr * da_price_mean).sum()
 
-        DR_cost = iRT.prob[s] * sum(
-             dataRT[None]["D1"].get(None, 0) * (iRT.d[s, t].value + dataRT[None]["DAdr"].get(t, 0)) +
-             dataRT[None]["D2"].get(None, 0) * (iRT.d[s, t].value + dataRT[None]["DAdr"].get(t, 0))**2
-             for t in iRT.T
-        )
+        DR_cost = DR_costs[k]
 
         Total_margin.loc['DR', s_col] = DR_rt_value + DA_DR_revenue - DR_cost
 
-    return Total_margin 
\ No newline at end of file
+    return Total_margin 
+
+# Rows of calculate_system_metrics reported per run by summarize_run (RT columns are probability-weighted per scenario)
+RUN_METRICS = ['total cost', 'average price', 'unmet_demand', 'curtail cost']
+
+def summarize_run(results):
+    """
+    Flattens the results of one DAFO -> RTSim run (batch_simulation.run_single_simulation) into a
+    dict of scalar metrics: DA and RT (summed over the scenarios, prices averaged) system metrics,
+    total FO awards and the FO procurement cost (tier prices times the procured demand FOs).
+    """
+    row = {}
+    Total = results['Total']
+    rt_cols = [c for c in Total.columns if c != 'DA']
+    for metric in RUN_METRICS:
+        key = metric.replace(' ', '_')
+        row[f'da_{key}'] = Total.at[metric, 'DA'] if 'DA' in Total.columns else np.nan
+        values = Total.loc[metric, rt_cols].astype(float)
+        row[f'rt_{key}'] = values.mean() if metric == 'average price' else values.sum()
+
+    df, demand, Prices = results['df'], results['demand'], results['Prices']
+    row['fo_supply_up'] = df['hsu'].sum()
+    row['fo_supply_down'] = df['hsd'].sum()
+    row['fo_demand_up'] = demand['hdu'].sum()
+    row['fo_demand_down'] = demand['hdd'].sum()
+    up_prices = np.array([Prices.at[t, f'up_R{r}'] for r, t in demand.index])
+    down_prices = np.array([Prices.at[t, f'down_R{r}'] for r, t in demand.index])
+    row['fo_cost'] = float(up_prices @ demand['hdu'].to_numpy() + down_prices @ demand['hdd'].to_numpy())
+    return row
@@ -0,0 +1,96 @@
+import os
+import json
+import random
+from datetime import datetime
+
+MANIFEST_FILE = "manifest.jsonl"
+
+
+class RunManifest:
+    """
+    Append-only record of the runs of a batch, for resuming it after a crash or preemption.
+
+    The manifest is a JSON-lines file in the batch output directory. The first line is the batch
+    header with the base seed; every recorded run appends one line, flushed to disk right away
+    (batch_simulation records a Parquet-store run once its tables are in a part file, see
+    `batch: checkpoint_s`):
+
+        {"type": "batch", "seed": 81273, "created": "..."}
+        {"type": "run", "run_id": 0, "seed": 81273, "status": "Success", "elapsed_s": 12.1,
+         "finished": "...", "output": "results/batch_simulations/run_000", "metrics": {...}}
+
+    Run `i` uses the seed `seed + i`, so a re-queued run draws the same scenarios as its first
+    attempt. Reopening an existing manifest keeps its base seed; a run counts as completed if
+    its latest entry has the status "Success". A partially written last line (crash during the
+    write) is ignored.
+
+    Args:
+        output_dir (str): Batch output directory.
+        seed (int, optional): Base seed of a new manifest (random if None).
+        resume (bool): Continue an existing manifest; False starts a new one.
+    """
+    def __init__(self, output_dir, seed=None, resume=True):
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        self.runs = {}
+        header = None
+        if resume and os.path.exists(self.path):
+            header = self._read()
+        if header is None:
+            self.runs = {}
+            self.seed = seed if seed is not None else random.SystemRandom().randrange(2**31 - 1)
+            header = {'type': 'batch', 'seed': self.seed, 'created': datetime.now().isoformat(timespec='seconds')}
+            with open(self.path, 'w') as f:
+                f.write(json.dumps(header) + "\n")
+        else:
+            self.seed = header['seed']
+        self._file = open(self.path, 'a')
+        if self._file.tell() and not self._ends_with_newline():
+            # Terminate a partial last line, so that the next entry starts on a line of its own
+            self._file.write("\n")
+
+    def _read(self):
+        """Loads the header and the latest entry of every run; returns the header (None if unreadable)."""
+        header = None
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get('type') == 'batch':
+                    header = entry
+                elif entry.get('type') == 'run':
+                    self.runs[entry['run_id']] = entry
+        return header
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def run_seed(self, run_id):
+        return self.seed + run_id
+
+    def completed(self):
+        """Run ids whose latest entry is a success."""
+        return {run_id for run_id, entry in self.runs.items() if entry['status'] == "Success"}
+
+    def record(self, run_id, status, elapsed_s=None, output=None, metrics=None):
+        """Appends the entry of a finished run and forces it to disk."""
+        entry = {
+            'type': 'run',
+            'run_id': run_id,
+            'seed': self.run_seed(run_id),
+            'status': status,
+            'elapsed_s': elapsed_s,
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'output': output,
+            'metrics': metrics,
+        }
+        self.runs[run_id] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
@@ -1,34 +1,121 @@
 import pandas as pd
+import numpy as np
 import os
 import glob
+import json
 from collections import defaultdict
 
-def scenario_generation(input_dir, output_file, config):
+# Define hour columns ordering
+hour_columns_ordered = [
+    '0800', '0900', '1000', '1100', '1200', '1300', '1400', '1500',
+    '1600', '1700', '1800', '1900', '2000', '2100', '2200', '2300',
+    '0000', '0100', '0200', '0300', '0400', '0500', '0600', '0700'
+]
+
+# Default location of the binary cache of the raw renewable CSVs
+DEFAULT_CUBE_PATH = os.path.join('data', 'processed', 'renewable_cube.npy')
+
+
+def scenario_generation(input_dir, output_file, config, random_state=None):
     """
     Aggregates simulation data from multiple CSV files, summing data for the
     same simulation index across all files for each time period.
 
-    We can add parallelism processing here through multithreading / faster I/O formats if needed.
+    The raw CSVs are parsed once into a (site x simulation index x hour) cube that is cached
+    as a binary file (see load_renewable_cube); every later call only sums the memory-mapped
+    slices of the selected simulations.
 
     Args:
         input_dir (str): The root directory containing renewable data CSVs.
-        output_file (str): The path to save the aggregated CSV file.
+        output_file (str): The path to save the aggregated CSV file, or None to only return
+            the scenarios (see DataProcessor.prepare_pyomo_data(renewable_scenarios=...)).
         config (dict): Configuration dictionary.
+        random_state (int, optional): Seed of the 'random' criteria.
+
+    Returns:
+        tuple: ((scenario x period) renewable generation of the selected scenarios, scenario
+            probabilities or None if they are equiprobable), or (None, None) if no simulation
+            data was found. With a reduction criterion the probabilities are also written next
+            to `output_file` (see scenario_probabilities_path).
     """
-    all_files = glob.glob(os.path.join(input_dir, '**', '*.csv'), recursive=True)
-
-    # Define hour columns ordering
-    hour_columns_ordered = [
-        '0800', '0900', '1000', '1100', '1200', '1300', '1400', '1500',
-        '1600', '1700', '1800', '1900', '2000', '2100', '2200', '2300',
-        '0000', '0100', '0200', '0300', '0400', '0500', '0600', '0700'
-    ]
     column_mapping = {col: i + 1 for i, col in enumerate(hour_columns_ordered)}
 
-    # List to hold all simulation dataframes
-    all_sim_dfs = []
+    cube_path = config.get('data_paths', {}).get('renewable_cube', DEFAULT_CUBE_PATH)
+    cube, sim_index = load_renewable_cube(input_dir, cube_path)
+    if cube is None:
+        print("No simulation data found or aggregated.")
+        return None, None
+
+    # Select scenarios (on the simulation indices only, the data is sliced afterwards; the
+    # reduction criteria need the site-aggregated profiles of all simulations)
+    num_scenarios = config['general']['num_scenarios']
+    num_periods = config['general']['num_periods']
+    criteria = config['scenario_selection']['criteria']
+    profiles = cube[:, :, :num_periods].sum(axis=0, dtype=np.float64) if criteria in REDUCTION_CRITERIA else None
+    positions, probabilities = select_scenario_positions(sim_index, num_scenarios, criteria, profiles=profiles, random_state=random_state)
+
+    # Select number of periods and sum the selected simulations over all sites
+    aggregated = cube[:, positions, :num_periods].sum(axis=0, dtype=np.float64)
+    if output_file is None:
+        return aggregated, probabilities
+
+    # Create final dataframe with scenarios as columns: 1, 2, ..., num_scenarios
+    final_df = pd.DataFrame(aggregated.T, index=hour_columns_ordered[:num_periods], columns=range(1, num_scenarios + 1))
+
+    # Rename index
+    final_df.index = [column_mapping.get(hour, hour) for hour in final_df.index]
+    final_df.index.name = 'T'
+
+    final_df.to_csv(output_file)
+    print(f"Aggregated data written to {output_file}")
+
+    probabilities_file = scenario_probabilities_path(output_file)
+    if probabilities is not None:
+        pd.DataFrame({'prob': probabilities}, index=pd.Index(range(1, num_scenarios + 1), name='S')).to_csv(probabilities_file)
+        print(f"Scenario probabilities written to {probabilities_file}")
+    elif os.path.exists(probabilities_file):
+        os.remove(probabilities_file)
+    return aggregated, probabilities
+
+
+def scenario_probabilities_path(renewable_csv):
+    """Path of the scenario probabilities written next to an aggregated renewable CSV."""
+    return os.path.splitext(renewable_csv)[0] + '_probabilities.csv'
 
-    for file_path in all_files:
+
+def load_scenario_probabilities(renewable_csv):
+    """Returns the probabilities stored next to `renewable_csv`, or None if its scenarios are equiprobable."""
+    probabilities_file = scenario_probabilities_path(renewable_csv)
+    if not os.path.exists(probabilities_file):
+        return None
+    return pd.read_csv(probabilities_file, index_col='S')['prob'].to_numpy(dtype=np.float64)
+
+
+def _source_manifest(input_dir):
+    """Returns the raw renewable CSVs below `input_dir` with their modification times."""
+    all_files = sorted(glob.glob(os.path.join(input_dir, '**', '*.csv'), recursive=True))
+    return {os.path.relpath(f, input_dir): os.path.getmtime(f) for f in all_files}
+
+
+def build_renewable_cube(input_dir, cube_path=DEFAULT_CUBE_PATH):
+    """
+    Parses the raw renewable CSVs into a float32 (site x simulation index x hour) cube and
+    writes it to `cube_path` (.npy) together with a JSON manifest of the source file mtimes.
+
+    Args:
+        input_dir (str): The root directory containing renewable data CSVs.
+        cube_path (str): Path of the .npy cube; the manifest is written next to it.
+
+    Returns:
+        tuple: (cube, simulation indices), or (None, None) if no simulation data was found.
+    """
+    sources = _source_manifest(input_dir)
+
+    # List to hold the (file, simulation indices, hour values) of every site
+    sites = []
+
+    for rel_path in sources:
+        file_path = os.path.join(input_dir, rel_path)
         try:
             df = pd.read_csv(file_path)
 
@@ -46,45 +133,107 @@ def scenario_generation(input_dir, output_file, config):
                     sim_df[col] = pd.to_numeric(sim_df[col], errors='coerce').fillna(0)
 
             sim_df.dropna(subset=['Index'], inplace=True)
-            all_sim_dfs.append(sim_df)
+            values = sim_df.reindex(columns=hour_columns_ordered, fill_value=0).to_numpy(dtype=np.float64)
+            sites.append((rel_path, sim_df['Index'].to_numpy(dtype=np.int64), values))
 
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
 
-    if not all_sim_dfs:
-        print("No simulation data found or aggregated.")
-        return
+    if not sites:
+        return None, None
 
-    # Concatenate all dataframes
-    combined_df = pd.concat(all_sim_dfs, ignore_index=True)
+    # Simulation indices of all sites; an index missing at a site contributes zero, as in a groupby sum
+    sim_index = np.unique(np.concatenate([idx for _, idx, _ in sites]))
+    cube = np.zeros((len(sites), len(sim_index), len(hour_columns_ordered)), dtype=np.float64)
+    for k, (_, idx, values) in enumerate(sites):
+        np.add.at(cube[k], np.searchsorted(sim_index, idx), values)
+    cube = cube.astype(np.float32)
 
-    # Group by simulation index and sum hour data
-    grouped = combined_df.groupby('Index')[hour_columns_ordered].sum()
+    # Write to temporary files first so that concurrent readers never see a partial cache
+    os.makedirs(os.path.dirname(cube_path) or '.', exist_ok=True)
+    manifest_path = _manifest_path(cube_path)
+    tmp_cube = f"{cube_path}.{os.getpid()}.tmp.npy"
+    tmp_manifest = f"{manifest_path}.{os.getpid()}.tmp"
+    np.save(tmp_cube, cube)
+    with open(tmp_manifest, 'w') as f:
+        json.dump({
+            'input_dir': os.path.abspath(input_dir),
+            'sources': sources,
+            'sites': [name for name, _, _ in sites],
+            'sim_index': sim_index.tolist(),
+            'hours': hour_columns_ordered,
+            'shape': list(cube.shape),
+            'dtype': str(cube.dtype),
+        }, f)
+    os.replace(tmp_cube, cube_path)
+    os.replace(tmp_manifest, manifest_path)
+    print(f"Renewable scenario cube {cube.shape} written to {cube_path}")
+    return cube, sim_index
 
-    # Create final dataframe
-    final_df = grouped.T  # Transpose to get scenarios as columns
 
-    # Select scenarios
-    num_scenarios = config['general']['num_scenarios']
-    scenario_criteria = config['scenario_selection']['criteria']
-    final_df = select_scenarios(final_df, num_scenarios, criteria=scenario_criteria)
+def _manifest_path(cube_path):
+    return os.path.splitext(cube_path)[0] + '_manifest.json'
 
-    # Select number of periods
-    num_periods = config['general']['num_periods']
-    final_df = final_df.iloc[:num_periods, :]
 
-    # Rename scenario columns to be sequential: 1, 2, ..., num_scenarios
-    final_df.columns = range(1, num_scenarios + 1)
+def load_renewable_cube(input_dir, cube_path=DEFAULT_CUBE_PATH):
+    """
+    Returns the renewable cube as a read-only memory-mapped array, (re)building the cache if it
+    is missing or if any raw CSV was added, removed or modified since it was written.
 
-    # Rename index
-    final_df.index = [column_mapping.get(hour, hour) for hour in final_df.index]
-    final_df.index.name = 'T'
+    Returns:
+        tuple: (cube of shape (site, simulation, hour), sorted simulation indices), or
+            (None, None) if no simulation data was found.
+    """
+    manifest_path = _manifest_path(cube_path)
+    if os.path.exists(cube_path) and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest['sources'] == _source_manifest(input_dir) and manifest['hours'] == hour_columns_ordered:
+                return np.load(cube_path, mmap_mode='r'), np.asarray(manifest['sim_index'], dtype=np.int64)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable renewable cube cache {cube_path}: {e}")
 
-    final_df.to_csv(output_file)
-    print(f"Aggregated data written to {output_file}")
+    cube, sim_index = build_renewable_cube(input_dir, cube_path)
+    if cube is None:
+        return None, None
+    return np.load(cube_path, mmap_mode='r'), sim_index
+
+
+def aggregate_renewable_scenarios(input_dir, cube_path=DEFAULT_CUBE_PATH):
+    """
+    Returns the renewable generation of every simulation summed over all sites.
+
+    Returns:
+        tuple: ((simulation x hour) float64 array, sorted simulation indices), or (None, None)
+            if no simulation data was found.
+    """
+    cube, sim_index = load_renewable_cube(input_dir, cube_path)
+    if cube is None:
+        return None, None
+    return cube.sum(axis=0, dtype=np.float64), sim_index
 
 
-def select_scenarios(df, num_scenarios, criteria='first_n', random_state=None):
+def select_scenario_positions(sim_index, num_scenarios, criteria='first_n', profiles=None, random_state=None):
+    """
+    Applies select_scenarios to the simulation indices and returns the positions of the selected ones.
+
+    Args:
+        profiles (np.ndarray, optional): (simulation x period) profiles, required by the reduction criteria.
+        random_state (int, optional): seed of the 'random' criteria.
+
+    Returns:
+        tuple: (positions, probabilities or None if the selected scenarios are equiprobable)
+    """
+    if criteria in REDUCTION_CRITERIA:
+        if profiles is None:
+            raise ValueError(f"Scenario reduction {criteria!r} requires the scenario profiles")
+        return reduce_scenarios(profiles, num_scenarios, method=criteria)
+    selected = select_scenarios(pd.DataFrame(columns=sim_index), num_scenarios, criteria=criteria, random_state=random_state).columns
+    return np.searchsorted(sim_index, np.asarray(selected, dtype=np.int64)), None
+
+
+def select_scenarios(df, num_scenarios, criteria='first_n', random_state=None, return_probabilities=False):
     """
     Pick a subset of scenario‐columns from `df`.
     Can be expaneded to have custom scenario selection criteria.
@@ -92,23 +241,116 @@ def select_scenarios(df, num_scenarios, criteria='first_n', random_state=None):
     Args:
         df (pd.DataFrame): columns are different scenarios (e.g. simulation indices).
         num_scenarios (int): how many columns to keep.
-        criteria (str): 'first_n' or 'random'
+        criteria (str): 'first_n', 'random', or a scenario reduction ('fast_forward' or
+            'kmedoids', see reduce_scenarios) on the profiles in the rows of `df`.
         random_state (int, optional): seed for reproducible random sampling.
+        return_probabilities (bool): also return the scenario probabilities.
 
     Returns:
-        pd.DataFrame: with exactly `num_scenarios` columns.
+        pd.DataFrame: with exactly `num_scenarios` columns, and with return_probabilities the
+            probabilities of the selected columns (None if they are equiprobable).
     """
     total = df.shape[1]
     if num_scenarios > total:
         raise ValueError(f"Requested {num_scenarios} scenarios, but only {total} available")
 
+    probabilities = None
     if criteria == 'first_n':
-        return df.iloc[:, :num_scenarios]
+        selected = df.iloc[:, :num_scenarios]
 
     elif criteria == 'random':
         # sample columns, not rows
-        return df.sample(n=num_scenarios, axis=1)
+        selected = df.sample(n=num_scenarios, axis=1, random_state=random_state)
+
+    elif criteria in REDUCTION_CRITERIA:
+        positions, probabilities = reduce_scenarios(df.to_numpy(dtype=np.float64).T, num_scenarios, method=criteria)
+        selected = df.iloc[:, positions]
 
     else:
-        raise ValueError(f"Invalid criteria: {criteria!r}. Must be 'first_n' or 'random'.")
+        raise ValueError(f"Invalid criteria: {criteria!r}. Must be 'first_n', 'random', 'fast_forward' or 'kmedoids'.")
+
+    return (selected, probabilities) if return_probabilities else selected
+
+
+# Scenario reduction methods: select representative scenarios and return their probabilities
+REDUCTION_CRITERIA = ('fast_forward', 'kmedoids')
+
+
+def _profile_distances(profiles):
+    """Euclidean distances between all pairs of (scenario x period) profiles."""
+    sq = np.einsum('ij,ij->i', profiles, profiles)
+    return np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * profiles @ profiles.T, 0.0))
+
+
+def _fast_forward(dist, p, num_scenarios):
+    """Fast-forward selection (Heitsch & Roemisch): greedily adds the scenario that minimizes the weighted distance of the rest."""
+    c = dist.copy()
+    remaining = np.ones(len(p), dtype=bool)
+    selected = []
+    for _ in range(num_scenarios):
+        z = p[remaining] @ c[remaining]
+        z[~remaining] = np.inf
+        u = int(np.argmin(z))
+        selected.append(u)
+        remaining[u] = False
+        c = np.minimum(c, c[:, [u]])
+    return np.array(selected)
+
+
+def _kmedoids(dist, p, medoids, max_iter=100):
+    """Probability-weighted k-medoids (alternating assignment / medoid update) started from `medoids`."""
+    medoids = np.array(medoids)
+    for _ in range(max_iter):
+        labels = np.argmin(dist[:, medoids], axis=1)
+        updated = medoids.copy()
+        for k in range(len(medoids)):
+            members = np.flatnonzero(labels == k)
+            if members.size == 0:
+                continue
+            cost = p[members] @ dist[np.ix_(members, members)]
+            updated[k] = members[np.argmin(cost)]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids
+
+
+def reduce_scenarios(profiles, num_scenarios, method='fast_forward', probabilities=None):
+    """
+    Reduces a set of scenario profiles to `num_scenarios` representative scenarios.
+
+    Every discarded scenario passes its probability to the nearest (Euclidean distance of the
+    period profiles) selected one, so the reduced set keeps the total probability mass. The
+    selected scenarios are returned in order of increasing total energy, so that FO tier r lies
+    between scenarios r and r + 1.
+
+    Args:
+        profiles (np.ndarray): (scenario x period) profiles, e.g. aggregated renewable generation.
+        num_scenarios (int): Number of scenarios to keep.
+        method (str): 'fast_forward' (forward selection) or 'kmedoids' (k-medoids clustering
+            started from the fast-forward selection).
+        probabilities (np.ndarray, optional): Probabilities of the input scenarios, equal by default.
+
+    Returns:
+        tuple: (positions of the selected scenarios, their probabilities)
+    """
+    profiles = np.asarray(profiles, dtype=np.float64)
+    n = profiles.shape[0]
+    if num_scenarios > n:
+        raise ValueError(f"Requested {num_scenarios} scenarios, but only {n} available")
+    p = np.full(n, 1.0 / n) if probabilities is None else np.asarray(probabilities, dtype=np.float64)
+
+    dist = _profile_distances(profiles)
+    selected = _fast_forward(dist, p, num_scenarios)
+    if method == 'kmedoids':
+        selected = _kmedoids(dist, p, selected)
+    elif method != 'fast_forward':
+        raise ValueError(f"Invalid reduction method: {method!r}. Must be one of {REDUCTION_CRITERIA}.")
+
+    # Redistribute the probability of every scenario to its nearest selected scenario
+    nearest = np.argmin(dist[:, selected], axis=1)
+    reduced = np.bincount(nearest, weights=p, minlength=len(selected))
+
+    order = np.argsort(profiles[selected].sum(axis=1), kind='stable')
+    return selected[order], reduced[order]
 
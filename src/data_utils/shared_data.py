@@ -0,0 +1,49 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+def share_array(array):
+    """
+    Copies `array` into a new shared memory block.
+
+    Args:
+        array (np.ndarray): Array to publish.
+
+    Returns:
+        tuple: (SharedMemory block, descriptor dict). The descriptor is small and picklable and is
+            all a worker needs to attach; the creating process must close() and unlink() the block.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    descriptor = {'name': shm.name, 'shape': array.shape, 'dtype': array.dtype.str}
+    return shm, descriptor
+
+
+def attach_array(descriptor):
+    """
+    Attaches to a block created by share_array without copying it.
+
+    Returns:
+        tuple: (SharedMemory block, read-only array view). Keep the block referenced for as long
+            as the view is used.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block with the resource tracker. Pool workers share
+        # the parent's tracker, so this is a no-op there and the parent's unlink stays the only one.
+        shm = shared_memory.SharedMemory(name=descriptor['name'])
+    view = np.ndarray(tuple(descriptor['shape']), dtype=np.dtype(descriptor['dtype']), buffer=shm.buf)
+    view.flags.writeable = False
+    return shm, view
+
+
+def release_array(shm):
+    """Closes and unlinks a block created by share_array."""
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
@@ -0,0 +1,63 @@
+import itertools
+import numpy as np
+import pyomo.environ as pyo
+
+def _shape(sets):
+    return tuple(len(s) for s in sets)
+
+
+def _keys(sets):
+    if len(sets) == 1:
+        return list(sets[0])
+    return list(itertools.product(*sets))
+
+
+def var_array(instance, name, sets):
+    """
+    Returns the solution values of variable `name` as a dense array indexed like `sets`
+    (e.g. [i.R, i.G_FO_sellers, i.T] -> shape (R, G, T)); missing values are NaN.
+
+    Works for Pyomo instances and for MatrixInstance solutions, which already hold the values
+    as an array.
+    """
+    shape = _shape(sets)
+    if hasattr(instance, 'var_blocks'):
+        return np.array(getattr(instance, name).array(), dtype=float).reshape(shape)
+
+    component = getattr(instance, name)
+    size = int(np.prod(shape))
+    if len(component) == size:
+        # Dense components iterate in the order of their (ordered) index sets
+        values = (v.value for v in component.values())
+    else:
+        values = (component[k].value if k in component else None for k in _keys(sets))
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=float, count=size).reshape(shape)
+
+
+def dual_array(instance, name, sets, default=0.0):
+    """
+    Returns the duals of constraint `name` as a dense array indexed like `sets`. Entries that
+    were skipped or have no dual get `default`.
+    """
+    shape = _shape(sets)
+    constraint = getattr(instance, name)
+    if hasattr(instance, 'con_blocks'):
+        rows = constraint.rows.reshape(shape)
+        duals = np.full(shape, default, dtype=float)
+        duals[rows >= 0] = instance.row_dual[rows[rows >= 0]]
+        return duals
+
+    dual = instance.dual
+    size = int(np.prod(shape))
+    if len(constraint) == size:
+        values = (dual.get(c, default) for c in constraint.values())
+    else:
+        values = (dual.get(constraint[k], default) if k in constraint else default for k in _keys(sets))
+    return np.fromiter(values, dtype=float, count=size).reshape(shape)
+
+
+def param_array(instance, name, sets):
+    """Returns parameter `name` (Pyomo Param or plain dict attribute) as a dense array indexed like `sets`."""
+    param = getattr(instance, name)
+    shape = _shape(sets)
+    return np.fromiter((pyo.value(param[k]) for k in _keys(sets)), dtype=float, count=int(np.prod(shape))).reshape(shape)
@@ -0,0 +1,76 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def run_serial(steps):
+    """
+    Drives a simulation step generator in the calling thread: every solve it yields is run right
+    away and its result (or exception) sent back. Returns the generator's return value.
+    """
+    try:
+        solve = next(steps)
+        while True:
+            try:
+                result = solve()
+            except Exception as e:
+                solve = steps.throw(e)
+            else:
+                solve = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+class SolvePipeline:
+    """
+    Overlaps the solves of consecutive runs with the Python work around them.
+
+    A run is a step generator (see batch_simulation.simulation_steps): it does its model build,
+    extraction and metrics itself and yields every solve as a zero-argument callable, which gets
+    the solve's result (or exception) sent back. Up to `depth` runs are in flight. Their solves
+    go, one at a time and in submission order, to a single solver thread, while the calling
+    thread advances the other runs, e.g. builds the next run's DAFO instance and computes the
+    previous run's RT metrics while the current solve is running. With a solver that releases
+    the GIL (solver executables, HiGHS) a worker's throughput then approaches its solver time.
+
+    Every run in flight gets its own `slot` in [0, depth), so that the runs can keep separate
+    (persistent) model instances and solvers; a slot is reused once its run has finished.
+    """
+    def __init__(self, depth=2):
+        self.depth = max(1, int(depth))
+
+    def run(self, items, start):
+        """
+        Runs `start(item, slot)` generators for `items` and yields (item, return value) pairs in
+        completion order. An exception escaping a generator is raised here.
+        """
+        queue = deque(items)
+        free_slots = list(range(self.depth - 1, -1, -1))
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='solver') as solver:
+            def advance(item, slot, steps, send):
+                """Runs `steps` up to its next solve (submitted to the solver thread) or its end."""
+                try:
+                    solve = send(steps)
+                except StopIteration as stop:
+                    free_slots.append(slot)
+                    return stop.value, True
+                in_flight[solver.submit(solve)] = (item, slot, steps)
+                return None, False
+
+            while queue or in_flight:
+                while queue and free_slots:
+                    item, slot = queue.popleft(), free_slots.pop()
+                    value, finished = advance(item, slot, start(item, slot), next)
+                    if finished:
+                        yield item, value
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, slot, steps = in_flight.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        value, finished = advance(item, slot, steps, lambda s: s.throw(error))
+                    else:
+                        value, finished = advance(item, slot, steps, lambda s: s.send(future.result()))
+                    if finished:
+                        yield item, value
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def synthetic_config(base_config, num_generators, num_storage, num_tiers, num_scenarios, num_periods):
+    """Copy of `base_config` sized for a synthetic system (benchmark mode off, so the models read `general`)."""
+    config = dict(base_config)
+    config['benchmark'] = False
+    config['general'] = dict(base_config.get('general', {}),
+        num_generators=num_generators,
+        num_storage=num_storage,
+        num_tiers=num_tiers,
+        num_scenarios=num_scenarios,
+        num_periods=num_periods,
+    )
+    return config
+
+
+def generate_synthetic_system(config, seed=0, buyer_share=0.15, reserve_margin=0.3, renewable_share=0.3):
+    """
+    Generates a random but feasible system of the size in `config['general']`, in the format of
+    DataProcessor.prepare_pyomo_data.
+
+    Generators get capacities, ramp rates and variable costs drawn around the ranges of the RTS
+    data; a `buyer_share` of them are flagged as FO buyers (-1, like the solar/wind units). The
+    demand follows a daily profile whose peak is covered by the seller capacity with a
+    `reserve_margin`. The renewable scenarios are a solar-like profile scaled to
+    `renewable_share` of the peak demand, with a scenario-wide level deviation and hourly
+    noise, ordered by total energy so that FO tier r lies between scenarios r and r + 1.
+    The FO parameters (D1, D2, PEN, ...) are taken from `config['fo_params']`; probTU/probTD
+    are spread evenly over the tiers.
+
+    Args:
+        config (dict): Model config with the system size in `general` (see synthetic_config).
+        seed (int): Seed of the random generator, the same seed gives the same system.
+
+    Returns:
+        dict: Pyomo data dict in the {None: {...}} format.
+    """
+    general_cfg = config['general']
+    G, B = general_cfg['num_generators'], general_cfg['num_storage']
+    R, S, T = general_cfg['num_tiers'], general_cfg['num_scenarios'], general_cfg['num_periods']
+    rng = np.random.default_rng(seed)
+
+    fo_params = {
+        key: {None: value} if not isinstance(value, dict) else value
+        for key, value in config.get('fo_params', {}).items()
+    }
+    data = dict(fo_params)
+    data.update({
+        'T': {None: list(range(1, T + 1))},
+        'S': {None: list(range(1, S + 1))},
+        'R': {None: list(range(1, R + 1))},
+        'G': {None: list(range(1, G + 1))},
+        'B': {None: list(range(1, B + 1))},
+    })
+
+    # Generators
+    cap = rng.uniform(20.0, 400.0, G).round(1)
+    ramp = (cap * rng.uniform(0.3, 1.0, G)).round(1)   # MW/h
+    vc = rng.uniform(10.0, 80.0, G).round(2)
+    flag = np.where(rng.random(G) < buyer_share, -1, 1)
+    if G and not (flag == 1).any():
+        flag[0] = 1
+    ids = range(1, G + 1)
+    data['CAP'] = dict(zip(ids, cap.tolist()))
+    data['RR'] = dict(zip(ids, ramp.tolist()))
+    data['VC'] = dict(zip(ids, vc.tolist()))
+    data['VCUP'] = data['VC']
+    data['VCDN'] = data['VC']
+    data['flag'] = dict(zip(ids, flag.tolist()))
+
+    # Demand: daily profile, peak covered by the sellers with the reserve margin
+    hours = np.arange(T) % 24
+    shape = 0.75 + 0.25 * np.sin((hours - 8) / 24 * 2 * np.pi)
+    peak = cap[flag == 1].sum() / (1 + reserve_margin)
+    demand = peak * shape / shape.max()
+    data['DEMAND'] = dict(zip(range(1, T + 1), demand.round(1).tolist()))
+
+    # Renewable scenarios: solar-like profile with a level deviation per scenario and hourly noise
+    solar = np.clip(np.sin((hours - 6) / 12 * np.pi), 0.0, None) + 0.1
+    level = rng.normal(1.0, 0.2, S)
+    noise = rng.normal(1.0, 0.05, (S, T))
+    re = np.clip(renewable_share * peak * solar / solar.max() * level[:, None] * noise, 0.0, None)
+    re = re[np.argsort(re.sum(axis=1), kind='stable')]
+    data['RE'] = {(s + 1, t + 1): float(re[s, t]) for s in range(S) for t in range(T)}
+
+    data['probTU'] = {r: r / (R + 1) for r in range(1, R + 1)}
+    data['probTD'] = {r: 1 - r / (R + 1) for r in range(1, R + 1)}
+    data['prob'] = {s: 1.0 / S for s in range(1, S + 1)}
+
+    # Storage, with the unit efficiencies and costs of DataProcessor.process_storage_data
+    if B:
+        storage_ids = range(1, B + 1)
+        p_max = rng.uniform(10.0, 100.0, B).round(1)
+        data['E_MAX'] = dict(zip(storage_ids, (p_max * rng.uniform(2.0, 6.0, B)).round(1).tolist()))
+        data['P_MAX'] = dict(zip(storage_ids, p_max.tolist()))
+        for name, value in (('ETA_CH', 1), ('ETA_DCH', 1), ('STORAGE_COST', 1e-4), ('E0', 1e-4), ('E_FINAL', 1e-4)):
+            data[name] = {b: value for b in storage_ids}
+    else:
+        for name in ('E_MAX', 'P_MAX', 'ETA_CH', 'ETA_DCH', 'E0', 'E_FINAL', 'STORAGE_COST'):
+            data[name] = {}
+
+    return {None: data}
@@ -0,0 +1,213 @@
+import os
+import time
+import signal
+import logging
+import multiprocessing
+from collections import deque
+from datetime import timedelta
+from multiprocessing.connection import wait
+
+
+def _worker_loop(conn, worker, initializer, initargs):
+    """Worker process: runs the chunks received on `conn` and reports the start and the result of every task."""
+    if hasattr(os, 'setpgrp'):
+        # Own process group, so that killing the worker on a timeout also kills its solver subprocesses
+        os.setpgrp()
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        chunk = conn.recv()
+        if chunk is None:
+            break
+        for index, task in chunk:
+            conn.send(('start', index))
+            try:
+                conn.send(('result', index, worker(task)))
+            except Exception as e:
+                conn.send(('error', index, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _WorkerSlot:
+    """One worker process with its pipe and the tasks sent to it but not finished yet."""
+    def __init__(self, ctx, worker, initializer, initargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(child_conn, worker, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.pending = deque()
+        self.started_at = None
+
+    @property
+    def idle(self):
+        return not self.pending
+
+    def send(self, chunk):
+        self.pending.extend(chunk)
+        self.conn.send(chunk)
+
+    def kill(self):
+        """Kills the worker (and on POSIX its process group, including solver subprocesses)."""
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def shutdown(self):
+        if self.process.is_alive() and self.idle:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+def _failure_reason(task, reason):
+    return reason
+
+
+class TaskScheduler:
+    """
+    Process pool that streams results in completion order and enforces a wall-clock limit per task.
+
+    Tasks are handed out in chunks of `chunk_size` to whichever worker is idle, so the batch never
+    waits on a pre-assigned slow chunk: with chunk_size=1 its tail is bounded by the slowest single
+    task. A task that runs longer than `timeout` seconds, or whose worker dies, has its worker
+    killed and restarted (initializer included); the task is retried up to `max_retries` times and
+    afterwards reported as `on_failure(task, reason)`. Unstarted tasks of the killed worker's
+    chunk go back to the front of the queue.
+
+    Args:
+        worker (callable): Top-level function run on each task in the worker processes.
+        num_workers (int): Worker processes.
+        initializer, initargs: Called once in every (re)started worker, like multiprocessing.Pool.
+        timeout (float, optional): Wall-clock limit per task in seconds (None: no limit).
+        max_retries (int): Re-runs of a task after a timeout or crash.
+        chunk_size (int): Tasks sent to a worker at once.
+        on_failure (callable, optional): Builds the result of a task that failed for good from
+            (task, reason); by default the reason string is the result.
+        mp_context: multiprocessing context (default: the current start method).
+    """
+    def __init__(self, worker, num_workers, initializer=None, initargs=(), timeout=None, max_retries=1,
+                 chunk_size=1, on_failure=None, mp_context=None):
+        self.worker = worker
+        self.num_workers = max(1, int(num_workers))
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.chunk_size = max(1, int(chunk_size))
+        self.on_failure = on_failure or _failure_reason
+        self._ctx = mp_context or multiprocessing.get_context()
+        self._stopped = False
+
+    def stop(self):
+        """Stops handing out new tasks; tasks already sent to a worker still finish and are yielded."""
+        self._stopped = True
+
+    def _start_slot(self):
+        return _WorkerSlot(self._ctx, self.worker, self.initializer, self.initargs)
+
+    def run(self, tasks):
+        """Runs `tasks` and yields (task, result) pairs as the tasks finish."""
+        self._stopped = False
+        queue = deque(enumerate(tasks))
+        task_of = dict(queue)
+        attempts = {}
+        slots = [self._start_slot() for _ in range(min(self.num_workers, len(queue)))]
+        try:
+            while True:
+                for slot in slots:
+                    if slot.idle and queue and not self._stopped:
+                        slot.send([queue.popleft() for _ in range(min(self.chunk_size, len(queue)))])
+                busy = [slot for slot in slots if not slot.idle]
+                if not busy:
+                    break
+
+                wait_s = None
+                if self.timeout is not None:
+                    now = time.monotonic()
+                    wait_s = max(0.0, min(
+                        (slot.started_at + self.timeout - now) if slot.started_at is not None else self.timeout
+                        for slot in busy
+                    ))
+                ready = wait([slot.conn for slot in busy], timeout=wait_s)
+
+                for k, slot in enumerate(slots):
+                    if slot.idle:
+                        continue
+                    failure = None
+                    if slot.conn in ready:
+                        try:
+                            message = slot.conn.recv()
+                        except (EOFError, OSError):
+                            slot.process.join(timeout=1)
+                            failure = f"Worker died (exit code {slot.process.exitcode})"
+                        else:
+                            if message[0] == 'start':
+                                slot.started_at = time.monotonic()
+                            else:
+                                index = slot.pending.popleft()[0]
+                                slot.started_at = None
+                                task = task_of.pop(index)
+                                if message[0] == 'result':
+                                    yield task, message[2]
+                                else:
+                                    yield task, self.on_failure(task, message[2])
+                    elif (self.timeout is not None and slot.started_at is not None
+                          and time.monotonic() - slot.started_at >= self.timeout):
+                        failure = f"Timed out after {self.timeout:g}s"
+                    if failure is None:
+                        continue
+
+                    # Kill and replace the worker; its current task is retried or failed, the rest requeued
+                    index, task = slot.pending.popleft()
+                    queue.extendleft(reversed(slot.pending))
+                    slot.pending.clear()
+                    slot.kill()
+                    slots[k] = self._start_slot()
+                    attempts[index] = attempts.get(index, 0) + 1
+                    if attempts[index] <= self.max_retries and not self._stopped:
+                        logging.warning(f"Task {index}: {failure}, retrying (attempt {attempts[index] + 1})")
+                        queue.appendleft((index, task))
+                    else:
+                        logging.error(f"Task {index}: {failure}, giving up")
+                        yield task_of.pop(index), self.on_failure(task, failure)
+        finally:
+            for slot in slots:
+                slot.shutdown()
+
+
+class ProgressReporter:
+    """Logs a progress line with the completion rate and the ETA at most every `interval_s` seconds."""
+    def __init__(self, total, interval_s=10.0, label="runs"):
+        self.total = total
+        self.interval_s = interval_s
+        self.label = label
+        self.done = 0
+        self.failed = 0
+        self._start = time.monotonic()
+        self._last = self._start
+
+    def update(self, failed=False):
+        self.done += 1
+        self.failed += int(failed)
+        now = time.monotonic()
+        if now - self._last >= self.interval_s or self.done == self.total:
+            self._last = now
+            logging.info(self.line(now))
+
+    def line(self, now=None):
+        elapsed = (now or time.monotonic()) - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = timedelta(seconds=round((self.total - self.done) / rate)) if rate > 0 else "unknown"
+        return (f"Progress: {self.done}/{self.total} {self.label} ({self.failed} failed), "
+                f"{rate * 60:.1f} {self.label}/min, elapsed {timedelta(seconds=round(elapsed))}, ETA {eta}")
@@ -0,0 +1,299 @@
+import numpy as np
+from models.matrix_utils import MatrixInstance, IndexSet, set_param_attributes
+
+class DAFOMatrixModel:
+    """
+    Vectorized sparse-matrix assembly of the DAFO model.
+
+    Builds the same variables, constraints (Con3-Con13 and the storage constraints) and quadratic
+    objective as DAFOModel, but directly as NumPy/SciPy arrays from the `prepare_pyomo_data`
+    dictionary instead of through Pyomo rule callbacks. Constraint orientation follows the
+    Pyomo model, so the duals read from a solved instance match those of DAFOModel.
+    """
+    def __init__(self, config):
+        self.config = config
+        if config['benchmark']:
+            self.num_periods = 2
+            self.num_scenarios = 5
+            self.num_generators = 5
+            self.num_tiers = 4
+            self.num_storage = 0
+        else:
+            general_cfg = config['general']
+            self.num_periods = general_cfg['num_periods']
+            self.num_scenarios = general_cfg['num_scenarios']
+            self.num_generators = general_cfg['num_generators']
+            self.num_tiers = general_cfg['num_tiers']
+            self.num_storage = general_cfg['num_storage']
+
+        # "cumulative" replaces the tier sums in Con6/Con7 by prefix/suffix tier variables
+        self.flex_demand_formulation = config.get('dafo', {}).get('flex_demand_formulation', 'direct')
+
+    def create_instance(self, data):
+        d = data[None]
+        inst = MatrixInstance()
+
+        # Sets
+        T = IndexSet(range(1, self.num_periods + 1))
+        S = IndexSet(range(1, self.num_scenarios + 1))
+        R = IndexSet(range(1, self.num_tiers + 1))
+        G = IndexSet(range(1, self.num_generators + 1))
+        B = IndexSet(range(1, self.num_storage + 1))
+        flag = d.get('flag', {})
+        Gs = IndexSet(g for g in G if flag.get(g) == 1)
+        inst.T, inst.S, inst.R, inst.G, inst.B = T, S, R, G, B
+        inst.G_FO_buyers = IndexSet(g for g in G if flag.get(g) == -1)
+        inst.G_FO_sellers = Gs
+        set_param_attributes(inst, d, [
+            'VC', 'VCUP', 'VCDN', 'CAP', 'RR', 'DEMAND', 'RE', 'D1', 'D2', 'PEN', 'PENDN', 'smallM',
+            'probTU', 'probTD', 'prob', 'E_MAX', 'P_MAX', 'ETA_CH', 'ETA_DCH', 'E0', 'E_FINAL', 'STORAGE_COST', 'flag'
+        ])
+
+        # Variables
+        dv = inst.add_var('d', [T])
+        rgDA = inst.add_var('rgDA', [T])
+        du = inst.add_var('du', [S, T], lb=-np.inf)
+        xDA = inst.add_var('xDA', [Gs, T])
+        hsu = inst.add_var('hsu', [R, Gs, T])
+        hsd = inst.add_var('hsd', [R, Gs, T])
+        hdu = inst.add_var('hdu', [R, T])
+        hdd = inst.add_var('hdd', [R, T])
+        sdu = inst.add_var('sdu', [R, T])
+        sdd = inst.add_var('sdd', [R, T])
+        y = inst.add_var('y', [S, T])
+        e = inst.add_var('e', [B, T])
+        p_ch = inst.add_var('p_ch', [B, T])
+        p_dch = inst.add_var('p_dch', [B, T])
+        bsu = inst.add_var('bsu', [R, B, T])
+        bsd = inst.add_var('bsd', [R, B, T])
+        charge_state = inst.add_var('charge_state', [B, T], lb=-np.inf)
+        discharge_state = inst.add_var('discharge_state', [B, T], lb=-np.inf)
+        cumulative = self.flex_demand_formulation == 'cumulative'
+        if cumulative:
+            cdd = inst.add_var('cdd', [R, T])
+            cdu = inst.add_var('cdu', [R, T])
+
+        # Parameter arrays
+        s_idx = np.array(S)
+        r_idx = np.array(R)
+        t_idx = np.array(T)
+        VC = np.array([d['VC'][g] for g in Gs], dtype=float)
+        VCUP = np.array([d['VCUP'][g] for g in Gs], dtype=float)
+        VCDN = np.array([d['VCDN'][g] for g in Gs], dtype=float)
+        CAP = np.array([d['CAP'][g] for g in Gs], dtype=float)
+        RR = np.array([d['RR'][g] for g in Gs], dtype=float)
+        DEMAND = np.array([d['DEMAND'][t] for t in T], dtype=float)
+        RE = np.array([[d['RE'][s, t] for t in T] for s in S], dtype=float).reshape(len(S), len(T))
+        probTU = np.array([d['probTU'][r] for r in R], dtype=float)
+        probTD = np.array([d['probTD'][r] for r in R], dtype=float)
+        prob = np.array([d.get('prob', {}).get(s, 1.0 / len(S)) for s in S], dtype=float)
+        D1, D2 = d['D1'][None], d['D2'][None]
+        PEN, PENDN, smallM = d['PEN'][None], d['PENDN'][None], d['smallM'][None]
+        E_MAX = np.array([d['E_MAX'][b] for b in B], dtype=float)
+        P_MAX = np.array([d['P_MAX'][b] for b in B], dtype=float)
+        ETA_CH = np.array([d['ETA_CH'][b] for b in B], dtype=float)
+        ETA_DCH = np.array([d['ETA_DCH'][b] for b in B], dtype=float)
+        E0 = np.array([d['E0'][b] for b in B], dtype=float)
+        E_FINAL = np.array([d['E_FINAL'][b] for b in B], dtype=float)
+        STORAGE_COST = np.array([d['STORAGE_COST'][b] for b in B], dtype=float)
+        VCUP_B = np.array([d.get('VCUP_B', {}).get(b, 0.0) for b in B], dtype=float)
+        VCDN_B = np.array([d.get('VCDN_B', {}).get(b, 0.0) for b in B], dtype=float)
+        V_MARG = np.array([d.get('V_MARG', {}).get(b, 0.0) for b in B], dtype=float)
+
+        # Tier masks of the flexibility demand constraints: r <= s-1 (down) and r >= s (up)
+        dn_mask = (r_idx[None, :, None] <= s_idx[:, None, None] - 1)
+        up_mask = (r_idx[None, :, None] >= s_idx[:, None, None])
+
+        # Con3: DA energy balance
+        con = inst.add_constraint('Con3', [T])
+        inst.add_terms(con.rows[None, :], xDA.cols)
+        inst.add_terms(con.rows, rgDA.cols)
+        inst.add_terms(con.rows[None, :], p_dch.cols)
+        inst.add_terms(con.rows[None, :], p_ch.cols, -1.0)
+        inst.add_terms(con.rows, dv.cols)
+        con3 = con
+
+        # Con4UP / Con4DN: flexibility balance
+        con4up = inst.add_constraint('Con4UP', [R, T])
+        inst.add_terms(con4up.rows[:, None, :], hsu.cols)
+        inst.add_terms(con4up.rows[:, None, :], bsu.cols)
+        inst.add_terms(con4up.rows, hdu.cols, -1.0)
+        con4dn = inst.add_constraint('Con4DN', [R, T])
+        inst.add_terms(con4dn.rows[:, None, :], hsd.cols)
+        inst.add_terms(con4dn.rows[:, None, :], bsd.cols)
+        inst.add_terms(con4dn.rows, hdd.cols, -1.0)
+
+        if cumulative:
+            # cdd[r] = cdd[r-1] + hdd[r] + sdd[r] and cdu[r] = cdu[r+1] + hdu[r] + sdu[r]
+            cum_dn = inst.add_constraint('ConCumDN', [R, T])
+            inst.add_terms(cum_dn.rows, cdd.cols)
+            inst.add_terms(cum_dn.rows[1:], cdd.cols[:-1], -1.0)
+            inst.add_terms(cum_dn.rows, hdd.cols, -1.0)
+            inst.add_terms(cum_dn.rows, sdd.cols, -1.0)
+            cum_up = inst.add_constraint('ConCumUP', [R, T])
+            inst.add_terms(cum_up.rows, cdu.cols)
+            inst.add_terms(cum_up.rows[:-1], cdu.cols[1:], -1.0)
+            inst.add_terms(cum_up.rows, hdu.cols, -1.0)
+            inst.add_terms(cum_up.rows, sdu.cols, -1.0)
+
+            # Scenario s uses the prefix up to tier min(s-1, |R|) and the suffix from tier s
+            dn_tier = np.minimum(s_idx - 1, len(R)) - 1
+            up_tier = s_idx - 1
+            has_dn, has_up = dn_tier >= 0, up_tier < len(R)
+            dn_cols = cdd.cols[np.clip(dn_tier, 0, None)]
+            up_cols = cdu.cols[np.minimum(up_tier, len(R) - 1)]
+
+        # Con6: flexibility demand per scenario
+        con6 = inst.add_constraint('Con6', [S, T])
+        inst.add_terms(con6.rows, du.cols, -1.0)
+        if cumulative:
+            inst.add_terms(con6.rows, dn_cols, 1.0, mask=has_dn[:, None])
+            inst.add_terms(con6.rows, up_cols, -1.0, mask=has_up[:, None])
+        else:
+            for flex, coef, mask in ((hdd, 1.0, dn_mask), (sdd, 1.0, dn_mask), (hdu, -1.0, up_mask), (sdu, -1.0, up_mask)):
+                inst.add_terms(con6.rows[:, None, :], flex.cols[None, :, :], coef, mask=mask)
+        inst.add_terms(con6.rows, rgDA.cols[None, :])
+
+        # Con7: bound on procured flexibility
+        con7 = inst.add_constraint('Con7', [S, T])
+        if cumulative:
+            inst.add_terms(con7.rows, dn_cols, 1.0, mask=has_dn[:, None])
+            inst.add_terms(con7.rows, up_cols, 1.0, mask=has_up[:, None])
+        else:
+            for flex, mask in ((hdd, dn_mask), (sdd, dn_mask), (hdu, up_mask), (sdu, up_mask)):
+                inst.add_terms(con7.rows[:, None, :], flex.cols[None, :, :], 1.0, mask=mask)
+        inst.add_terms(con7.rows, y.cols, -1.0)
+
+        # Con8 / Con9: auxiliary absolute deviation
+        con8 = inst.add_constraint('Con8', [S, T])
+        inst.add_terms(con8.rows, rgDA.cols[None, :])
+        inst.add_terms(con8.rows, y.cols, -1.0)
+        con9 = inst.add_constraint('Con9', [S, T])
+        inst.add_terms(con9.rows, rgDA.cols[None, :], -1.0)
+        inst.add_terms(con9.rows, y.cols, -1.0)
+
+        # Con10: FO ramp limits
+        con10up = inst.add_constraint('Con10up', [Gs, T])
+        inst.add_terms(con10up.rows[None, :, :], hsu.cols)
+        con10dn = inst.add_constraint('Con10dn', [Gs, T])
+        inst.add_terms(con10dn.rows[None, :, :], hsd.cols)
+
+        # Con11: inter-temporal ramp limits (for t = 1 only from the previous day's output X0 of G_RAMP0)
+        ramp0 = np.isin(Gs, list(d.get('G_RAMP0', {}).get(None, [])))
+        X0 = np.array([d.get('X0', {}).get(g, 0.0) for g in Gs], dtype=float)
+        ramp_mask = (t_idx > 1)[None, :] | ((t_idx == 1)[None, :] & ramp0[:, None])
+        con11up = inst.add_constraint('Con11up', [Gs, T], mask=ramp_mask)
+        inst.add_terms(con11up.rows, xDA.cols)
+        inst.add_terms(con11up.rows[:, 1:], xDA.cols[:, :-1], -1.0)
+        con11dn = inst.add_constraint('Con11dn', [Gs, T], mask=ramp_mask)
+        inst.add_terms(con11dn.rows[:, 1:], xDA.cols[:, :-1])
+        inst.add_terms(con11dn.rows, xDA.cols, -1.0)
+        ramp_up_rhs = np.broadcast_to(RR[:, None], (len(Gs), len(T))).copy()
+        ramp_dn_rhs = ramp_up_rhs.copy()
+        ramp_up_rhs[:, :1] += X0[:, None]
+        ramp_dn_rhs[:, :1] -= X0[:, None]
+
+        # Con12: generation limits, Con13: FO down limited by DA schedule
+        con12 = inst.add_constraint('Con12', [Gs, T])
+        inst.add_terms(con12.rows, xDA.cols)
+        inst.add_terms(con12.rows[None, :, :], hsu.cols)
+        con13 = inst.add_constraint('Con13', [Gs, T])
+        inst.add_terms(con13.rows[None, :, :], hsd.cols)
+        inst.add_terms(con13.rows, xDA.cols, -1.0)
+
+        # Storage constraints
+        sb = inst.add_constraint('storage_balance', [B, T])
+        inst.add_terms(sb.rows, e.cols)
+        inst.add_terms(sb.rows, p_ch.cols, -ETA_CH[:, None])
+        inst.add_terms(sb.rows, p_dch.cols, 1.0 / ETA_DCH[:, None])
+        inst.add_terms(sb.rows[:, 1:], e.cols[:, :-1], -1.0)
+        sc = inst.add_constraint('storage_capacity', [B, T])
+        inst.add_terms(sc.rows, e.cols)
+        # Final state of charge, only for the storage units of B_FINAL (cyclic rolling horizon)
+        final_mask = np.isin(B, list(d.get('B_FINAL', {}).get(None, [])))
+        fs = inst.add_constraint('final_soc', [B], mask=final_mask)
+        inst.add_terms(fs.rows, e.cols[:, -1])
+        sfu = inst.add_constraint('storage_fo_up_dynamic', [R, B, T])
+        inst.add_terms(sfu.rows, bsu.cols)
+        inst.add_terms(sfu.rows, e.cols[None, :, :], -ETA_DCH[None, :, None])
+        sfd = inst.add_constraint('storage_fo_down_dynamic', [R, B, T])
+        inst.add_terms(sfd.rows, bsd.cols)
+        inst.add_terms(sfd.rows, e.cols[None, :, :], 1.0 / ETA_CH[None, :, None])
+        sfp = inst.add_constraint('storage_fo_power_cap', [R, B, T])
+        inst.add_terms(sfp.rows, bsu.cols)
+        inst.add_terms(sfp.rows, bsd.cols)
+        scd = inst.add_constraint('soft_charge_discharge_limit', [B, T])
+        inst.add_terms(scd.rows, p_ch.cols)
+        inst.add_terms(scd.rows, p_dch.cols)
+        chc = inst.add_constraint('charging_cap', [B, T])
+        inst.add_terms(chc.rows, p_ch.cols)
+        inst.add_terms(chc.rows, charge_state.cols, -P_MAX[:, None])
+        dcc = inst.add_constraint('discharging_cap', [B, T])
+        inst.add_terms(dcc.rows, p_dch.cols)
+        inst.add_terms(dcc.rows, discharge_state.cols, -P_MAX[:, None])
+        fpu = inst.add_constraint('fo_profit_check_up', [R, B, T])
+        inst.add_terms(fpu.rows, bsu.cols, (V_MARG - PEN)[None, :, None])
+        fpd = inst.add_constraint('fo_profit_check_dn', [R, B, T])
+        inst.add_terms(fpd.rows, bsd.cols, (V_MARG - PENDN)[None, :, None])
+
+        inst.finalize()
+
+        # Right-hand sides
+        inst.set_row_bounds(con3, DEMAND, DEMAND)
+        inst.set_row_bounds(con4up, 0.0, 0.0)
+        inst.set_row_bounds(con4dn, 0.0, 0.0)
+        if cumulative:
+            inst.set_row_bounds(cum_dn, 0.0, 0.0)
+            inst.set_row_bounds(cum_up, 0.0, 0.0)
+        inst.set_row_bounds(con6, RE, RE)
+        inst.set_row_bounds(con7, upper=0.0)
+        inst.set_row_bounds(con8, upper=RE)
+        inst.set_row_bounds(con9, upper=-RE)
+        inst.set_row_bounds(con10up, upper=RR[:, None])
+        inst.set_row_bounds(con10dn, upper=RR[:, None])
+        inst.set_row_bounds(con11up, upper=ramp_up_rhs)
+        inst.set_row_bounds(con11dn, upper=ramp_dn_rhs)
+        inst.set_row_bounds(con12, upper=CAP[:, None])
+        inst.set_row_bounds(con13, upper=0.0)
+        sb_rhs = np.zeros((len(B), len(T)))
+        sb_rhs[:, :1] = E0[:, None]
+        inst.set_row_bounds(sb, sb_rhs, sb_rhs)
+        inst.set_row_bounds(sc, upper=E_MAX[:, None])
+        inst.set_row_bounds(fs, lower=E_FINAL)
+        inst.set_row_bounds(sfu, upper=0.0)
+        inst.set_row_bounds(sfd, upper=(E_MAX / ETA_CH)[None, :, None])
+        inst.set_row_bounds(sfp, upper=P_MAX[None, :, None])
+        inst.set_row_bounds(scd, upper=P_MAX[:, None])
+        inst.set_row_bounds(chc, upper=0.0)
+        inst.set_row_bounds(dcc, upper=0.0)
+        inst.set_row_bounds(fpu, upper=0.0)
+        inst.set_row_bounds(fpd, upper=0.0)
+
+        # Objective: linear costs
+        inst.set_cost(xDA, VC[:, None])
+        inst.set_cost(hsu, probTU[:, None, None] * VCUP[None, :, None])
+        inst.set_cost(hsd, -probTD[:, None, None] * VCDN[None, :, None])
+        inst.set_cost(bsu, probTU[:, None, None] * VCUP_B[None, :, None])
+        inst.set_cost(bsd, -probTD[:, None, None] * VCDN_B[None, :, None])
+        inst.set_cost(sdu, probTU[:, None] * PEN)
+        inst.set_cost(sdd, -probTD[:, None] * PENDN)
+        inst.set_cost(y, smallM)
+        inst.set_cost(dv, D1 * prob.sum())
+        inst.set_cost(du, prob[:, None] * D1)
+        inst.set_cost(p_ch, STORAGE_COST[:, None])
+        inst.set_cost(p_dch, STORAGE_COST[:, None])
+        inst.set_cost(e, -V_MARG[:, None])
+
+        # Objective: D2 * sum_{s,t} prob[s] * (d[t] + du[s,t])^2, as the Hessian of 0.5 x'Qx
+        k = np.broadcast_to(2 * D2 * prob[:, None], du.shape).ravel()
+        d_cols = np.broadcast_to(dv.cols[None, :], du.shape)
+        inst.set_quadratic(
+            np.concatenate([d_cols.ravel(), du.cols.ravel(), d_cols.ravel(), du.cols.ravel()]),
+            np.concatenate([d_cols.ravel(), du.cols.ravel(), du.cols.ravel(), d_cols.ravel()]),
+            np.tile(k, 4),
+        )
+        return inst
+
+    def get_instance(self, data):
+        """Assembly takes milliseconds, so the matrix backend simply rebuilds the instance."""
+        return self.create_instance(data)
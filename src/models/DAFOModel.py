@@ -1,8 +1,14 @@
 import pyomo.environ as pyo
+from models.instance_utils import get_persistent_instance
 
 class DAFOModel:
+    # Parameters that can change between runs without rebuilding the instance
+    MUTABLE_PARAMS = ['RE', 'REDA', 'DEMAND', 'D1', 'D2', 'PEN', 'PENDN', 'smallM', 'probTU', 'probTD', 'prob', 'X0', 'E0', 'E_FINAL', 'VC', 'VCUP', 'VCDN']
+
     def __init__(self, config):
         self.config = config
+        self.instance = None
+        self._instance_static_data = None
         if config['benchmark']:
             self.num_periods = 2
             self.num_scenarios = 5
@@ -17,6 +23,9 @@ class DAFOModel:
             self.num_tiers = general_cfg['num_tiers']
             self.num_storage = general_cfg['num_storage']
 
+        # "cumulative" replaces the tier sums in Con6/Con7 by prefix/suffix tier variables
+        self.flex_demand_formulation = config.get('dafo', {}).get('flex_demand_formulation', 'direct')
+
         self.model = pyo.AbstractModel()
         self._define_sets()
         self._define_parameters()
@@ -37,40 +46,46 @@ class DAFOModel:
             self.model.G_FO_sellers = pyo.Set(initialize=lambda m: [g for g in m.G if m.flag[g] == 1])
         else:
             self.model.G = pyo.Set(initialize=[])
+        # Generators whose ramp into t = 1 is limited from their output X0 at the end of the previous day (rolling horizon)
+        self.model.G_RAMP0 = pyo.Set(within=self.model.G, initialize=[])
         
         # Storage set
         if self.num_storage > 0:
             self.model.B = pyo.RangeSet(1, self.num_storage)
         else:
             self.model.B = pyo.Set(initialize=[])
+        # Storage units whose DA schedule must end at least at E_FINAL (cyclic rolling horizon); RTSim enforces E_FINAL for all
+        self.model.B_FINAL = pyo.Set(within=self.model.B, initialize=[])
     
     def _define_parameters(self):
         # General Parameters
-        self.model.VC = pyo.Param(self.model.G, within=pyo.NonNegativeReals)           # Variable cost
-        self.model.VCUP = pyo.Param(self.model.G, within=pyo.NonNegativeReals)         # Variable cost up
-        self.model.VCDN = pyo.Param(self.model.G, within=pyo.NonNegativeReals)         # Variable cost down
+        self.model.VC = pyo.Param(self.model.G, within=pyo.NonNegativeReals, mutable=True)    # Variable cost
+        self.model.VCUP = pyo.Param(self.model.G, within=pyo.NonNegativeReals, mutable=True)  # Variable cost up
+        self.model.VCDN = pyo.Param(self.model.G, within=pyo.NonNegativeReals, mutable=True)  # Variable cost down
         self.model.CAP = pyo.Param(self.model.G, within=pyo.NonNegativeReals)          # Capacity
-        self.model.REDA = pyo.Param(self.model.T)         # Maximum DA RE for each hour
-        self.model.DEMAND = pyo.Param(self.model.T)       # Electricity demand per hour
-        self.model.D1 = pyo.Param(within=pyo.NonNegativeIntegers)    # Linear cost coefficient for demand slack
-        self.model.D2 = pyo.Param(within=pyo.NonNegativeIntegers)    # Quadratic cost coefficient for demand slack
+        self.model.REDA = pyo.Param(self.model.T, mutable=True)         # Maximum DA RE for each hour
+        self.model.DEMAND = pyo.Param(self.model.T, mutable=True)       # Electricity demand per hour
+        self.model.D1 = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)    # Linear cost coefficient for demand slack
+        self.model.D2 = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)    # Quadratic cost coefficient for demand slack
 
         # Parameters specific to the FO
         self.model.RR = pyo.Param(self.model.G)                      # Ramp rate
-        self.model.RE = pyo.Param(self.model.S, self.model.T)        # Renewable generation at each scenario and time
-        self.model.PEN = pyo.Param(within=pyo.NonNegativeIntegers)   # Penalty for inadequate flexibility up
-        self.model.PENDN = pyo.Param(within=pyo.NonNegativeIntegers) # Penalty for inadequate flexibility down
-        self.model.smallM = pyo.Param(within=pyo.NonNegativeReals)   # Parameter for alternative optima
-        self.model.probTU = pyo.Param(self.model.R)                  # Probability of exercise FO up
-        self.model.probTD = pyo.Param(self.model.R)                  # Probability of exercise FO down
+        self.model.X0 = pyo.Param(self.model.G, default=0.0, mutable=True)  # DA output in the last period of the previous day
+        self.model.RE = pyo.Param(self.model.S, self.model.T, mutable=True)        # Renewable generation at each scenario and time
+        self.model.PEN = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)   # Penalty for inadequate flexibility up
+        self.model.PENDN = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True) # Penalty for inadequate flexibility down
+        self.model.smallM = pyo.Param(within=pyo.NonNegativeReals, mutable=True)   # Parameter for alternative optima
+        self.model.probTU = pyo.Param(self.model.R, mutable=True)                  # Probability of exercise FO up
+        self.model.probTD = pyo.Param(self.model.R, mutable=True)                  # Probability of exercise FO down
+        self.model.prob = pyo.Param(self.model.S, mutable=True)                    # Scenario probability (1/|S| unless reduced)
 
         # Storage Parameters
         self.model.E_MAX = pyo.Param(self.model.B)        # Maximum energy capacity
         self.model.P_MAX = pyo.Param(self.model.B)        # Maximum power capacity
         self.model.ETA_CH = pyo.Param(self.model.B)       # Charging efficiency
         self.model.ETA_DCH = pyo.Param(self.model.B)      # Discharging efficiency
-        self.model.E0 = pyo.Param(self.model.B)           # Initial state of charge
-        self.model.E_FINAL = pyo.Param(self.model.B)      # Required final state of charge
+        self.model.E0 = pyo.Param(self.model.B, mutable=True)       # Initial state of charge
+        self.model.E_FINAL = pyo.Param(self.model.B, mutable=True)  # Required final state of charge
         self.model.STORAGE_COST = pyo.Param(self.model.B) # Storage operating cost per MWh
         self.model.VCUP_B = pyo.Param(self.model.B, default=0.0)   # FO Up cost for storage
         self.model.VCDN_B = pyo.Param(self.model.B, default=0.0)   # FO Down benefit for storage
@@ -96,6 +111,9 @@ class DAFOModel:
         self.model.sdu = pyo.Var(self.model.R, self.model.T, domain=pyo.NonNegativeReals)     # Self-supply FO up
         self.model.sdd = pyo.Var(self.model.R, self.model.T, domain=pyo.NonNegativeReals)     # Self-supply FO down
         self.model.y = pyo.Var(self.model.S, self.model.T, domain=pyo.NonNegativeReals)       # Auxiliary variable
+        if self.flex_demand_formulation == 'cumulative':
+            self.model.cdd = pyo.Var(self.model.R, self.model.T, domain=pyo.NonNegativeReals)   # Cumulative demand+self-supply FO down over tiers <= r
+            self.model.cdu = pyo.Var(self.model.R, self.model.T, domain=pyo.NonNegativeReals)   # Cumulative demand+self-supply FO up over tiers >= r
 
         # Storage Variables
         self.model.e = pyo.Var(self.model.B, self.model.T, domain=pyo.NonNegativeReals)     # Energy level
@@ -163,8 +181,8 @@ class DAFOModel:
             obj.append(sum(m.y[s, t] for s in m.S for t in m.T) * m.smallM)
 
             # 6. Demand Flexibility Penalty
-            obj.append(sum(0.2 * m.D1 * (m.d[t] + m.du[s, t]) for s in m.S for t in m.T))
-            obj.append(0.2 * m.D2 * sum((m.d[t] + m.du[s, t]) ** 2 for s in m.S for t in m.T))
+            obj.append(sum(m.prob[s] * m.D1 * (m.d[t] + m.du[s, t]) for s in m.S for t in m.T))
+            obj.append(m.D2 * sum(m.prob[s] * (m.d[t] + m.du[s, t]) ** 2 for s in m.S for t in m.T))
 
             # 7. Storage Charging/Discharging Costs
             obj.append(sum(m.STORAGE_COST[b] * (m.p_ch[b, t] + m.p_dch[b, t]) for b in m.B for t in m.T))
@@ -210,18 +228,43 @@ class DAFOModel:
         
         self.model.Con4DN = pyo.Constraint(self.model.R, self.model.T, rule=DA_flexdn_balance)
 
+        # Flexibility down procured in tiers r <= s-1 and flexibility up procured in tiers r >= s
+        if self.flex_demand_formulation == 'cumulative':
+            # Prefix/suffix sums defined once per hour, so every Con6/Con7 row has a constant number of terms
+            def cumulative_flex_dn(model, r, t):
+                previous = model.cdd[r-1,t] if r > 1 else 0
+                return model.cdd[r,t] == previous + model.hdd[r,t] + model.sdd[r,t]
+            self.model.ConCumDN = pyo.Constraint(self.model.R, self.model.T, rule=cumulative_flex_dn)
+
+            def cumulative_flex_up(model, r, t):
+                following = model.cdu[r+1,t] if r < self.num_tiers else 0
+                return model.cdu[r,t] == following + model.hdu[r,t] + model.sdu[r,t]
+            self.model.ConCumUP = pyo.Constraint(self.model.R, self.model.T, rule=cumulative_flex_up)
+
+            def flex_dn_below(model, s, t):
+                return model.cdd[min(s-1, self.num_tiers),t] if s > 1 else 0
+
+            def flex_up_above(model, s, t):
+                return model.cdu[s,t] if s <= self.num_tiers else 0
+        else:
+            def flex_dn_below(model, s, t):
+                return sum(model.hdd[r,t] + model.sdd[r,t] for r in model.R if r <= s-1)
+
+            def flex_up_above(model, s, t):
+                return sum(model.hdu[r,t] + model.sdu[r,t] for r in model.R if r >= s)
+
         # Flexibility demand for each scenario and hour
         def DA_flex_demand(model, s, t):
             return (-model.du[s,t] + 
-                    sum(model.hdd[r,t] + model.sdd[r,t] for r in model.R if r <= s-1) -
-                    sum(model.hdu[r,t] + model.sdu[r,t] for r in model.R if r >= s) == 
+                    flex_dn_below(model, s, t) -
+                    flex_up_above(model, s, t) == 
                     model.RE[s,t] - model.rgDA[t])
         
         self.model.Con6 = pyo.Constraint(self.model.S, self.model.T, rule=DA_flex_demand)
 
         def DA_flex_demand_bound(model, s, t):
-            return (sum(model.hdd[r, t] + model.sdd[r, t] for r in model.R if r <= s-1) + 
-                    sum(model.hdu[r, t] + model.sdu[r, t] for r in model.R if r >= s)) <= model.y[s, t]
+            return (flex_dn_below(model, s, t) + 
+                    flex_up_above(model, s, t)) <= model.y[s, t]
         self.model.Con7 = pyo.Constraint(self.model.S, self.model.T, rule=DA_flex_demand_bound)
 
         def Y2(model, s, t):
@@ -250,6 +293,8 @@ class DAFOModel:
         # Inter-temporal constraints
         def ramp_rate_up(model, g, t):
             if t == 1:
+                if g in model.G_RAMP0:
+                    return model.xDA[g,t] - model.X0[g] <= model.RR[g]
                 return pyo.Constraint.Skip
             else:
                 return model.xDA[g,t] - model.xDA[g,t-1] <= model.RR[g]
@@ -257,6 +302,8 @@ class DAFOModel:
 
         def ramp_rate_down(model, g, t):
             if t == 1:
+                if g in model.G_RAMP0:
+                    return model.X0[g] - model.xDA[g,t] <= model.RR[g]
                 return pyo.Constraint.Skip
             else:
                 return model.xDA[g,t-1] - model.xDA[g,t] <= model.RR[g]
@@ -294,6 +341,11 @@ class DAFOModel:
             return model.e[b,t] <= model.E_MAX[b]
         self.model.storage_capacity = pyo.Constraint(self.model.B, self.model.T, rule=storage_capacity)
 
+        # Final state of charge requirement of B_FINAL, as in the RT model
+        def final_soc(model, b):
+            return model.e[b, model.T.last()] >= model.E_FINAL[b]
+        self.model.final_soc = pyo.Constraint(self.model.B_FINAL, rule=final_soc)
+
         # Refined FO up limit (storage discharge capacity tied to state of charge)
         def refined_storage_fo_up_limit(model, r, b, t):
             return model.bsu[r, b, t] <= model.e[b, t] * model.ETA_DCH[b]
@@ -340,4 +392,8 @@ class DAFOModel:
         self.model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
         
     def create_instance(self, data):
-        return self.model.create_instance(data)
\ No newline at end of file
+        return self.model.create_instance(data)
+
+    def get_instance(self, data):
+        """Returns a persistent instance: built on first use, afterwards only the mutable parameters are updated."""
+        return get_persistent_instance(self, data)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import copy
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyomo.environ as pyo
+from models.RTSimModel import RTSimModel
+from models.RTSimMatrixModel import RTSimMatrixModel, rt_solution_instance
+from models.solver_utils import ModelSolver
+
+# (config, single-scenario RT model) of this process, reused for every scenario it solves
+_scenario_model = None
+
+# Variables that are solved per scenario and reassembled into the full (S, ...) shape
+SCENARIO_VARS = ['xup', 'xdn', 'rgup', 'rgdn', 'd', 'sdup', 'sddn']
+
+class RTSimDecomposedModel:
+    """
+    RTSim solved as independent per-scenario subproblems.
+
+    The RT model has no constraint coupling across scenarios and its objective is a
+    probability-weighted sum, so every scenario can be solved on its own (keeping its
+    probability in the objective, which keeps the Con3 duals on the same scale as the joint
+    model). Subproblems are distributed over a process pool and the solutions are reassembled
+    into an instance exposing the same attributes as a solved RTSim instance
+    (`xup[s, g, t].value`, `dual[Con3[s, t]]`, `prob[s]`, ...). The pool is started on the first
+    solve and kept until `close()`, so its workers keep their persistent scenario models.
+    """
+    def __init__(self, config):
+        self.config = config
+        if config['benchmark']:
+            self.num_periods = 2
+            self.num_scenarios = 5
+            self.num_generators = 5
+            self.num_tiers = 4
+            self.num_storage = 0
+        else:
+            general_cfg = config['general']
+            self.num_periods = general_cfg['num_periods']
+            self.num_scenarios = general_cfg['num_scenarios']
+            self.num_generators = general_cfg['num_generators']
+            self.num_tiers = general_cfg['num_tiers']
+            self.num_storage = general_cfg['num_storage']
+
+        rt_cfg = config.get('rt_simulation', {})
+        self.max_workers = rt_cfg.get('max_workers')
+        self._executor = None
+
+        # Configuration of the single-scenario subproblem
+        self.scenario_config = copy.deepcopy(config)
+        self.scenario_config['benchmark'] = False
+        self.scenario_config['general'] = {
+            'num_periods': self.num_periods,
+            'num_scenarios': 1,
+            'num_generators': self.num_generators,
+            'num_tiers': self.num_tiers,
+            'num_storage': self.num_storage,
+        }
+
+    def scenario_data(self, data, s):
+        """Returns the RT data of scenario `s` as a single-scenario (S = {1}) data dict."""
+        d = data[None]
+        sub = {k: v for k, v in d.items() if k not in ('RE', 'prob')}
+        sub['RE'] = {(1, t): d['RE'][s, t] for t in range(1, self.num_periods + 1)}
+        sub['prob'] = {1: d['prob'][s]}
+        return {None: sub}
+
+    def solve(self, data):
+        """
+        Solves all scenarios of `data` and returns the reassembled RT instance.
+
+        Scenarios are split into one chunk per worker. Inside a daemonic process (e.g. a batch
+        simulation worker), which cannot start child processes, the chunks are solved serially.
+
+        Returns:
+            MatrixInstance: Solution view with `termination_condition` set to 'optimal' only if
+                every subproblem solved to optimality.
+        """
+        scenarios = list(range(1, self.num_scenarios + 1))
+        tasks = [(s, self.scenario_data(data, s)) for s in scenarios]
+
+        max_workers = self.max_workers or max(1, (multiprocessing.cpu_count() or 1) - 1)
+        max_workers = min(max_workers, len(tasks))
+        if max_workers <= 1 or multiprocessing.current_process().daemon:
+            results = solve_scenarios(self.scenario_config, tasks)
+        else:
+            chunks = [tasks[i::max_workers] for i in range(max_workers)]
+            executor = self._get_executor(max_workers)
+            results = [r for part in executor.map(solve_scenarios, [self.scenario_config] * len(chunks), chunks) for r in part]
+
+        return self._assemble(data, results)
+
+    def _get_executor(self, max_workers):
+        """Returns the process pool of this model, creating it on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+            weakref.finalize(self, self._executor.shutdown, wait=False)
+        return self._executor
+
+    def close(self):
+        """Shuts down the process pool; the next parallel solve starts a new one."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _assemble(self, data, results):
+        """Builds the full-size solution view from the per-scenario results."""
+        S = list(range(1, self.num_scenarios + 1))
+        inst = rt_solution_instance(
+            data, range(1, self.num_periods + 1), S, range(1, self.num_generators + 1), range(1, self.num_storage + 1)
+        )
+        inst.termination_condition = 'optimal'
+        for s, termination, solution in sorted(results, key=lambda r: r[0]):
+            i = S.index(s)
+            if termination != 'optimal' and inst.termination_condition == 'optimal':
+                inst.termination_condition = termination
+            if solution is None:
+                continue
+            for name in SCENARIO_VARS:
+                inst.col_value[inst.var_blocks[name].cols[i]] = solution[name]
+            inst.row_dual[inst.Con3.rows[i]] = solution['Con3']
+        return inst
+
+
+def _get_scenario_model(config):
+    """Returns the single-scenario RT model of the current process, created on first use or for a new config."""
+    global _scenario_model
+    if _scenario_model is None or _scenario_model[0] != config:
+        if config.get('model_backend', 'pyomo') == 'matrix':
+            _scenario_model = (config, RTSimMatrixModel(config))
+        else:
+            _scenario_model = (config, RTSimModel(config))
+    return _scenario_model[1]
+
+
+def solve_scenarios(config, tasks):
+    """
+    Solves a list of single-scenario RT subproblems with one persistent model instance.
+
+    Args:
+        config (dict): Configuration of the single-scenario subproblem.
+        tasks (list): (scenario, single-scenario data) pairs.
+
+    Returns:
+        list: (scenario, termination condition, solution arrays or None) per task.
+    """
+    model = _get_scenario_model(config)
+    matrix = config.get('model_backend', 'pyomo') == 'matrix'
+    if not matrix:
+        opt = ModelSolver(config['solver'])
+
+    results = []
+    for s, data in tasks:
+        instance = model.get_instance(data)
+        try:
+            if matrix:
+                termination = instance.solve(config.get('matrix_solver_options', {}))
+            else:
+                result = opt.solve(instance)
+                termination = str(result.solver.termination_condition)
+        except Exception as e:
+            results.append((s, f"error: {e}", None))
+            continue
+        results.append((s, termination, _scenario_solution(instance)))
+    return results
+
+
+def _scenario_solution(instance):
+    """Extracts the reassembled variables and the Con3 duals of a solved single-scenario instance."""
+    T, Gs = list(instance.T), list(instance.G_FO_sellers)
+    solution = {
+        name: np.array([[getattr(instance, name)[1, g, t].value for t in T] for g in Gs], dtype=float).reshape(len(Gs), len(T))
+        for name in ('xup', 'xdn')
+    }
+    for name in ('rgup', 'rgdn', 'd', 'sdup', 'sddn'):
+        solution[name] = np.array([getattr(instance, name)[1, t].value for t in T], dtype=float)
+    solution['Con3'] = np.array([instance.dual[instance.Con3[1, t]] for t in T], dtype=float)
+    return solution
@@ -0,0 +1,225 @@
+import numpy as np
+from models.matrix_utils import MatrixInstance, IndexSet, set_param_attributes
+
+class RTSimMatrixModel:
+    """
+    Matrix-form RTSim model for repeated re-solves.
+
+    The constraint matrix only depends on the (S, G_FO_sellers, B, T) shape and the storage
+    efficiencies, so it is assembled once and kept. Each new DA outcome (xDA, REDA, DAdr, RE,
+    storage DA schedules, scenario probabilities) only rewrites the cost, right-hand-side and
+    bound vectors of the kept instance before it is solved again.
+    """
+    def __init__(self, config):
+        self.config = config
+        if config['benchmark']:
+            self.num_periods = 2
+            self.num_scenarios = 5
+            self.num_generators = 5
+            self.num_tiers = 4
+            self.num_storage = 0
+        else:
+            general_cfg = config['general']
+            self.num_periods = general_cfg['num_periods']
+            self.num_scenarios = general_cfg['num_scenarios']
+            self.num_generators = general_cfg['num_generators']
+            self.num_tiers = general_cfg['num_tiers']
+            self.num_storage = general_cfg['num_storage']
+
+        self.instance = None
+        self._structure_key = None
+
+    def _sets(self, d):
+        T = IndexSet(range(1, self.num_periods + 1))
+        S = IndexSet(range(1, self.num_scenarios + 1))
+        G = IndexSet(range(1, self.num_generators + 1))
+        B = IndexSet(range(1, self.num_storage + 1))
+        flag = d.get('flag', {})
+        Gs = IndexSet(g for g in G if flag.get(g) == 1)
+        return T, S, G, Gs, B
+
+    def _build_structure(self, d):
+        T, S, G, Gs, B = self._sets(d)
+        inst = MatrixInstance()
+        inst.T, inst.S, inst.G, inst.B = T, S, G, B
+        inst.G_FO_sellers = Gs
+        inst.G_FO_buyers = IndexSet(g for g in G if d.get('flag', {}).get(g) == -1)
+
+        ETA_CH = np.array([d['ETA_CH'][b] for b in B], dtype=float)
+        ETA_DCH = np.array([d['ETA_DCH'][b] for b in B], dtype=float)
+
+        # Variables
+        xup = inst.add_var('xup', [S, Gs, T])
+        xdn = inst.add_var('xdn', [S, Gs, T])
+        dv = inst.add_var('d', [S, T], lb=-np.inf)
+        rgup = inst.add_var('rgup', [S, T])
+        rgdn = inst.add_var('rgdn', [S, T])
+        sdup = inst.add_var('sdup', [S, T])
+        sddn = inst.add_var('sddn', [S, T])
+        e = inst.add_var('e', [S, B, T])
+        p_ch = inst.add_var('p_ch', [S, B, T])
+        p_dch = inst.add_var('p_dch', [S, B, T])
+        b_up = inst.add_var('b_up', [S, B, T])
+        b_dn = inst.add_var('b_dn', [S, B, T])
+
+        # Con3: RT energy balance
+        con3 = inst.add_constraint('Con3', [S, T])
+        inst.add_terms(con3.rows[:, None, :], xup.cols)
+        inst.add_terms(con3.rows[:, None, :], xdn.cols, -1.0)
+        inst.add_terms(con3.rows, rgup.cols)
+        inst.add_terms(con3.rows, rgdn.cols, -1.0)
+        inst.add_terms(con3.rows[:, None, :], p_dch.cols)
+        inst.add_terms(con3.rows[:, None, :], p_ch.cols, -1.0)
+        inst.add_terms(con3.rows, dv.cols)
+
+        # Con4: RT renewable availability
+        con4 = inst.add_constraint('Con4', [S, T])
+        inst.add_terms(con4.rows, rgup.cols)
+        inst.add_terms(con4.rows, rgdn.cols, -1.0)
+        inst.add_terms(con4.rows, sdup.cols)
+        inst.add_terms(con4.rows, sddn.cols, -1.0)
+
+        # Con5-Con7: generator ramp and capacity limits
+        for name, var in (('Con5up', xup), ('Con5dn', xdn), ('Con6', xup)):
+            con = inst.add_constraint(name, [S, Gs, T])
+            inst.add_terms(con.rows, var.cols)
+        con = inst.add_constraint('Con7', [S, Gs, T])
+        inst.add_terms(con.rows, xdn.cols, -1.0)
+
+        # Storage constraints
+        sb = inst.add_constraint('storage_balance', [S, B, T])
+        inst.add_terms(sb.rows, e.cols)
+        inst.add_terms(sb.rows, p_ch.cols, -ETA_CH[None, :, None])
+        inst.add_terms(sb.rows, p_dch.cols, 1.0 / ETA_DCH[None, :, None])
+        inst.add_terms(sb.rows[:, :, 1:], e.cols[:, :, :-1], -1.0)
+        sc = inst.add_constraint('storage_capacity', [S, B, T])
+        inst.add_terms(sc.rows, e.cols)
+        pl = inst.add_constraint('power_limits', [S, B, T])
+        inst.add_terms(pl.rows, p_ch.cols)
+        inst.add_terms(pl.rows, p_dch.cols)
+        fs = inst.add_constraint('final_soc', [S, B])
+        inst.add_terms(fs.rows, e.cols[:, :, -1])
+        su = inst.add_constraint('storage_rt_up_cap', [S, B, T])
+        inst.add_terms(su.rows, b_up.cols)
+        inst.add_terms(su.rows, e.cols, -ETA_DCH[None, :, None])
+        sd = inst.add_constraint('storage_rt_dn_cap', [S, B, T])
+        inst.add_terms(sd.rows, b_dn.cols)
+        inst.add_terms(sd.rows, e.cols, 1.0 / ETA_CH[None, :, None])
+
+        return inst.finalize()
+
+    def _set_data(self, inst, d):
+        """Writes the run-specific cost, right-hand-side and bound vectors into the instance."""
+        T, S, B, Gs = inst.T, inst.S, inst.B, inst.G_FO_sellers
+        set_param_attributes(inst, d, [
+            'VC', 'VCUP', 'VCDN', 'CAP', 'RR', 'prob', 'RE', 'DEMAND', 'D1', 'D2', 'xDA', 'REDA',
+            'PEN', 'PENDN', 'DAdr', 'E_MAX', 'P_MAX', 'ETA_CH', 'ETA_DCH', 'E0', 'STORAGE_COST',
+            'E_FINAL', 'p_ch_DA', 'p_dch_DA', 'flag'
+        ])
+
+        VCUP = np.array([d['VCUP'][g] for g in Gs], dtype=float)
+        VCDN = np.array([d['VCDN'][g] for g in Gs], dtype=float)
+        CAP = np.array([d['CAP'][g] for g in Gs], dtype=float)
+        RR = np.array([d['RR'][g] for g in Gs], dtype=float)
+        prob = np.array([d['prob'][s] for s in S], dtype=float)
+        RE = np.array([[d['RE'][s, t] for t in T] for s in S], dtype=float).reshape(len(S), len(T))
+        REDA = np.array([d['REDA'][t] for t in T], dtype=float)
+        DAdr = np.array([d['DAdr'][t] for t in T], dtype=float)
+        xDA = np.array([[d['xDA'][g, t] for t in T] for g in Gs], dtype=float).reshape(len(Gs), len(T))
+        D1, D2 = d['D1'][None], d['D2'][None]
+        PEN, PENDN = d['PEN'][None], d['PENDN'][None]
+        E_MAX = np.array([d['E_MAX'][b] for b in B], dtype=float)
+        P_MAX = np.array([d['P_MAX'][b] for b in B], dtype=float)
+        ETA_CH = np.array([d['ETA_CH'][b] for b in B], dtype=float)
+        E0 = np.array([d['E0'][b] for b in B], dtype=float)
+        E_FINAL = np.array([d['E_FINAL'][b] for b in B], dtype=float)
+        STORAGE_COST = np.array([d['STORAGE_COST'][b] for b in B], dtype=float)
+        VCUP_B = np.array([d.get('VCUP_B', {}).get(b, 0.0) for b in B], dtype=float)
+        VCDN_B = np.array([d.get('VCDN_B', {}).get(b, 0.0) for b in B], dtype=float)
+        p_ch_DA = np.array([[d['p_ch_DA'][b, t] for t in T] for b in B], dtype=float).reshape(len(B), len(T))
+        p_dch_DA = np.array([[d['p_dch_DA'][b, t] for t in T] for b in B], dtype=float).reshape(len(B), len(T))
+
+        # Right-hand sides
+        storage_rhs = (p_dch_DA - p_ch_DA).sum(axis=0)
+        inst.set_row_bounds(inst.Con3, storage_rhs[None, :], storage_rhs[None, :])
+        inst.set_row_bounds(inst.Con4, RE - REDA[None, :], RE - REDA[None, :])
+        inst.set_row_bounds(inst.Con5up, upper=RR[None, :, None])
+        inst.set_row_bounds(inst.Con5dn, upper=RR[None, :, None])
+        inst.set_row_bounds(inst.Con6, upper=(CAP[:, None] - xDA)[None, :, :])
+        inst.set_row_bounds(inst.Con7, lower=-xDA[None, :, :])
+        sb_rhs = np.zeros((len(S), len(B), len(T)))
+        sb_rhs[:, :, 0] = E0[None, :]
+        inst.set_row_bounds(inst.storage_balance, sb_rhs, sb_rhs)
+        inst.set_row_bounds(inst.storage_capacity, upper=E_MAX[None, :, None])
+        inst.set_row_bounds(inst.power_limits, upper=P_MAX[None, :, None])
+        inst.set_row_bounds(inst.final_soc, lower=E_FINAL[None, :])
+        inst.set_row_bounds(inst.storage_rt_up_cap, upper=0.0)
+        inst.set_row_bounds(inst.storage_rt_dn_cap, upper=(E_MAX / ETA_CH)[None, :, None])
+
+        # Objective: probability-weighted adjustment, penalty, demand response and storage costs.
+        # The quadratic demand response cost D1*(DAdr+d) + D2*(DAdr+d)^2 minus its DA base reduces
+        # to (D1 + 2*D2*DAdr)*d + D2*d^2.
+        p = prob[:, None]
+        inst.set_cost(inst.xup, p[:, :, None] * VCUP[None, :, None])
+        inst.set_cost(inst.xdn, -p[:, :, None] * VCDN[None, :, None])
+        inst.set_cost(inst.sdup, p * PENDN)
+        inst.set_cost(inst.sddn, p * PEN)
+        inst.set_cost(inst.d, p * (D1 + 2 * D2 * DAdr[None, :]))
+        inst.set_cost(inst.p_ch, p[:, :, None] * STORAGE_COST[None, :, None])
+        inst.set_cost(inst.p_dch, p[:, :, None] * STORAGE_COST[None, :, None])
+        inst.set_cost(inst.b_up, p[:, :, None] * VCUP_B[None, :, None])
+        inst.set_cost(inst.b_dn, -p[:, :, None] * VCDN_B[None, :, None])
+        d_cols = inst.d.cols
+        inst.set_quadratic(d_cols, d_cols, 2 * D2 * np.broadcast_to(p, d_cols.shape))
+
+        inst.col_value = None
+        inst.row_dual = None
+        inst.termination_condition = None
+
+    def create_instance(self, data):
+        """
+        Returns the RT instance for `data`. The matrix structure is built on the first call
+        (or when the shape changes); later calls reuse and re-parameterize the same instance.
+        """
+        d = data[None]
+        T, S, G, Gs, B = self._sets(d)
+        key = (
+            len(S), tuple(Gs), len(B), len(T),
+            tuple(d['ETA_CH'][b] for b in B), tuple(d['ETA_DCH'][b] for b in B),
+        )
+        if self.instance is None or key != self._structure_key:
+            self.instance = self._build_structure(d)
+            self._structure_key = key
+        self._set_data(self.instance, d)
+        return self.instance
+
+    def get_instance(self, data):
+        return self.create_instance(data)
+
+
+def rt_solution_instance(data, T, S, G, B):
+    """
+    Returns an empty RT solution in matrix form (the variables read by the results functions and
+    the Con3 rows, without constraint matrix) for engines that compute the RT solution themselves.
+    The caller fills `col_value`, `row_dual` and `termination_condition`.
+    """
+    d = data[None]
+    flag = d.get('flag', {})
+    Gs = IndexSet(g for g in G if flag.get(g) == 1)
+
+    inst = MatrixInstance()
+    inst.T, inst.S, inst.G, inst.B = IndexSet(T), IndexSet(S), IndexSet(G), IndexSet(B)
+    inst.G_FO_sellers = Gs
+    inst.G_FO_buyers = IndexSet(g for g in G if flag.get(g) == -1)
+    for name in ('xup', 'xdn'):
+        inst.add_var(name, [inst.S, Gs, inst.T])
+    for name in ('rgup', 'rgdn', 'd', 'sdup', 'sddn'):
+        inst.add_var(name, [inst.S, inst.T])
+    inst.add_constraint('Con3', [inst.S, inst.T])
+    set_param_attributes(inst, d, [
+        'VC', 'VCUP', 'VCDN', 'CAP', 'RR', 'prob', 'RE', 'DEMAND', 'D1', 'D2', 'xDA', 'REDA',
+        'PEN', 'PENDN', 'DAdr', 'flag'
+    ])
+    inst.col_value = np.full(inst.num_cols, np.nan)
+    inst.row_dual = np.full(inst.num_rows, np.nan)
+    return inst
@@ -0,0 +1,148 @@
+import numpy as np
+from models.RTSimMatrixModel import rt_solution_instance
+
+class RTSimMeritOrderModel:
+    """
+    Closed-form RTSim dispatch for storage-free systems.
+
+    Without storage every (scenario, period) cell of the RT problem is independent: the
+    renewable deviation RE[s,t] - REDA[t] is balanced by ramp- and capacity-limited generator
+    adjustments (xup priced at VCUP, xdn valued at VCDN), quadratic demand response
+    (marginal cost D1 + 2*D2*(DAdr + d)) and the penalty slacks (sddn at PEN, sdup at PENDN).
+    The KKT conditions reduce to finding the price lambda at which the merit-order supply curve
+    meets the deviation. The curve is piecewise linear in lambda with steps at the generator
+    prices, so all cells are solved with one sorted search per period instead of an LP solve.
+
+    The solution view exposes the same attributes as a solved RTSim instance; the Con3 dual of
+    cell (s, t) is prob[s] * lambda[s, t].
+    """
+    def __init__(self, config):
+        self.config = config
+        if config['benchmark']:
+            self.num_periods = 2
+            self.num_scenarios = 5
+            self.num_generators = 5
+            self.num_tiers = 4
+            self.num_storage = 0
+        else:
+            general_cfg = config['general']
+            self.num_periods = general_cfg['num_periods']
+            self.num_scenarios = general_cfg['num_scenarios']
+            self.num_generators = general_cfg['num_generators']
+            self.num_tiers = general_cfg['num_tiers']
+            self.num_storage = general_cfg['num_storage']
+
+    def solve(self, data):
+        """
+        Computes the optimal RT adjustments and Con3 prices for all scenarios and periods.
+
+        Raises:
+            ValueError: If the system has storage or D2 is not positive (the closed form needs a
+                strictly convex demand response to pin down the price between generator steps).
+        """
+        if self.num_storage > 0:
+            raise ValueError("The merit-order RT solver only supports systems without storage (num_storage: 0)")
+        d = data[None]
+        D1, D2 = d['D1'][None], d['D2'][None]
+        PEN, PENDN = d['PEN'][None], d['PENDN'][None]
+        if D2 <= 0:
+            raise ValueError("The merit-order RT solver requires a positive demand response coefficient D2")
+
+        T = list(range(1, self.num_periods + 1))
+        S = list(range(1, self.num_scenarios + 1))
+        G = list(range(1, self.num_generators + 1))
+        inst = rt_solution_instance(data, T, S, G, [])
+        Gs = list(inst.G_FO_sellers)
+
+        VCUP = np.array([d['VCUP'][g] for g in Gs], dtype=float)
+        VCDN = np.array([d['VCDN'][g] for g in Gs], dtype=float)
+        CAP = np.array([d['CAP'][g] for g in Gs], dtype=float)
+        RR = np.array([d['RR'][g] for g in Gs], dtype=float)
+        xDA = np.array([[d['xDA'][g, t] for t in T] for g in Gs], dtype=float).reshape(len(Gs), len(T))
+        prob = np.array([d['prob'][s] for s in S], dtype=float)
+        RE = np.array([[d['RE'][s, t] for t in T] for s in S], dtype=float)
+        REDA = np.array([d['REDA'][t] for t in T], dtype=float)
+        DAdr = np.array([d['DAdr'][t] for t in T], dtype=float)
+
+        # Adjustment ranges (Con5-Con7) and the deviation to be covered by net RT supply
+        up_cap = np.maximum(np.minimum(RR[:, None], CAP[:, None] - xDA), 0.0)   # (G, T)
+        dn_cap = np.maximum(np.minimum(RR[:, None], xDA), 0.0)                  # (G, T)
+        target = REDA[None, :] - RE                                             # (S, T)
+        a = D1 + 2 * D2 * DAdr                                                  # (T,)
+
+        # Price steps, bounded by the slack prices: lambda is in [-PENDN, PEN]
+        lo, hi = -PENDN, PEN
+        prices = np.concatenate([VCUP, VCDN])
+        steps = np.unique(np.concatenate([prices[(prices > lo) & (prices < hi)], [lo, hi]]))
+
+        # Net generator + demand response supply just below / above every step, per period
+        demand_response = (steps[None, :] - a[:, None]) / (2 * D2)             # (T, K)
+        supply_left = (
+            up_cap.T @ (VCUP[:, None] < steps[None, :])
+            - dn_cap.T @ (VCDN[:, None] >= steps[None, :])
+            + demand_response
+        )
+        supply_right = (
+            up_cap.T @ (VCUP[:, None] <= steps[None, :])
+            - dn_cap.T @ (VCDN[:, None] > steps[None, :])
+            + demand_response
+        )
+
+        lam = np.empty_like(target)
+        theta = np.zeros_like(target)      # Dispatched share of the generators tied at lambda
+        tie = np.zeros(target.shape, dtype=bool)
+        sdup = np.zeros_like(target)
+        sddn = np.zeros_like(target)
+        K = len(steps)
+        for j in range(len(T)):
+            curve = np.empty(2 * K)
+            curve[0::2], curve[1::2] = supply_left[j], supply_right[j]
+            y = target[:, j]
+            pos = np.searchsorted(curve, y, side='left')
+            k = pos // 2
+
+            # Between two steps: inside the linear demand response segment
+            between = (pos % 2 == 0) & (pos > 0) & (pos < 2 * K)
+            kb = k[between] - 1
+            lam[between, j] = steps[kb] + 2 * D2 * (y[between] - supply_right[j, kb])
+
+            # On a step: the generators at that price are dispatched pro rata
+            on_step = pos % 2 == 1
+            ks = k[on_step]
+            width = supply_right[j, ks] - supply_left[j, ks]
+            lam[on_step, j] = steps[ks]
+            theta[on_step, j] = np.where(width > 0, (y[on_step] - supply_left[j, ks]) / np.where(width > 0, width, 1.0), 1.0)
+            tie[on_step, j] = True
+
+            # Outside the curve: the slacks take the remainder at their penalty price
+            below = pos == 0
+            lam[below, j] = lo
+            tie[below, j] = True
+            sdup[below, j] = supply_left[j, 0] - y[below]
+            above = pos == 2 * K
+            lam[above, j] = hi
+            theta[above, j] = 1.0
+            tie[above, j] = True
+            sddn[above, j] = y[above] - supply_right[j, -1]
+
+        # Generator adjustments at the clearing price
+        l3, t3, tie3 = lam[:, None, :], theta[:, None, :], tie[:, None, :]
+        up_share = np.where(VCUP[None, :, None] < l3, 1.0, np.where(tie3 & (VCUP[None, :, None] == l3), t3, 0.0))
+        dn_share = np.where(VCDN[None, :, None] > l3, 1.0, np.where(tie3 & (VCDN[None, :, None] == l3), 1.0 - t3, 0.0))
+        xup = up_share * up_cap[None, :, :]
+        xdn = dn_share * dn_cap[None, :, :]
+        dr = (lam - a[None, :]) / (2 * D2)
+
+        # Renewable adjustment from Con4: rgup - rgdn = RE - REDA - sdup + sddn
+        rg = RE - REDA[None, :] - sdup + sddn
+
+        inst.col_value[inst.xup.cols] = xup
+        inst.col_value[inst.xdn.cols] = xdn
+        inst.col_value[inst.d.cols] = dr
+        inst.col_value[inst.rgup.cols] = np.maximum(rg, 0.0)
+        inst.col_value[inst.rgdn.cols] = np.maximum(-rg, 0.0)
+        inst.col_value[inst.sdup.cols] = sdup
+        inst.col_value[inst.sddn.cols] = sddn
+        inst.row_dual[inst.Con3.rows] = prob[:, None] * lam
+        inst.termination_condition = 'optimal'
+        return inst
@@ -1,8 +1,14 @@
 import pyomo.environ as pyo
+from models.instance_utils import get_persistent_instance
 
 class RTSimModel:
+    # Parameters that can change between runs without rebuilding the instance
+    MUTABLE_PARAMS = ['RE', 'REDA', 'xDA', 'DAdr', 'DEMAND', 'prob', 'D1', 'D2', 'PEN', 'PENDN', 'p_ch_DA', 'p_dch_DA', 'E0', 'E_FINAL', 'VC', 'VCUP', 'VCDN']
+
     def __init__(self, config):
         self.config = config
+        self.instance = None
+        self._instance_static_data = None
         if config['benchmark']:
             self.num_periods = 2
             self.num_scenarios = 5
@@ -45,38 +51,38 @@ class RTSimModel:
             
     def _define_parameters(self):
         # Original Parameters
-        self.model.VC = pyo.Param(self.model.G)           # Variable cost
-        self.model.VCUP = pyo.Param(self.model.G)         # Variable cost up
-        self.model.VCDN = pyo.Param(self.model.G)         # Variable cost down
+        self.model.VC = pyo.Param(self.model.G, mutable=True)    # Variable cost
+        self.model.VCUP = pyo.Param(self.model.G, mutable=True)  # Variable cost up
+        self.model.VCDN = pyo.Param(self.model.G, mutable=True)  # Variable cost down
         self.model.CAP = pyo.Param(self.model.G)          # Generator capacity
         self.model.RR = pyo.Param(self.model.G)           # Ramp rate
 
-        self.model.prob = pyo.Param(self.model.S)         # Scenario probability
-        self.model.RE = pyo.Param(self.model.S, self.model.T)  # Renewable generation by scenario and time
-        self.model.DEMAND = pyo.Param(self.model.T)       # Hourly demand
-        self.model.D1 = pyo.Param(within=pyo.NonNegativeIntegers)  # Linear demand cost coefficient
-        self.model.D2 = pyo.Param(within=pyo.NonNegativeIntegers)  # Quadratic demand cost coefficient
-        self.model.xDA = pyo.Param(self.model.G_FO_sellers, self.model.T) # DA schedule by generator and time
-        self.model.REDA = pyo.Param(self.model.T)         # DA renewable schedule by time
-        self.model.PEN = pyo.Param(within=pyo.NonNegativeIntegers)   # Upward penalty
-        self.model.PENDN = pyo.Param()                    # Downward penalty
-        self.model.DAdr = pyo.Param(self.model.T)         # DA demand response by time
+        self.model.prob = pyo.Param(self.model.S, mutable=True)         # Scenario probability
+        self.model.RE = pyo.Param(self.model.S, self.model.T, mutable=True)  # Renewable generation by scenario and time
+        self.model.DEMAND = pyo.Param(self.model.T, mutable=True)       # Hourly demand
+        self.model.D1 = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)  # Linear demand cost coefficient
+        self.model.D2 = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)  # Quadratic demand cost coefficient
+        self.model.xDA = pyo.Param(self.model.G_FO_sellers, self.model.T, mutable=True) # DA schedule by generator and time
+        self.model.REDA = pyo.Param(self.model.T, mutable=True)         # DA renewable schedule by time
+        self.model.PEN = pyo.Param(within=pyo.NonNegativeIntegers, mutable=True)   # Upward penalty
+        self.model.PENDN = pyo.Param(mutable=True)                    # Downward penalty
+        self.model.DAdr = pyo.Param(self.model.T, mutable=True)         # DA demand response by time
 
         # Storage Parameters
         self.model.E_MAX = pyo.Param(self.model.B)        # Maximum energy capacity
         self.model.P_MAX = pyo.Param(self.model.B)        # Maximum power capacity
         self.model.ETA_CH = pyo.Param(self.model.B)       # Charging efficiency
         self.model.ETA_DCH = pyo.Param(self.model.B)      # Discharging efficiency
-        self.model.E0 = pyo.Param(self.model.B)           # Initial state of charge
+        self.model.E0 = pyo.Param(self.model.B, mutable=True)       # Initial state of charge
         self.model.STORAGE_COST = pyo.Param(self.model.B)  # Operating cost per MWh of throughput
-        self.model.E_FINAL = pyo.Param(self.model.B)      # Required final state of charge
+        self.model.E_FINAL = pyo.Param(self.model.B, mutable=True)  # Required final state of charge
         self.model.VCUP_B = pyo.Param(self.model.B, default=0.0)   # FO Up cost for storage
         self.model.VCDN_B = pyo.Param(self.model.B, default=0.0)   # FO Down cost (benefit) for storage
 
         # Storage DA parameters
         self.model.e_DA = pyo.Param(self.model.B, self.model.T)  # DA energy level
-        self.model.p_ch_DA = pyo.Param(self.model.B, self.model.T)  # DA charging
-        self.model.p_dch_DA = pyo.Param(self.model.B, self.model.T)  # DA discharging
+        self.model.p_ch_DA = pyo.Param(self.model.B, self.model.T, mutable=True)  # DA charging
+        self.model.p_dch_DA = pyo.Param(self.model.B, self.model.T, mutable=True)  # DA discharging
     
     def _define_variables(self):
         # Variables that depend on generators
@@ -232,4 +238,8 @@ class RTSimModel:
         self.model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
         
     def create_instance(self, data):
-        return self.model.create_instance(data)
\ No newline at end of file
+        return self.model.create_instance(data)
+
+    def get_instance(self, data):
+        """Returns a persistent instance: built on first use, afterwards only the mutable parameters are updated."""
+        return get_persistent_instance(self, data)
\ No newline at end of file
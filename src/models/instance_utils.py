@@ -0,0 +1,78 @@
+from pyomo.environ import Param
+
+
+def split_instance_data(data, mutable_params):
+    """
+    Splits Pyomo instance data into the mutable parameters and the remaining (structural) data.
+
+    Args:
+        data (dict): Pyomo data dictionary in the {None: {...}} format.
+        mutable_params (list): Names of the parameters declared with mutable=True.
+
+    Returns:
+        tuple: (mutable data dict, static data dict), both without the outer None key.
+    """
+    values = data[None]
+    mutable = {name: values[name] for name in mutable_params if name in values}
+    static = {name: value for name, value in values.items() if name not in mutable_params}
+    return mutable, static
+
+
+def update_mutable_params(instance, mutable_data):
+    """
+    Writes new values into the mutable parameters of a constructed instance.
+
+    Scalar parameters are given as {None: value} (the format produced by
+    DataProcessor.prepare_pyomo_data), indexed parameters as {index: value}. Values missing
+    from the new data (an index, or a parameter not given at all as {}) are reset to the
+    parameter's default, as in a freshly built instance.
+
+    Raises:
+        ValueError: If a value is missing and the parameter has no default.
+    """
+    for name, values in mutable_data.items():
+        param = getattr(instance, name)
+        if not param.is_indexed():
+            if not isinstance(values, dict):
+                param.set_value(values)
+            else:
+                param.set_value(values[None] if None in values else _default(param))
+            continue
+        stale = [index for index in param.sparse_keys() if index not in values]
+        if stale:
+            default = _default(param)
+            param.store_values({index: default for index in stale})
+        if values:
+            param.store_values(values)
+
+
+def _default(param):
+    """Default value of a mutable parameter whose previous value is not in the new data."""
+    default = param.default()
+    if default is Param.NoValue:
+        raise ValueError(f"Parameter {param.name} has no default to reset the values missing from the new data to")
+    return default
+
+
+def get_persistent_instance(model_obj, data):
+    """
+    Returns a persistent instance of `model_obj`, building it on the first call and afterwards
+    only updating the mutable parameters. The instance is rebuilt if any structural
+    (non-mutable) data differs from the data it was built with, or if a mutable parameter has
+    no default for a value missing from the new data.
+    """
+    mutable, static = split_instance_data(data, model_obj.MUTABLE_PARAMS)
+    if model_obj.instance is not None and static == model_obj._instance_static_data:
+        # Parameters given before but not now are passed as {} so that their values are reset
+        previous = getattr(model_obj, '_instance_mutable_names', set())
+        try:
+            update_mutable_params(model_obj.instance, {name: mutable.get(name, {}) for name in previous | set(mutable)})
+        except ValueError:
+            pass
+        else:
+            model_obj._instance_mutable_names = set(mutable)
+            return model_obj.instance
+    model_obj.instance = model_obj.create_instance(data)
+    model_obj._instance_static_data = static
+    model_obj._instance_mutable_names = set(mutable)
+    return model_obj.instance
@@ -0,0 +1,310 @@
+import itertools
+import numpy as np
+import scipy.sparse as sp
+
+class IndexSet(list):
+    """Ordered index set mirroring the parts of the Pyomo Set API used by the results code."""
+    def first(self):
+        return self[0]
+
+    def last(self):
+        return self[-1]
+
+
+class _Value:
+    """Stand-in for a Pyomo variable data object: exposes the solution through `.value`."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Block:
+    """Dense block of indexed entries (variables or constraints) laid out in row-major order."""
+    def __init__(self, name, sets):
+        self.name = name
+        self.sets = [IndexSet(s) for s in sets]
+        self.shape = tuple(len(s) for s in self.sets)
+        self.size = int(np.prod(self.shape)) if self.shape else 1
+        self._positions = [{k: i for i, k in enumerate(s)} for s in self.sets]
+
+    def _position(self, idx):
+        if not isinstance(idx, tuple):
+            idx = (idx,)
+        return tuple(pos[k] for pos, k in zip(self._positions, idx))
+
+    def keys(self):
+        if len(self.sets) == 1:
+            return list(self.sets[0])
+        return list(itertools.product(*self.sets))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.size
+
+
+class VarBlock(_Block):
+    """Indexed variable of a MatrixInstance; `cols` holds the column of every entry."""
+    def __init__(self, instance, name, sets, offset):
+        super().__init__(name, sets)
+        self._instance = instance
+        self.cols = offset + np.arange(self.size).reshape(self.shape)
+
+    def array(self):
+        """Returns the solution values of this variable as a dense array shaped like its index sets."""
+        return self._instance.col_value[self.cols]
+
+    def __getitem__(self, idx):
+        return _Value(float(self._instance.col_value[self.cols[self._position(idx)]]))
+
+    def items(self):
+        values = self.array().ravel()
+        return [(k, _Value(float(v))) for k, v in zip(self.keys(), values)]
+
+
+class ConBlock(_Block):
+    """Indexed constraint of a MatrixInstance; `rows` holds the row of every entry (-1 for skipped entries)."""
+    def __init__(self, name, sets, offset, mask=None):
+        super().__init__(name, sets)
+        if mask is None:
+            mask = np.ones(self.shape, dtype=bool)
+        mask = np.broadcast_to(mask, self.shape)
+        self.rows = np.full(self.shape, -1, dtype=np.int64)
+        self.rows[mask] = offset + np.arange(int(mask.sum()))
+        self.num_rows = int(mask.sum())
+
+    def __getitem__(self, idx):
+        row = int(self.rows[self._position(idx)])
+        if row < 0:
+            raise KeyError(f"Index {idx} of constraint {self.name} was skipped")
+        return row
+
+
+class _DualView:
+    """Maps the row handles returned by ConBlock.__getitem__ to their dual values, like a Pyomo dual Suffix."""
+    def __init__(self, instance):
+        self._instance = instance
+
+    def __getitem__(self, row):
+        return float(self._instance.row_dual[row])
+
+    def __contains__(self, row):
+        return self._instance.row_dual is not None and 0 <= row < len(self._instance.row_dual)
+
+
+class MatrixInstance:
+    """
+    Optimization problem assembled directly in matrix form:
+
+        min  c'x + 0.5 x'Qx   s.t.   row_lower <= A x <= row_upper,   col_lower <= x <= col_upper
+
+    Variables and constraints are registered as named, indexed blocks so that a solved instance
+    can be read like a Pyomo instance (`inst.xDA[g, t].value`, `inst.dual[inst.Con3[t]]`).
+    The structure (blocks and coefficients of A) is assembled once; cost, bound and Hessian
+    vectors can be overwritten afterwards without touching A.
+    """
+    def __init__(self):
+        self.var_blocks = {}
+        self.con_blocks = {}
+        self.num_cols = 0
+        self.num_rows = 0
+        self._entries = []
+        self._col_lower = []
+        self._col_upper = []
+        self.A = None
+        self.col_cost = None
+        self.col_lower = None
+        self.col_upper = None
+        self.row_lower = None
+        self.row_upper = None
+        self.Q = None
+        self.col_value = None
+        self.row_dual = None
+        self.termination_condition = None
+        self.dual = _DualView(self)
+        self._highs = None
+        self._highs_quadratic = False
+
+    # --- Structure -------------------------------------------------------------------------
+    def add_var(self, name, sets, lb=0.0, ub=np.inf):
+        """Adds an indexed variable block with constant bounds (use lb=-np.inf for free variables)."""
+        block = VarBlock(self, name, sets, self.num_cols)
+        self.num_cols += block.size
+        self._col_lower.append(np.full(block.size, lb, dtype=float))
+        self._col_upper.append(np.full(block.size, ub, dtype=float))
+        self.var_blocks[name] = block
+        setattr(self, name, block)
+        return block
+
+    def add_constraint(self, name, sets, mask=None):
+        """Adds an indexed constraint block; entries where `mask` is False are skipped."""
+        block = ConBlock(name, sets, self.num_rows, mask)
+        self.num_rows += block.num_rows
+        self.con_blocks[name] = block
+        setattr(self, name, block)
+        return block
+
+    def add_terms(self, rows, cols, coef=1.0, mask=None):
+        """Adds coefficients A[rows, cols] += coef; all arguments are broadcast against each other."""
+        rows, cols, coef = np.broadcast_arrays(rows, cols, np.asarray(coef, dtype=float))
+        keep = rows >= 0
+        if mask is not None:
+            keep = keep & np.broadcast_to(mask, rows.shape)
+        self._entries.append((rows[keep], cols[keep], coef[keep]))
+
+    def finalize(self):
+        """Builds the sparse constraint matrix and allocates the data vectors."""
+        self._highs = None
+        if self._entries:
+            rows, cols, vals = (np.concatenate(parts) for parts in zip(*self._entries))
+        else:
+            rows, cols, vals = np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+        # Duplicate entries are summed, as Pyomo does when collecting linear terms
+        self.A = sp.csc_matrix((vals, (rows, cols)), shape=(self.num_rows, self.num_cols))
+        self._entries = []
+        self.col_lower = np.concatenate(self._col_lower) if self._col_lower else np.zeros(0)
+        self.col_upper = np.concatenate(self._col_upper) if self._col_upper else np.zeros(0)
+        self.col_cost = np.zeros(self.num_cols)
+        self.row_lower = np.full(self.num_rows, -np.inf)
+        self.row_upper = np.full(self.num_rows, np.inf)
+        return self
+
+    @property
+    def nnz(self):
+        return self.A.nnz
+
+    # --- Data ------------------------------------------------------------------------------
+    def set_cost(self, block, values):
+        self.col_cost[block.cols] = np.broadcast_to(values, block.shape)
+
+    def set_col_bounds(self, block, lower=None, upper=None):
+        if lower is not None:
+            self.col_lower[block.cols] = np.broadcast_to(lower, block.shape)
+        if upper is not None:
+            self.col_upper[block.cols] = np.broadcast_to(upper, block.shape)
+
+    def set_row_bounds(self, block, lower=None, upper=None):
+        """Sets the bounds of the (non-skipped) rows of a constraint block; None leaves a side unbounded."""
+        mask = block.rows >= 0
+        rows = block.rows[mask]
+        self.row_lower[rows] = -np.inf if lower is None else np.broadcast_to(lower, block.shape)[mask]
+        self.row_upper[rows] = np.inf if upper is None else np.broadcast_to(upper, block.shape)[mask]
+
+    def set_quadratic(self, rows, cols, values):
+        """
+        Sets the Hessian Q of the 0.5 x'Qx objective term from (symmetric) coordinate entries.
+        Entries are broadcast; duplicates are summed.
+        """
+        rows, cols, values = (a.ravel() for a in np.broadcast_arrays(rows, cols, np.asarray(values, dtype=float)))
+        self.Q = sp.coo_matrix((values, (rows, cols)), shape=(self.num_cols, self.num_cols)).tocsc()
+
+    # --- Solve -----------------------------------------------------------------------------
+    def solve(self, options=None):
+        """
+        Solves the instance in-process with HiGHS and loads the primal values and row duals.
+
+        The HiGHS model is kept after the first solve. Later solves of the same structure only
+        push the cost, bound and Hessian vectors, which lets HiGHS start from the previous basis.
+
+        Args:
+            options (dict, optional): Solver options; 'tee' toggles solver output, all other
+                entries are passed to HiGHS as option values.
+
+        Returns:
+            str: Termination condition ('optimal', 'infeasible', ...).
+        """
+        try:
+            import highspy
+        except ImportError as e:
+            raise ImportError("The matrix model backend requires the 'highspy' package (pip install highspy).") from e
+
+        options = options or {}
+        hessian = self._highs_hessian(highspy)
+        if self._highs is None or (hessian is None and self._highs_quadratic):
+            h = highspy.Highs()
+            h.passModel(self._highs_model(highspy, hessian))
+            self._highs = h
+        else:
+            h = self._highs
+            cols = np.arange(self.num_cols, dtype=np.int32)
+            rows = np.arange(self.num_rows, dtype=np.int32)
+            h.changeColsCost(self.num_cols, cols, self.col_cost)
+            h.changeColsBounds(self.num_cols, cols, self.col_lower, self.col_upper)
+            h.changeRowsBounds(self.num_rows, rows, self.row_lower, self.row_upper)
+            if hessian is not None:
+                h.passHessian(hessian)
+        self._highs_quadratic = hessian is not None
+        h.setOptionValue('output_flag', bool(options.get('tee', False)))
+        for key, value in options.items():
+            if key != 'tee':
+                h.setOptionValue(key, value)
+
+        h.run()
+
+        status = h.getModelStatus()
+        self.termination_condition = _HIGHS_STATUS.get(h.modelStatusToString(status), h.modelStatusToString(status).lower())
+        solution = h.getSolution()
+        self.col_value = np.asarray(solution.col_value, dtype=float)
+        self.row_dual = np.asarray(solution.row_dual, dtype=float)
+        if len(self.col_value) != self.num_cols:
+            self.col_value = np.full(self.num_cols, np.nan)
+            self.row_dual = np.full(self.num_rows, np.nan)
+        return self.termination_condition
+
+    def _highs_model(self, highspy, hessian):
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.num_cols
+        lp.num_row_ = self.num_rows
+        lp.col_cost_ = self.col_cost
+        lp.col_lower_ = self.col_lower
+        lp.col_upper_ = self.col_upper
+        lp.row_lower_ = self.row_lower
+        lp.row_upper_ = self.row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.num_col_ = self.num_cols
+        lp.a_matrix_.num_row_ = self.num_rows
+        lp.a_matrix_.start_ = self.A.indptr
+        lp.a_matrix_.index_ = self.A.indices
+        lp.a_matrix_.value_ = self.A.data
+
+        model = highspy.HighsModel()
+        model.lp_ = lp
+        if hessian is not None:
+            model.hessian_ = hessian
+        return model
+
+    def _highs_hessian(self, highspy):
+        if self.Q is None or self.Q.nnz == 0:
+            return None
+        # HiGHS expects the lower triangle of Q in column-wise format
+        lower = sp.tril(self.Q).tocsc()
+        hessian = highspy.HighsHessian()
+        hessian.dim_ = self.num_cols
+        hessian.format_ = highspy.HessianFormat.kTriangular
+        hessian.start_ = lower.indptr
+        hessian.index_ = lower.indices
+        hessian.value_ = lower.data
+        return hessian
+
+
+_HIGHS_STATUS = {
+    'Optimal': 'optimal',
+    'Infeasible': 'infeasible',
+    'Unbounded': 'unbounded',
+    'Primal infeasible or unbounded': 'infeasibleOrUnbounded',
+    'Time limit reached': 'maxTimeLimit',
+    'Iteration limit reached': 'maxIterations',
+}
+
+
+def set_param_attributes(instance, data, names):
+    """Attaches Pyomo-style parameter data to an instance as plain dicts / scalars (e.g. `inst.VC[g]`)."""
+    for name in names:
+        if name not in data:
+            continue
+        value = data[name]
+        if isinstance(value, dict) and set(value.keys()) == {None}:
+            value = value[None]
+        setattr(instance, name, value)
@@ -0,0 +1,66 @@
+import pyomo.environ as pyo
+
+
+def solver_interface(name):
+    """
+    Kind of Pyomo interface behind a solver name:
+
+    - 'appsi': APPSI solvers ('appsi_highs', 'appsi_gurobi', 'appsi_cplex', ...), solved in-process
+      through the solver's API. The solver keeps the model between solves and only pushes the
+      changes (e.g. updated mutable parameters of a persistent instance).
+    - 'persistent': Pyomo persistent solvers ('cplex_persistent', 'gurobi_persistent', ...), solved
+      in-process; the instance is loaded into the solver before each solve.
+    - 'shell': every other name; Pyomo writes an LP/NL file, runs the solver executable and reads
+      the solution file back.
+    """
+    if name.startswith('appsi_'):
+        return 'appsi'
+    if name.endswith('_persistent'):
+        return 'persistent'
+    return 'shell'
+
+
+class ModelSolver:
+    """
+    Solves Pyomo instances with the solver configured in the `solver` block of the config:
+
+        solver:
+          name: "appsi_highs"   # or "cplex", "gurobi_persistent", ...
+          executable: null      # shell solvers only
+          options:
+            tee: False
+
+    `solve(instance)` returns the Pyomo results object for every interface and loads the
+    primal solution and, if the instance declares a `dual` suffix, the constraint duals.
+    """
+    def __init__(self, solver_cfg):
+        self.name = solver_cfg['name']
+        self.interface = solver_interface(self.name)
+        options = dict(solver_cfg.get('options') or {})
+        self.tee = options.pop('tee', False)
+
+        executable = solver_cfg.get('executable')
+        if self.interface == 'shell' and executable:
+            self.opt = pyo.SolverFactory(self.name, executable=executable)
+        else:
+            self.opt = pyo.SolverFactory(self.name)
+        for key, value in options.items():
+            self.opt.options[key] = value
+
+    def solve(self, instance):
+        """Solves `instance` and returns the Pyomo results object."""
+        if self.interface == 'persistent':
+            # Mutable parameters are baked into the solver model, so the instance is reloaded every time
+            self.opt.set_instance(instance)
+            result = self.opt.solve(tee=self.tee)
+            if hasattr(instance, 'dual') and result.solver.termination_condition == pyo.TerminationCondition.optimal:
+                self.opt.load_duals()
+            return result
+        # APPSI solvers update their model in place when called again with the same instance
+        return self.opt.solve(instance, tee=self.tee)
+
+    @staticmethod
+    def is_optimal(result):
+        """True if the results object reports an ok status and an optimal termination."""
+        return (result.solver.status == pyo.SolverStatus.ok) and \
+               (result.solver.termination_condition == pyo.TerminationCondition.optimal)
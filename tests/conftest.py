@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / 'src'))
+
+# Synthetic systems the backends are compared on: (generators, storage, tiers, scenarios, periods)
+SMALL_CASES = {
+    'no_storage': (8, 0, 4, 5, 6),
+    'storage': (8, 2, 4, 5, 6),
+}
+
+
+@pytest.fixture(scope='session')
+def base_config():
+    with open(ROOT / 'config' / 'model_config.yaml', 'r') as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope='session')
+def pyomo_solver():
+    """ModelSolver of the Pyomo backend (appsi_highs, in-process like the matrix backend); skips without HiGHS."""
+    pytest.importorskip('numpy')
+    pyo = pytest.importorskip('pyomo.environ')
+    pytest.importorskip('highspy')
+    if not pyo.SolverFactory('appsi_highs').available(exception_flag=False):
+        pytest.skip("appsi_highs is not available")
+    from models.solver_utils import ModelSolver
+    return ModelSolver({'name': 'appsi_highs', 'options': {'tee': False}})
+
+
+@pytest.fixture(params=sorted(SMALL_CASES))
+def small_system(request, base_config):
+    """(config, Pyomo data) of a small synthetic system."""
+    pytest.importorskip('numpy')
+    from data_utils.synthetic_system import synthetic_config, generate_synthetic_system
+    config = synthetic_config(base_config, *SMALL_CASES[request.param])
+    return config, generate_synthetic_system(config, seed=0)
+
+
+def matrix_objective(instance):
+    """Objective value c'x + 0.5 x'Qx of a solved MatrixInstance."""
+    x = instance.col_value
+    value = float(instance.col_cost @ x)
+    if instance.Q is not None:
+        value += 0.5 * float(x @ (instance.Q @ x))
+    return value
@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import matrix_objective
+
+
+def test_dafo_matrix_matches_pyomo(small_system, pyomo_solver):
+    """The matrix DAFO reaches the objective and DA dispatch of the Pyomo DAFO."""
+    np = pytest.importorskip('numpy')
+    pyo = pytest.importorskip('pyomo.environ')
+    from models.DAFOModel import DAFOModel
+    from models.DAFOMatrixModel import DAFOMatrixModel
+    from data_utils.solution_arrays import var_array, dual_array
+
+    config, data = small_system
+    pyomo_instance = DAFOModel(config).create_instance(data)
+    result = pyomo_solver.solve(pyomo_instance)
+    assert str(result.solver.termination_condition) == 'optimal'
+
+    matrix_instance = DAFOMatrixModel(config).create_instance(data)
+    assert matrix_instance.solve() == 'optimal'
+
+    assert matrix_objective(matrix_instance) == pytest.approx(pyo.value(pyomo_instance.OBJ), rel=1e-6, abs=1e-6)
+
+    T, Gs = list(pyomo_instance.T), list(pyomo_instance.G_FO_sellers)
+    assert list(matrix_instance.T) == T and list(matrix_instance.G_FO_sellers) == Gs
+    np.testing.assert_allclose(var_array(matrix_instance, 'xDA', [Gs, T]), var_array(pyomo_instance, 'xDA', [Gs, T]),
+                               rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(dual_array(matrix_instance, 'Con3', [T]), dual_array(pyomo_instance, 'Con3', [T]),
+                               rtol=1e-5, atol=1e-4)
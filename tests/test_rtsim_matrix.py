@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import matrix_objective
+
+
+def test_rtsim_matrix_and_decomposed_match_pyomo(small_system, pyomo_solver):
+    """The matrix RTSim and the per-scenario decomposition reach the RT dispatch and prices of the Pyomo RTSim."""
+    np = pytest.importorskip('numpy')
+    pyo = pytest.importorskip('pyomo.environ')
+    from models.DAFOMatrixModel import DAFOMatrixModel
+    from models.RTSimModel import RTSimModel
+    from models.RTSimMatrixModel import RTSimMatrixModel
+    from models.RTSimDecomposedModel import RTSimDecomposedModel
+    from data_utils.extract_da import extract_da
+    from data_utils.solution_arrays import var_array, dual_array
+
+    config, data = small_system
+    # Serial subproblems on the matrix backend: the decomposition is compared, not the process pool
+    config = dict(config, model_backend='matrix', rt_simulation=dict(config.get('rt_simulation') or {}, max_workers=1))
+    da_instance = DAFOMatrixModel(config).create_instance(data)
+    assert da_instance.solve() == 'optimal'
+    dataRT = extract_da(da_instance, data)[0]
+
+    pyomo_instance = RTSimModel(config).create_instance(dataRT)
+    result = pyomo_solver.solve(pyomo_instance)
+    assert str(result.solver.termination_condition) == 'optimal'
+
+    matrix_instance = RTSimMatrixModel(config).create_instance(dataRT)
+    assert matrix_instance.solve() == 'optimal'
+    assert matrix_objective(matrix_instance) == pytest.approx(pyo.value(pyomo_instance.OBJ), rel=1e-6, abs=1e-6)
+
+    decomposed_instance = RTSimDecomposedModel(config).solve(dataRT)
+    assert decomposed_instance.termination_condition == 'optimal'
+
+    S, T, Gs = list(pyomo_instance.S), list(pyomo_instance.T), list(pyomo_instance.G_FO_sellers)
+    for instance in (matrix_instance, decomposed_instance):
+        for name, sets in (('xup', [S, Gs, T]), ('xdn', [S, Gs, T]), ('d', [S, T])):
+            np.testing.assert_allclose(var_array(instance, name, sets), var_array(pyomo_instance, name, sets),
+                                       rtol=1e-5, atol=1e-4, err_msg=name)
+        np.testing.assert_allclose(dual_array(instance, 'Con3', [S, T]), dual_array(pyomo_instance, 'Con3', [S, T]),
+                                   rtol=1e-5, atol=1e-4, err_msg='Con3')